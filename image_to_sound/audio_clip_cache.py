@@ -0,0 +1,153 @@
+"""
+AudioLDM 클립 캐시
+모델 ID, 프롬프트, 길이, 스텝 수, guidance, 시드로 키를 만들어 생성된 WAV를 저장하고,
+같은 키의 클립은 diffusion 없이 result 폴더로 hardlink(불가능하면 복사)해 재사용
+"""
+
+import os
+import json
+import shutil
+from typing import Dict, Any
+
+from utils import ensure_dir
+from vlm_result_cache import text_sha256
+
+
+DEFAULT_CLIP_CACHE_DIR = os.path.join(".cache", "audio_clips")
+DEFAULT_CLIP_CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+
+def create_clip_cache(
+    cache_dir: str = DEFAULT_CLIP_CACHE_DIR,
+    model_id: str = "",
+    max_bytes: int = DEFAULT_CLIP_CACHE_MAX_BYTES,
+    refresh: bool = False,
+) -> Dict[str, Any]:
+    """캐시 설정과 hit/miss 통계를 담는 딕셔너리 생성"""
+    ensure_dir(cache_dir)
+    return {
+        "dir": cache_dir,
+        "model_id": model_id,
+        "max_bytes": max_bytes,
+        "refresh": refresh,
+        "hits": 0,
+        "misses": 0,
+        "evictions": 0,
+    }
+
+
+def make_clip_key(model_id: str, fields: Dict[str, Any]) -> str:
+    """모델 ID + 클립 생성 설정(프롬프트, 길이, 스텝, guidance, 시드 등)으로 클립 키 생성
+
+    같은 키의 클립은 같은 파형이므로 캐시 조회와 실행 내 중복 제거에 함께 쓴다.
+    """
+    return text_sha256(json.dumps({"model_id": model_id, **fields}, sort_keys=True))
+
+
+def _entry_path(cache: Dict[str, Any], key: str) -> str:
+    return os.path.join(cache["dir"], key[:2], f"{key}.wav")
+
+
+def place_file(src: str, dst: str) -> None:
+    """src를 dst 위치에 hardlink (다른 파일시스템 등으로 실패하면 복사)
+
+    기존 dst는 먼저 unlink하므로, 캐시와 inode를 공유하는 파일을 덮어써도 캐시가 손상되지 않는다.
+    """
+    if os.path.lexists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def has_clip(cache: Dict[str, Any], key: str) -> bool:
+    """캐시에 재사용 가능한 클립이 있는지 (refresh 모드면 항상 False)"""
+    return not cache["refresh"] and os.path.exists(_entry_path(cache, key))
+
+
+def lookup_clip(cache: Dict[str, Any], key: str, out_path: str) -> bool:
+    """캐시에 클립이 있으면 out_path로 배치하고 True 반환"""
+    path = _entry_path(cache, key)
+
+    if not has_clip(cache, key):
+        cache["misses"] += 1
+        return False
+
+    try:
+        place_file(path, out_path)
+    except OSError:
+        cache["misses"] += 1
+        return False
+
+    # LRU: 마지막 사용 시각을 mtime으로 기록
+    os.utime(path, None)
+    cache["hits"] += 1
+    return True
+
+
+def store_clip(cache: Dict[str, Any], key: str, wav_path: str) -> None:
+    """생성된 WAV를 캐시에 저장 (용량 정리는 실행이 끝날 때 evict_lru로 한 번 수행)"""
+    path = _entry_path(cache, key)
+    ensure_dir(os.path.dirname(path))
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        place_file(wav_path, tmp_path)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"⚠️ 클립 캐시 저장 실패: {str(e)}")
+
+
+def evict_lru(cache: Dict[str, Any]) -> int:
+    """캐시만 가진 바이트가 max_bytes를 넘으면 가장 오래 사용되지 않은 클립부터 삭제
+
+    result 폴더의 WAV와 hardlink로 inode를 공유하는 클립은 지워도 디스크가 비지 않으므로
+    예산에 세지 않고 삭제하지도 않는다. 캐시 안에서 같은 inode를 가진 항목은 하나로 센다.
+    """
+    inodes = {}
+    for root_dir, _, files in os.walk(cache["dir"]):
+        for name in files:
+            if not name.endswith(".wav"):
+                continue
+            path = os.path.join(root_dir, name)
+            stat = os.stat(path)
+            entry = inodes.setdefault((stat.st_dev, stat.st_ino), {"mtime": stat.st_mtime, "size": stat.st_size,
+                                                                   "nlink": stat.st_nlink, "paths": []})
+            entry["mtime"] = max(entry["mtime"], stat.st_mtime)
+            entry["paths"].append(path)
+
+    # 캐시 밖의 링크가 없는 inode만 캐시 전용 바이트
+    exclusive = [entry for entry in inodes.values() if entry["nlink"] <= len(entry["paths"])]
+    total_bytes = sum(entry["size"] for entry in exclusive)
+
+    removed = 0
+    for entry in sorted(exclusive, key=lambda e: e["mtime"]):
+        if total_bytes <= cache["max_bytes"]:
+            break
+        try:
+            for path in entry["paths"]:
+                os.remove(path)
+        except OSError:
+            continue
+        total_bytes -= entry["size"]
+        removed += len(entry["paths"])
+
+    cache["evictions"] += removed
+    return removed
+
+
+def clip_cache_stats(cache: Dict[str, Any] | None) -> Dict[str, Any]:
+    """실행 로그에 기록할 캐시 통계"""
+    if cache is None:
+        return {"enabled": False}
+    lookups = cache["hits"] + cache["misses"]
+    return {
+        "enabled": True,
+        "dir": cache["dir"],
+        "refresh": cache["refresh"],
+        "hits": cache["hits"],
+        "misses": cache["misses"],
+        "evictions": cache["evictions"],
+        "hit_rate": round(cache["hits"] / lookups, 4) if lookups else 0.0,
+    }
@@ -0,0 +1,98 @@
+"""
+클립 길이 프로파일
+악기 매핑과 play_method에 따라 클립마다 다른 길이를 정한다.
+드럼처럼 짧은 one-shot(발소리, 노크 등)은 짧게, 기타/키보드처럼 지속되는 소리는 길게 생성해
+latent 길이에 비례하는 diffusion 비용을 줄인다.
+"""
+
+import re
+import json
+from functools import lru_cache
+from typing import Dict, Any
+
+
+# play_method 키워드(단어 단위 일치, 먼저 나온 항목 우선)가 악기 매핑보다 우선한다. 값은 초 단위
+DEFAULT_DURATION_PROFILE = {
+    "play_method": {
+        "knock": 1.0,
+        "tap": 1.0,
+        "click": 1.0,
+        "footstep": 1.5,
+        "step": 1.5,
+        "slam": 1.5,
+        "hit": 1.5,
+        "vibration": 2.0,
+        "rattle": 2.0,
+        "crinkle": 2.5,
+        "creak": 2.5,
+        "chime": 4.0,
+        "bell": 4.0,
+        "rustle": 4.0,
+        "breeze": 5.0,
+        "rolling": 4.0,
+    },
+    "instrument": {
+        "drum": 2.0,
+        "percussion": 2.0,
+        "bass": 3.0,
+        "guitar": 5.0,
+        "keyboard": 5.0,
+        "piano": 5.0,
+        "strings": 5.0,
+        "synth": 5.0,
+    },
+    # 어느 항목과도 맞지 않으면 --seconds 값을 사용
+    "default": None,
+}
+
+# 같은 길이끼리 배치로 묶이도록 길이를 이 단위로 반올림
+DURATION_QUANTUM = 0.5
+
+
+def load_duration_profile(path: str | None = None) -> Dict[str, Any]:
+    """기본 프로파일에 사용자 JSON(같은 구조)을 덮어쓴 프로파일 ("default" 또는 None이면 기본값)"""
+    profile = {
+        "play_method": dict(DEFAULT_DURATION_PROFILE["play_method"]),
+        "instrument": dict(DEFAULT_DURATION_PROFILE["instrument"]),
+        "default": DEFAULT_DURATION_PROFILE["default"],
+    }
+    if path and path != "default":
+        with open(path, "r", encoding="utf-8") as f:
+            custom = json.load(f)
+        for section in ("play_method", "instrument"):
+            profile[section].update({k.lower(): float(v) for k, v in custom.get(section, {}).items()})
+        if "default" in custom:
+            profile["default"] = custom["default"]
+    return profile
+
+
+@lru_cache(maxsize=None)
+def _keyword_pattern(keyword: str) -> re.Pattern:
+    """키워드와 그 굴절형(taps, tapping, rattled, chiming 등)만 단어 단위로 일치
+
+    부분 문자열 일치는 "tap" -> "tapestry", "hit" -> "white"처럼 엉뚱한 단어를 잡으므로 쓰지 않는다.
+    """
+    if keyword.endswith("e"):
+        return re.compile(rf"\b{re.escape(keyword[:-1])}(?:e|es|ed|ing)\b")
+    suffix = "es|s|ed|ing" if keyword.endswith(("s", "sh", "ch", "x", "z")) else "s|ed|ing"
+    return re.compile(rf"\b{re.escape(keyword)}(?:{re.escape(keyword[-1])}?(?:{suffix}))?\b")
+
+
+def _match(section: Dict[str, float], text: Any) -> float | None:
+    if not isinstance(text, str):
+        return None
+    text = text.lower()
+    for keyword, seconds in section.items():
+        if _keyword_pattern(keyword).search(text):
+            return seconds
+    return None
+
+
+def clip_duration(item: Dict[str, Any], profile: Dict[str, Any], fallback_seconds: float) -> float:
+    """프롬프트 항목(play_method, instrument)의 클립 길이 (초, DURATION_QUANTUM 단위)"""
+    seconds = _match(profile["play_method"], item.get("play_method"))
+    if seconds is None:
+        seconds = _match(profile["instrument"], item.get("instrument"))
+    if seconds is None:
+        seconds = profile["default"] if profile["default"] is not None else fallback_seconds
+    return max(DURATION_QUANTUM, round(float(seconds) / DURATION_QUANTUM) * DURATION_QUANTUM)
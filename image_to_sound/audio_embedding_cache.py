@@ -0,0 +1,131 @@
+"""
+AudioLDM 텍스트 임베딩 캐시
+같은 프롬프트는 전체 sound_sources 트리에서 한 번만 CLAP 텍스트 인코더를 거치도록
+프롬프트 임베딩과 unconditional(negative) 임베딩을 메모리와 디스크에 저장하고,
+파이프라인에는 prompt_embeds / negative_prompt_embeds로 전달한다.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import TYPE_CHECKING, Dict, Any, List
+
+from utils import ensure_dir
+from vlm_result_cache import text_sha256
+
+# torch는 임베딩을 실제로 읽고 쓸 때만 import (audioldm2 --help가 torch를 로드하지 않도록)
+if TYPE_CHECKING:
+    import torch
+
+
+DEFAULT_EMBEDDING_CACHE_DIR = os.path.join(".cache", "text_embeddings")
+
+# unconditional 임베딩 캐시 키 (빈 프롬프트와 구분)
+_NEGATIVE_KEY = "<unconditional>"
+
+
+def create_embedding_cache(cache_dir: str = DEFAULT_EMBEDDING_CACHE_DIR, model_id: str = "") -> Dict[str, Any]:
+    """메모리 캐시와 hit/miss 통계를 담는 딕셔너리 생성"""
+    ensure_dir(cache_dir)
+    return {
+        "dir": cache_dir,
+        "model_id": model_id,
+        "memory": {},
+        "hits": 0,
+        "misses": 0,
+    }
+
+
+def _entry_path(cache: Dict[str, Any], prompt: str) -> str:
+    key = text_sha256(f"{cache['model_id']}\n{prompt}")
+    return os.path.join(cache["dir"], key[:2], f"{key}.pt")
+
+
+def _lookup(cache: Dict[str, Any], prompt: str) -> torch.Tensor | None:
+    import torch
+
+    embedding = cache["memory"].get(prompt)
+    if embedding is None:
+        path = _entry_path(cache, prompt)
+        if os.path.exists(path):
+            try:
+                embedding = torch.load(path, map_location="cpu")
+            except Exception:
+                embedding = None
+            if embedding is not None:
+                cache["memory"][prompt] = embedding
+    if embedding is None:
+        cache["misses"] += 1
+    else:
+        cache["hits"] += 1
+    return embedding
+
+
+def _store(cache: Dict[str, Any], prompt: str, embedding: torch.Tensor) -> None:
+    import torch
+
+    embedding = embedding.detach().to("cpu", torch.float32).clone()
+    cache["memory"][prompt] = embedding
+    path = _entry_path(cache, prompt)
+    ensure_dir(os.path.dirname(path))
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    torch.save(embedding, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _to_pipeline(pipe, embeddings: torch.Tensor) -> torch.Tensor:
+    return embeddings.to(device=pipe.device, dtype=pipe.text_encoder.dtype)
+
+
+def get_prompt_embeds(cache: Dict[str, Any], pipe, prompts: List[str]) -> torch.Tensor:
+    """프롬프트별 임베딩 (batch, dim). 캐시에 없는 고유 프롬프트만 한 번의 인코더 호출로 계산"""
+    import torch
+
+    embeddings = {}
+    missing = []
+    for prompt in dict.fromkeys(prompts):
+        embedding = _lookup(cache, prompt)
+        if embedding is None:
+            missing.append(prompt)
+        else:
+            embeddings[prompt] = embedding
+
+    if missing:
+        with torch.no_grad():
+            encoded = pipe._encode_prompt(missing, pipe.device, 1, False)
+        for prompt, embedding in zip(missing, encoded):
+            _store(cache, prompt, embedding)
+            embeddings[prompt] = cache["memory"][prompt]
+
+    return _to_pipeline(pipe, torch.stack([embeddings[prompt] for prompt in prompts]))
+
+
+def get_negative_embeds(cache: Dict[str, Any], pipe, batch_size: int) -> torch.Tensor:
+    """Classifier-free guidance용 unconditional 임베딩 (batch, dim)
+
+    파이프라인 내부 경로와 같은 값이 되도록 guidance 모드 _encode_prompt 결과의 앞쪽 절반을 사용한다.
+    """
+    import torch
+
+    embedding = _lookup(cache, _NEGATIVE_KEY)
+    if embedding is None:
+        with torch.no_grad():
+            encoded = pipe._encode_prompt([_NEGATIVE_KEY], pipe.device, 1, True)
+        _store(cache, _NEGATIVE_KEY, encoded[0])
+        embedding = cache["memory"][_NEGATIVE_KEY]
+    return _to_pipeline(pipe, embedding.unsqueeze(0).expand(batch_size, -1))
+
+
+def embedding_cache_stats(cache: Dict[str, Any] | None) -> Dict[str, Any]:
+    """실행 로그에 기록할 캐시 통계"""
+    if cache is None:
+        return {"enabled": False}
+    lookups = cache["hits"] + cache["misses"]
+    return {
+        "enabled": True,
+        "dir": cache["dir"],
+        "unique_prompts": len(cache["memory"]),
+        "hits": cache["hits"],
+        "misses": cache["misses"],
+        "hit_rate": round(cache["hits"] / lookups, 4) if lookups else 0.0,
+    }
@@ -0,0 +1,52 @@
+"""
+장시간 오디오 분할 생성
+긴 클립(예: 30초 ambience)을 겹치는 고정 길이 세그먼트로 나눠 같은 프롬프트와 결정적 세그먼트 시드로 생성하고,
+겹치는 구간을 equal-power crossfade로 이어 붙인다. U-Net latent와 VAE/vocoder 디코딩이 세그먼트 길이로
+제한되므로 최대 메모리는 요청 길이와 무관하게 거의 일정하다.
+"""
+
+import math
+import hashlib
+from typing import List
+
+import numpy as np
+
+
+SAMPLE_RATE = 16000
+
+
+def segment_count(total_seconds: float, segment_seconds: float, overlap_seconds: float) -> int:
+    """total_seconds를 채우는 데 필요한 세그먼트 수"""
+    if total_seconds <= segment_seconds:
+        return 1
+    hop = segment_seconds - overlap_seconds
+    return 1 + math.ceil((total_seconds - segment_seconds) / hop)
+
+
+def segment_seeds(clip_seed: int, count: int) -> List[int]:
+    """클립 시드에서 유도한 세그먼트별 시드 (세그먼트 수/배치 구성과 무관하게 i번째 시드는 항상 같음)"""
+    seeds = []
+    for i in range(count):
+        digest = hashlib.sha256(f"{clip_seed}:segment:{i}".encode("utf-8")).digest()
+        seeds.append(int.from_bytes(digest[:8], "big") & 0x7FFFFFFFFFFFFFFF)
+    return seeds
+
+
+def crossfade_segments(segments: List[np.ndarray], overlap_seconds: float, total_seconds: float,
+                       sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """세그먼트를 overlap 구간 equal-power crossfade로 이어 붙이고 total_seconds 길이로 자름"""
+    overlap = int(round(overlap_seconds * sample_rate))
+    out = np.asarray(segments[0], dtype=np.float32)
+    if overlap > 0:
+        t = np.linspace(0.0, 1.0, overlap, dtype=np.float32)
+        fade_in = np.sin(0.5 * np.pi * t)
+        fade_out = np.cos(0.5 * np.pi * t)
+    for segment in segments[1:]:
+        segment = np.asarray(segment, dtype=np.float32)
+        n = min(overlap, len(out), len(segment))
+        if n > 0:
+            mixed = out[-n:] * fade_out[:n] + segment[:n] * fade_in[:n]
+            out = np.concatenate([out[:-n], mixed, segment[n:]])
+        else:
+            out = np.concatenate([out, segment])
+    return out[:int(round(total_seconds * sample_rate))]
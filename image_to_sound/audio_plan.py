@@ -0,0 +1,125 @@
+"""
+오디오 생성 계획
+모든 장면의 variant를 confidence와 악기 매핑 유무로 점수화해 우선순위를 매기고,
+최대 클립 수 / 예상 diffusion 시간 예산 안에 들어가는 클립만 골라 생성 순서를 정한다.
+"""
+
+import os
+import json
+from datetime import datetime
+from typing import Dict, Any, List, Tuple
+
+
+PLAN_NAME = "plan.json"
+
+# confidence가 없는 variant의 기본값
+DEFAULT_CONFIDENCE = 0.5
+# mapping_to_music_instrument가 없는(None) variant의 가중치 (참고할 음색 정보가 없음)
+UNMAPPED_INSTRUMENT_WEIGHT = 0.7
+# 오디오 1초 x diffusion 스텝 1회의 예상 소요 시간 (초). 노드에 맞게 --step_cost로 보정
+DEFAULT_STEP_COST = 0.02
+
+
+def has_instrument(instrument: Any) -> bool:
+    """악기 매핑이 실제로 있는지 (None, "None", 빈 문자열은 없음)"""
+    return isinstance(instrument, str) and instrument.strip().lower() not in ("", "none", "null")
+
+
+def variant_priority(confidence: Any, instrument: Any) -> float:
+    """variant 우선순위 점수: confidence x 악기 매핑 가중치"""
+    if not isinstance(confidence, (int, float)):
+        confidence = DEFAULT_CONFIDENCE
+    weight = 1.0 if has_instrument(instrument) else UNMAPPED_INSTRUMENT_WEIGHT
+    return round(float(confidence) * weight, 4)
+
+
+def estimate_clip_seconds(audio_seconds: float, steps: int, step_cost: float = DEFAULT_STEP_COST) -> float:
+    """클립 하나의 예상 diffusion 시간 (latent 길이와 스텝 수에 비례)"""
+    return audio_seconds * steps * step_cost
+
+
+def plan_clip_jobs(
+    jobs: List[Dict[str, Any]],
+    audio_seconds: float,
+    steps: int,
+    max_clips: int | None = None,
+    max_seconds: float | None = None,
+    step_cost: float = DEFAULT_STEP_COST,
+    cached_keys: set | None = None,
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """우선순위가 높은 클립부터 예산에 맞춰 선택하고 (계획된 작업 목록, 계획 요약) 반환
+
+    클립 비용은 job의 seconds(없으면 audio_seconds) 길이로 추정한다.
+    캐시에 이미 있는 키와 앞서 계획된 클립과 키가 같은 중복 클립은 diffusion 비용 0으로 계산하고
+    max_clips에도 세지 않는다 (max_clips는 실제로 diffusion을 실행할 클립 수).
+    모든 job에 priority / estimated_seconds / plan_status / plan_rank가 기록된다.
+    """
+    cached_keys = cached_keys or set()
+    planned_keys = set()
+    planned = []
+    diffusion_clips = 0
+    used_seconds = 0.0
+
+    for job in sorted(jobs, key=lambda j: (-variant_priority(j.get("confidence"), j.get("instrument")),
+                                           j["base"], j["idx"])):
+        job["priority"] = variant_priority(job.get("confidence"), job.get("instrument"))
+        if job["clip_key"] in cached_keys:
+            status = "cached"
+        elif job["clip_key"] in planned_keys:
+            status = "duplicate"
+        else:
+            status = "planned"
+        seconds = job.get("seconds", audio_seconds)
+        cost = 0.0 if status != "planned" else estimate_clip_seconds(seconds, steps, step_cost)
+        job["estimated_seconds"] = round(cost, 3)
+        job["plan_rank"] = None
+
+        if status == "planned" and max_clips is not None and diffusion_clips >= max_clips:
+            job["plan_status"] = "skipped_max_clips"
+            continue
+        if max_seconds is not None and used_seconds + cost > max_seconds:
+            job["plan_status"] = "skipped_max_seconds"
+            continue
+
+        used_seconds += cost
+        diffusion_clips += int(status == "planned")
+        planned_keys.add(job["clip_key"])
+        planned.append(job)
+        job["plan_status"] = status
+        job["plan_rank"] = len(planned)
+
+    summary = {
+        "created": datetime.now().isoformat(),
+        "max_clips": max_clips,
+        "max_seconds": max_seconds,
+        "step_cost": step_cost,
+        "total_clips": len(jobs),
+        "planned_clips": len(planned),
+        "diffusion_clips": diffusion_clips,
+        "skipped_clips": len(jobs) - len(planned),
+        "estimated_seconds": round(used_seconds, 3),
+    }
+    return planned, summary
+
+
+def write_plans(images: Dict[str, Dict[str, Any]], jobs: List[Dict[str, Any]], summary: Dict[str, Any]) -> None:
+    """이미지별 계획을 prompts.json 옆의 plan.json으로 저장"""
+    by_image = {}
+    for job in jobs:
+        by_image.setdefault(job["base"], []).append(job)
+
+    for base, image_jobs in by_image.items():
+        clips = [{
+            "output_file": job["out_name"],
+            "seconds": job.get("seconds"),
+            "confidence": job.get("confidence"),
+            "instrument": job.get("instrument"),
+            "priority": job.get("priority"),
+            "estimated_seconds": job.get("estimated_seconds"),
+            "status": job.get("plan_status"),
+            "rank": job.get("plan_rank"),
+        } for job in sorted(image_jobs, key=lambda j: j["idx"])]
+        plan_path = os.path.join(images[base]["out_dir"], PLAN_NAME)
+        with open(plan_path, "w", encoding="utf-8") as f:
+            json.dump({"budget": summary, "clips": clips}, f, ensure_ascii=False, indent=2)
+        print(f"  🗂️ 생성 계획 저장: {plan_path}")
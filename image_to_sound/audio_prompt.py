@@ -58,6 +58,8 @@ def generate_prompts(data: dict, custom_templates: dict = None) -> List[Dict[str
             generated_prompts.append({
                 "source_name": name,
                 "play_method": play_method,
+                "instrument": instrument,
+                "confidence": variant.get("confidence"),
                 "prompt": final_prompt
             })
             
@@ -0,0 +1,185 @@
+"""
+AudioLDM 스케줄러/스텝 수 비교
+번들 예시 장면(vlm_prompt/*_sound_source.json)의 프롬프트를 기준 설정(default 스케줄러, 200 스텝)과
+각 (스케줄러, 스텝 수) 조합으로 같은 클립 시드로 생성하고, 클립당 지연 시간과
+기준 대비 스펙트럼 거리를 리포트로 저장한다.
+"""
+
+import os
+import glob
+import json
+import time
+from datetime import datetime
+from typing import Dict, Any, List
+
+import numpy as np
+
+from audio_prompt import generate_prompts
+from audioldm2 import SCHEDULERS, _load_pipeline, _render_clips, _save_wav, set_scheduler, clip_seed
+from utils import ensure_dir, sanitize_filename
+
+
+EXAMPLE_SCENES = sorted(glob.glob(os.path.join("vlm_prompt", "*_sound_source.json")))
+
+
+def _log_power_spectrogram(audio: np.ndarray, n_fft: int = 1024, hop: int = 256) -> np.ndarray:
+    """프레임별 로그 파워 스펙트럼 (dB)"""
+    if len(audio) < n_fft:
+        audio = np.pad(audio, (0, n_fft - len(audio)))
+    window = np.hanning(n_fft)
+    frames = np.stack([audio[i:i + n_fft] * window for i in range(0, len(audio) - n_fft + 1, hop)])
+    power = np.abs(np.fft.rfft(frames, axis=1)) ** 2
+    return 10.0 * np.log10(power + 1e-10)
+
+
+def spectral_distances(audio: np.ndarray, reference: np.ndarray) -> Dict[str, float]:
+    """기준 대비 스펙트럼 거리 (dB)
+
+    lsd: 프레임별 log-spectral distance 평균 (시간 구조까지 비교)
+    ltas: 장시간 평균 스펙트럼 간 RMS 차이 (음색/대역 분포만 비교)
+    """
+    length = min(len(audio), len(reference))
+    spec = _log_power_spectrogram(audio[:length])
+    ref_spec = _log_power_spectrogram(reference[:length])
+    lsd = np.mean(np.sqrt(np.mean((spec - ref_spec) ** 2, axis=1)))
+    ltas = np.sqrt(np.mean((spec.mean(axis=0) - ref_spec.mean(axis=0)) ** 2))
+    return {"lsd_db": round(float(lsd), 3), "ltas_db": round(float(ltas), 3)}
+
+
+def _example_clips(global_seed: int) -> List[Dict[str, Any]]:
+    """예시 장면들의 프롬프트와 클립 시드"""
+    clips = []
+    for json_path in EXAMPLE_SCENES:
+        base = os.path.basename(json_path).replace("_sound_source.json", "")
+        with open(json_path, "r", encoding="utf-8") as f:
+            prompts = generate_prompts(json.load(f))
+        for idx, item in enumerate(prompts, 1):
+            source_name = sanitize_filename(item.get("source_name", "source"))
+            play_method = sanitize_filename(str(item.get("play_method", "act")))
+            clips.append({
+                "base": base,
+                "name": f"{idx:02d}_{source_name}_{play_method}",
+                "prompt": item["prompt"],
+                "seed": clip_seed(global_seed, base, item["prompt"]),
+            })
+    return clips
+
+
+def _render_all(pipe, clips: List[Dict[str, Any]], steps: int, audio_seconds: float, guidance: float,
+                out_dir: str | None) -> Dict[str, Any]:
+    """클립을 하나씩 생성하며 클립당 지연 시간 측정"""
+    audios = []
+    latencies = []
+    for clip in clips:
+        start_time = time.perf_counter()
+        audio = _render_clips(pipe, [clip["prompt"]], [clip["seed"]], audio_seconds, steps, guidance)[0]
+        latencies.append(time.perf_counter() - start_time)
+        audios.append(audio)
+        if out_dir:
+            ensure_dir(os.path.join(out_dir, clip["base"]))
+            _save_wav(os.path.join(out_dir, clip["base"], f"{clip['name']}.wav"), audio)
+    return {"audios": audios, "latencies": latencies}
+
+
+def compare_schedulers(
+    schedulers: List[str],
+    steps_list: List[int],
+    model_id: str = "cvssp/audioldm-s-full-v2",
+    reference_steps: int = 200,
+    audio_seconds: float = 4.0,
+    guidance: float = 3.5,
+    seed: int = 0,
+    report_path: str = "scheduler_report.json",
+    audio_dir: str | None = None,
+) -> Dict[str, Any]:
+    """기준(default, reference_steps)과 각 (스케줄러, 스텝) 조합을 비교해 리포트 저장"""
+    clips = _example_clips(seed)
+    print(f"🎧 예시 장면 {len(EXAMPLE_SCENES)}개, 클립 {len(clips)}개")
+
+    hf_token = os.environ.get("HUGGING_FACE_TOKEN") or os.environ.get("HF_TOKEN")
+    pipe = _load_pipeline(model_id, hf_token)
+
+    print(f"\n🔬 기준: default / {reference_steps} steps")
+    reference = _render_all(pipe, clips, reference_steps, audio_seconds, guidance,
+                            os.path.join(audio_dir, f"default_{reference_steps}") if audio_dir else None)
+
+    rows = [{
+        "scheduler": "default",
+        "steps": reference_steps,
+        "reference": True,
+        "mean_latency_seconds": round(float(np.mean(reference["latencies"])), 3),
+        "lsd_db": 0.0,
+        "ltas_db": 0.0,
+    }]
+    for scheduler in schedulers:
+        set_scheduler(pipe, scheduler)
+        for steps in steps_list:
+            if scheduler == "default" and steps == reference_steps:
+                continue
+            print(f"\n🔬 {scheduler} / {steps} steps")
+            rendered = _render_all(pipe, clips, steps, audio_seconds, guidance,
+                                   os.path.join(audio_dir, f"{scheduler}_{steps}") if audio_dir else None)
+            distances = [spectral_distances(a, r) for a, r in zip(rendered["audios"], reference["audios"])]
+            rows.append({
+                "scheduler": scheduler,
+                "steps": steps,
+                "reference": False,
+                "mean_latency_seconds": round(float(np.mean(rendered["latencies"])), 3),
+                "speedup": round(float(np.mean(reference["latencies"]) / np.mean(rendered["latencies"])), 2),
+                "lsd_db": round(float(np.mean([d["lsd_db"] for d in distances])), 3),
+                "ltas_db": round(float(np.mean([d["ltas_db"] for d in distances])), 3),
+                "per_clip": [
+                    {"clip": f"{clip['base']}/{clip['name']}", "latency_seconds": round(latency, 3), **distance}
+                    for clip, latency, distance in zip(clips, rendered["latencies"], distances)
+                ],
+            })
+
+    result = {
+        "timestamp": datetime.now().isoformat(),
+        "model_id": model_id,
+        "seed": seed,
+        "audio_seconds": audio_seconds,
+        "guidance": guidance,
+        "scenes": EXAMPLE_SCENES,
+        "results": rows,
+    }
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+
+    print(f"\n📊 스케줄러 비교 (기준: default / {reference_steps} steps)")
+    for row in rows:
+        print(
+            f"  - {row['scheduler']:>7} {row['steps']:>4} steps: {row['mean_latency_seconds']:.2f}s/clip, "
+            f"LSD {row['lsd_db']:.2f} dB, LTAS {row['ltas_db']:.2f} dB"
+        )
+    print(f"📁 리포트: {report_path}")
+    return result
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="AudioLDM 스케줄러/스텝 수별 지연 시간과 기준 대비 스펙트럼 거리 비교")
+    parser.add_argument("--schedulers", nargs="+", default=["default", "dpmpp"], choices=list(SCHEDULERS),
+                        help="비교할 스케줄러")
+    parser.add_argument("--steps", nargs="+", type=int, default=[20, 30, 50], help="비교할 스텝 수")
+    parser.add_argument("--reference_steps", type=int, default=200, help="기준(default 스케줄러) 스텝 수")
+    parser.add_argument("--model", type=str, default="cvssp/audioldm-s-full-v2", help="AudioLDM 모델 ID")
+    parser.add_argument("--seconds", type=float, default=4.0, help="오디오 길이 (초)")
+    parser.add_argument("--guidance", type=float, default=3.5, help="Guidance scale")
+    parser.add_argument("--seed", type=int, default=0, help="전역 시드 (모든 설정에서 같은 클립 시드 사용)")
+    parser.add_argument("--report", type=str, default="scheduler_report.json", help="리포트 저장 경로")
+    parser.add_argument("--audio_dir", type=str, default=None, help="설정별 WAV 저장 디렉토리 (청취 비교용)")
+    args = parser.parse_args()
+
+    compare_schedulers(
+        args.schedulers,
+        args.steps,
+        model_id=args.model,
+        reference_steps=args.reference_steps,
+        audio_seconds=args.seconds,
+        guidance=args.guidance,
+        seed=args.seed,
+        report_path=args.report,
+        audio_dir=args.audio_dir,
+    )
@@ -0,0 +1,193 @@
+"""
+CPU 멀티 프로세스 오디오 생성
+N개 워커 프로세스가 각자 AudioLDM 파이프라인을 로드하고, torch 스레드 수(및 가능하면 CPU 코어 집합)를
+나눠 가진 채 공유 큐에서 클립 배치(같은 길이끼리 batch_size개)를 가져와 같은 출력 구조로 WAV를 저장한다.
+1x32 스레드와 4x8 스레드 같은 분할을 비교할 수 있도록 워커별 처리량을 보고한다.
+"""
+
+import os
+import time
+import queue
+import multiprocessing as mp
+from typing import Dict, Any, List, Tuple
+
+
+def _pin_worker(worker_id: int, threads: int) -> List[int] | None:
+    """워커에 겹치지 않는 CPU 코어 집합을 할당 (지원하지 않는 OS나 코어가 부족하면 None)"""
+    if not hasattr(os, "sched_getaffinity"):
+        return None
+    cores = sorted(os.sched_getaffinity(0))
+    share = cores[worker_id * threads:(worker_id + 1) * threads]
+    if len(share) < threads:
+        return None
+    os.sched_setaffinity(0, share)
+    return share
+
+
+def _worker_main(worker_id: int, threads: int, job_queue, result_queue, options: Dict[str, Any]) -> None:
+    """워커 프로세스: 파이프라인 로드 후 큐가 빌 때까지 클립 배치 생성"""
+    cores = _pin_worker(worker_id, threads)
+
+    import torch
+    torch.set_num_threads(threads)
+    torch.set_num_interop_threads(1)
+
+    from audioldm2 import _load_pipeline, _run_clip_jobs
+    from audio_clip_cache import create_clip_cache
+    from audio_embedding_cache import create_embedding_cache
+    from work_claims import open_work_dir
+    from utils import peak_rss_mb
+
+    load_start = time.perf_counter()
+    pipe = _load_pipeline(options["model_id"], options["hf_token"], scheduler=options["scheduler"], device="cpu")
+    load_seconds = time.perf_counter() - load_start
+
+    clip_cache = None
+    if options["cache_dir"]:
+        clip_cache = create_clip_cache(options["cache_dir"], model_id=options["model_id"])
+    embedding_cache = None
+    if options["embedding_cache_dir"]:
+        embedding_cache = create_embedding_cache(options["embedding_cache_dir"], model_id=options["model_id"])
+    work = None
+    if options["work"]:
+        # 워커 프로세스마다 별도 이름으로 claim (하트비트도 프로세스별)
+        work = open_work_dir(options["work"]["work_dir"], options["work"]["stage"],
+                             worker_id=f"{options['work']['worker_id']}-w{worker_id}",
+                             lease_seconds=options["work"]["lease_seconds"])
+
+    clips = 0
+    busy_seconds = 0.0
+    while True:
+        batch = job_queue.get()
+        if batch is None:
+            break
+        start_time = time.perf_counter()
+        try:
+            _run_clip_jobs(pipe, batch, len(batch), options["steps"], options["guidance"],
+                           clip_cache=clip_cache, embedding_cache=embedding_cache,
+                           segment_seconds=options["segment_seconds"],
+                           overlap_seconds=options["overlap_seconds"], work=work)
+        except Exception as e:
+            names = ", ".join(f"{job['base']}/{job['out_name']}" for job in batch)
+            print(f"    ❌ [worker {worker_id}] {names} 생성 실패: {str(e)}")
+        elapsed = time.perf_counter() - start_time
+        busy_seconds += elapsed
+        for job in batch:
+            # _run_clip_jobs는 저장에 성공한 클립에만 generation_order를 기록
+            ok = "generation_order" in job
+            clips += int(ok)
+            result_queue.put({"worker": worker_id, "clip_key": job["clip_key"], "out_path": job["out_path"],
+                              "ok": ok, "claimed_elsewhere": bool(job.get("claimed_elsewhere")),
+                              "seconds": round(elapsed / len(batch), 3)})
+
+    result_queue.put({
+        "worker": worker_id,
+        "done": True,
+        "threads": threads,
+        "cores": cores,
+        "clips": clips,
+        "load_seconds": round(load_seconds, 3),
+        "busy_seconds": round(busy_seconds, 3),
+        "clips_per_sec": round(clips / busy_seconds, 4) if busy_seconds > 0 else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+    })
+
+
+def run_worker_pool(
+    jobs: List[Dict[str, Any]],
+    num_workers: int,
+    threads_per_worker: int | None = None,
+    batch_size: int = 1,
+    model_id: str = "cvssp/audioldm-s-full-v2",
+    scheduler: str = "default",
+    steps: int = 200,
+    guidance: float = 3.5,
+    cache_dir: str | None = None,
+    embedding_cache_dir: str | None = None,
+    segment_seconds: float | None = None,
+    overlap_seconds: float = 1.0,
+    work: Dict[str, Any] | None = None,
+) -> Tuple[int, Dict[str, Any]]:
+    """클립 작업들을 워커 프로세스 풀로 생성하고 (생성된 클립 수, 워커 통계) 반환
+
+    같은 길이의 클립을 batch_size개씩 묶어 워커에 나눠 준다.
+    완료 순서대로 job에 generation_order를 기록한다. cache_dir가 주어지면 워커가 생성한 클립을 캐시에 저장한다.
+    work(work_dir, stage, worker_id, lease_seconds)가 주어지면 워커가 공유 작업 디렉토리에서 클립을 claim한다.
+    """
+    from audioldm2 import _batches_by_length
+
+    job_fields = ("base", "idx", "prompt", "out_name", "out_path", "seed", "seconds", "clip_key", "work_key")
+    batches = [[{k: v for k, v in job.items() if k in job_fields} for job in batch]
+               for batch in _batches_by_length(jobs, max(1, batch_size))]
+    num_workers = max(1, min(num_workers, len(batches)))
+    if threads_per_worker is None:
+        threads_per_worker = max(1, (os.cpu_count() or 1) // num_workers)
+
+    options = {
+        "model_id": model_id,
+        "hf_token": os.environ.get("HUGGING_FACE_TOKEN") or os.environ.get("HF_TOKEN"),
+        "scheduler": scheduler,
+        "steps": steps,
+        "guidance": guidance,
+        "cache_dir": cache_dir,
+        "embedding_cache_dir": embedding_cache_dir,
+        "segment_seconds": segment_seconds,
+        "overlap_seconds": overlap_seconds,
+        "work": work,
+    }
+
+    # torch/CUDA 상태를 물려받지 않도록 spawn으로 시작
+    ctx = mp.get_context("spawn")
+    job_queue = ctx.Queue()
+    result_queue = ctx.Queue()
+    for batch in batches:
+        job_queue.put(batch)
+    for _ in range(num_workers):
+        job_queue.put(None)
+
+    print(f"👷 워커 {num_workers}개 x 스레드 {threads_per_worker}개로 {len(jobs)}개 클립 생성 "
+          f"(batch={max(1, batch_size)}, 배치 {len(batches)}개)")
+    start_time = time.perf_counter()
+    processes = [
+        ctx.Process(target=_worker_main, args=(i, threads_per_worker, job_queue, result_queue, options),
+                    name=f"audio-worker-{i}")
+        for i in range(num_workers)
+    ]
+    for process in processes:
+        process.start()
+
+    jobs_by_path = {job["out_path"]: job for job in jobs}
+    generated = 0
+    workers = []
+    while len(workers) < num_workers:
+        try:
+            message = result_queue.get(timeout=5.0)
+        except queue.Empty:
+            if not any(process.is_alive() for process in processes):
+                print("⚠️ 워커 프로세스가 모두 종료되었지만 일부 결과를 받지 못했습니다")
+                break
+            continue
+        if message.get("done"):
+            workers.append(message)
+        elif message["ok"]:
+            jobs_by_path[message["out_path"]]["generation_order"] = generated
+            generated += 1
+        elif message["claimed_elsewhere"]:
+            jobs_by_path[message["out_path"]]["claimed_elsewhere"] = True
+
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - start_time
+
+    workers.sort(key=lambda w: w["worker"])
+    for worker in workers:
+        print(f"  👷 worker {worker['worker']}: {worker['clips']}개 클립, {worker['clips_per_sec']:.3f} clips/sec "
+              f"(로드 {worker['load_seconds']:.1f}s, 스레드 {worker['threads']}, 최대 RSS {worker['peak_rss_mb']} MB)")
+    return generated, {
+        "num_workers": num_workers,
+        "threads_per_worker": threads_per_worker,
+        "batch_size": max(1, batch_size),
+        "elapsed_seconds": round(elapsed, 3),
+        "clips_per_sec": round(generated / elapsed, 4) if elapsed > 0 else 0.0,
+        "workers": workers,
+    }
@@ -1,22 +1,96 @@
+from __future__ import annotations
+
 import os
+import sys
 import json
 import glob
+import time
+import random
+import hashlib
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import TYPE_CHECKING, Dict, Any, List, Tuple
 
-import numpy as np
-import torch
-from diffusers import AudioLDMPipeline
-from scipy.io.wavfile import write as wav_write
+# torch/diffusers/scipy/numpy는 파이프라인을 로드하거나 WAV를 쓰는 함수 안에서 import
+# (--help와 모든 클립이 캐시 hit인 실행은 무거운 프레임워크를 로드하지 않음)
+if TYPE_CHECKING:
+    import numpy as np
+    from diffusers import AudioLDMPipeline
 
 from audio_prompt import generate_prompts
-from utils import ensure_dir, sanitize_filename
-
-
-def _load_pipeline(model_id: str, hf_token: str | None) -> AudioLDMPipeline:
-    """AudioLDM2 파이프라인 로드"""
-    device = "cuda" if torch.cuda.is_available() else "cpu"
-    dtype = torch.float16 if torch.cuda.is_available() else torch.float32
+from audio_clip_cache import (
+    DEFAULT_CLIP_CACHE_DIR,
+    DEFAULT_CLIP_CACHE_MAX_BYTES,
+    create_clip_cache,
+    make_clip_key,
+    has_clip,
+    lookup_clip,
+    store_clip,
+    place_file,
+    evict_lru,
+    clip_cache_stats,
+)
+from audio_embedding_cache import (
+    DEFAULT_EMBEDDING_CACHE_DIR,
+    create_embedding_cache,
+    get_prompt_embeds,
+    get_negative_embeds,
+    embedding_cache_stats,
+)
+from audio_duration import load_duration_profile, clip_duration
+from audio_plan import DEFAULT_STEP_COST, plan_clip_jobs, write_plans
+from audio_workers import run_worker_pool
+from model_registry import acquire_model, release_model
+from work_claims import (
+    DEFAULT_LEASE_SECONDS,
+    open_work_dir,
+    work_key,
+    claim,
+    complete,
+    release,
+    is_done,
+    shared_value,
+    work_stats,
+)
+from utils import ensure_dir, sanitize_filename, peak_rss_mb
+
+
+# 스케줄러 이름 -> (클래스, from_config 추가 인자). "default"는 모델에 포함된 스케줄러 그대로 사용
+SCHEDULERS = {
+    "default": None,
+    "ddim": ("DDIMScheduler", {}),
+    "dpmpp": ("DPMSolverMultistepScheduler", {"algorithm_type": "dpmsolver++", "solver_order": 2}),
+    "unipc": ("UniPCMultistepScheduler", {}),
+}
+DEFAULT_SCHEDULER = "default"
+
+
+def set_scheduler(pipe: AudioLDMPipeline, scheduler: str = "default") -> None:
+    """파이프라인 스케줄러 교체 (적은 스텝에서도 품질이 유지되는 multistep solver 등)"""
+    if scheduler not in SCHEDULERS:
+        raise ValueError(f"scheduler must be one of {tuple(SCHEDULERS)}: {scheduler}")
+    if not hasattr(pipe, "default_scheduler"):
+        pipe.default_scheduler = pipe.scheduler
+    if SCHEDULERS[scheduler] is None:
+        pipe.scheduler = pipe.default_scheduler
+    else:
+        import diffusers
+        
+        scheduler_name, extra_config = SCHEDULERS[scheduler]
+        scheduler_cls = getattr(diffusers, scheduler_name)
+        pipe.scheduler = scheduler_cls.from_config(pipe.default_scheduler.config, **extra_config)
+    pipe.scheduler_name = scheduler
+    print(f"✅ 스케줄러: {scheduler} ({type(pipe.scheduler).__name__})")
+
+
+def _load_pipeline(model_id: str, hf_token: str | None, scheduler: str = "default",
+                   device: str | None = None) -> AudioLDMPipeline:
+    """AudioLDM2 파이프라인 로드 (device 생략 시 CUDA가 있으면 CUDA)"""
+    import torch
+    from diffusers import AudioLDMPipeline
+    
+    if device is None:
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+    dtype = torch.float16 if device.startswith("cuda") else torch.float32
     
     print(f"AudioLDM2 모델 로딩 중... (Device: {device}, Dtype: {dtype})")
     
@@ -26,11 +100,26 @@ def _load_pipeline(model_id: str, hf_token: str | None) -> AudioLDMPipeline:
         use_auth_token=hf_token,
     )
     pipe = pipe.to(device)
+    set_scheduler(pipe, scheduler)
     
     print(f"✅ AudioLDM2 모델 로드 완료! Device: {pipe.device}")
     return pipe
 
 
+def acquire_pipeline(model_id: str, scheduler: str = "default",
+                     device: str | None = None) -> Tuple[str, AudioLDMPipeline]:
+    """레지스트리에서 AudioLDM 파이프라인을 받아 (레지스트리 키, 파이프라인) 반환 (상주 중이 아니면 로드)
+    
+    스케줄러는 로드 후 교체할 수 있으므로 키에 포함하지 않는다. 사용이 끝나면 release_model(키)로 반납한다.
+    """
+    hf_token = os.environ.get("HUGGING_FACE_TOKEN") or os.environ.get("HF_TOKEN")
+    key = f"audioldm:{model_id}:device={device or 'auto'}"
+    pipe = acquire_model(key, lambda: _load_pipeline(model_id, hf_token, scheduler=scheduler, device=device))
+    if getattr(pipe, "scheduler_name", scheduler) != scheduler:
+        set_scheduler(pipe, scheduler)
+    return key, pipe
+
+
 # _ensure_dir 함수는 utils.py의 ensure_dir로 대체됨
 
 
@@ -57,14 +146,296 @@ def _objects_to_sound_sources_if_needed(data: Dict[str, Any]) -> Dict[str, Any]:
 
 def _save_wav(path: str, audio: np.ndarray, sample_rate: int = 16000) -> None:
     """오디오를 WAV 파일로 저장"""
+    import numpy as np
+    from scipy.io.wavfile import write as wav_write
+    
     # Ensure mono float32 in -1..1 -> int16
     if audio.ndim > 1:
         audio = np.mean(audio, axis=0)
     audio = np.clip(audio, -1.0, 1.0)
     wav = (audio * 32767.0).astype(np.int16)
+    # 클립 캐시와 hardlink된 기존 파일을 제자리에서 덮어쓰지 않도록 먼저 삭제
+    if os.path.lexists(path):
+        os.remove(path)
     wav_write(path, sample_rate, wav)
 
 
+def _find_sound_source_jsons(sound_source_dir: str, single: str | None = None) -> List[str]:
+    """처리할 sound source JSON 파일 목록"""
+    if single:
+        if single.lower().endswith(".json"):
+            candidate = single
+        else:
+            # 이미지 파일명에서 기본 이름 추출 (예: data/101.jpg -> 101)
+            base_name = os.path.splitext(os.path.basename(single))[0]
+            # sound_sources 디렉토리에서 해당 이미지의 JSON 파일 찾기
+            json_pattern = os.path.join(sound_source_dir, base_name, f"{base_name}_sound_source.json")
+            candidate = json_pattern if os.path.exists(json_pattern) else single
+        return [candidate] if os.path.exists(candidate) else []
+
+    # sound_sources 디렉토리의 모든 이미지 폴더에서 JSON 파일 찾기
+    json_files = []
+    for image_folder in os.listdir(sound_source_dir):
+        image_folder_path = os.path.join(sound_source_dir, image_folder)
+        if os.path.isdir(image_folder_path):
+            json_pattern = os.path.join(image_folder_path, "*_sound_source.json")
+            json_files.extend(glob.glob(json_pattern))
+    return sorted(json_files)
+
+
+def _image_base(json_path: str, sound_source_dir: str) -> str:
+    """이미지 이름 추출 (폴더명 또는 파일명에서)"""
+    if os.path.dirname(json_path) != sound_source_dir:
+        # 하위 폴더에 있는 경우
+        return os.path.basename(os.path.dirname(json_path))
+    # 직접 sound_sources에 있는 경우
+    return os.path.splitext(os.path.basename(json_path))[0].replace("_sound_source", "")
+
+
+def clip_seed(global_seed: int, base: str, prompt_text: str) -> int:
+    """클립별 시드: (전역 시드, 이미지 이름, 프롬프트 해시)에서 유도
+
+    앞선 클립 수나 생성 순서와 무관하므로 어떤 부분 집합이든 어떤 순서/프로세스에서
+    다시 생성해도 같은 결과가 나온다.
+    """
+    prompt_hash = hashlib.sha256(prompt_text.encode("utf-8")).hexdigest()
+    digest = hashlib.sha256(f"{global_seed}:{base}:{prompt_hash}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") & 0x7FFFFFFFFFFFFFFF
+
+
+def _build_clip_jobs(json_files: List[str], sound_source_dir: str, result_dir: str, global_seed: int,
+                     audio_seconds: float = 4.0,
+                     duration_profile: Dict[str, Any] | None = None) -> Tuple[List[Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+    """모든 JSON의 프롬프트를 클립 단위 작업으로 펼침 (이미지별 출력 폴더/프롬프트 목록 포함)
+
+    duration_profile이 있으면 클립 길이를 악기 매핑/play_method별로 정하고, 없으면 모두 audio_seconds.
+    """
+    jobs = []
+    images = {}
+    for json_path in json_files:
+        print(f"\n🎵 처리 중: {json_path}")
+        base = _image_base(json_path, sound_source_dir)
+        
+        try:
+            data = _objects_to_sound_sources_if_needed(_load_json(json_path))
+            prompts: List[Dict[str, Any]] = generate_prompts(data)
+        except Exception as e:
+            print(f"  ❌ {json_path} 처리 중 오류: {str(e)}")
+            continue
+        
+        if not prompts:
+            print(f"  ⚠️ {json_path}에서 프롬프트를 생성할 수 없습니다")
+            continue
+
+        # 이미지별 결과 폴더 생성
+        image_out_dir = os.path.join(result_dir, base)
+        ensure_dir(image_out_dir)
+        images[base] = {"json_path": json_path, "out_dir": image_out_dir, "prompts": prompts}
+        print(f"  🎯 {len(prompts)}개 오디오 클립 예정")
+
+        for idx, item in enumerate(prompts, 1):
+            source_name = sanitize_filename(item.get("source_name", "source"))
+            play_method = sanitize_filename(str(item.get("play_method", "act")))
+            out_name = f"{idx:02d}_{source_name}_{play_method}.wav"
+            jobs.append({
+                "base": base,
+                "idx": idx,
+                "prompt": item["prompt"],
+                "out_name": out_name,
+                "out_path": os.path.join(image_out_dir, out_name),
+                "seed": clip_seed(global_seed, base, item["prompt"]),
+                "seconds": clip_duration(item, duration_profile, audio_seconds) if duration_profile else audio_seconds,
+                "confidence": item.get("confidence"),
+                "instrument": item.get("instrument"),
+            })
+    return jobs, images
+
+
+def _load_selection(path: str) -> set:
+    """선택 파일 로드: 한 줄에 하나씩 "<base>/<파일명>.wav" 또는 "<base>/<번호>" (#으로 시작하면 무시)"""
+    entries = set()
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            entry = line.strip().replace("\\", "/")
+            if not entry or entry.startswith("#"):
+                continue
+            entries.add(entry[:-4] if entry.lower().endswith(".wav") else entry)
+    return entries
+
+
+def _load_selection_seed(path: str) -> int | None:
+    """선택 파일 머리의 "# global_seed: <시드>" 줄에 기록된 draft 전역 시드 (없으면 None)"""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            entry = line.strip()
+            if entry.startswith("#") and entry[1:].strip().startswith("global_seed:"):
+                return int(entry[1:].strip()[len("global_seed:"):])
+    return None
+
+
+def _select_jobs(jobs: List[Dict[str, Any]], select_file: str | None = None,
+                 min_confidence: float | None = None) -> List[Dict[str, Any]]:
+    """선택 파일 및/또는 confidence 기준을 만족하는 클립만 남김 (번호/파일명은 전체 실행과 동일)"""
+    entries = _load_selection(select_file) if select_file else None
+    selected = []
+    for job in jobs:
+        if entries is not None:
+            names = {f"{job['base']}/{job['out_name'][:-4]}", f"{job['base']}/{job['idx']:02d}"}
+            if not names & entries:
+                continue
+        if min_confidence is not None:
+            confidence = job.get("confidence")
+            if not isinstance(confidence, (int, float)) or confidence < min_confidence:
+                continue
+        selected.append(job)
+    return selected
+
+
+def _write_selection_template(draft_dir: str, jobs: List[Dict[str, Any]], seed: int) -> str:
+    """draft 청취 후 남길 클립의 주석만 지우면 되는 선택 파일 템플릿 작성 (refine이 같은 시드를 쓰도록 전역 시드 기록)"""
+    path = os.path.join(draft_dir, "selection.txt")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("# 최종 품질로 다시 생성할 클립의 '#'을 지우고 --select로 전달하세요\n")
+        f.write(f"# global_seed: {seed}\n")
+        for job in jobs:
+            f.write(f"# {job['base']}/{job['out_name']}\n")
+    return path
+
+
+def _render_clips(pipe: AudioLDMPipeline, prompts: List[str], seeds: List[int], audio_seconds: float,
+                  steps: int, guidance: float, embedding_cache: Dict[str, Any] | None = None) -> List[np.ndarray]:
+    """프롬프트 여러 개를 한 번의 파이프라인 호출로 생성 (텍스트 인코딩/U-Net을 배치로 실행)
+
+    클립마다 자체 generator를 쓰므로 배치 구성과 무관하게 같은 시드면 같은 결과가 나온다.
+    embedding_cache가 있으면 텍스트 인코더 대신 캐시된 임베딩을 전달한다.
+    """
+    import numpy as np
+    import torch
+    
+    generator = [torch.Generator(device=pipe.device).manual_seed(s) for s in seeds]
+    if embedding_cache is not None:
+        prompt_kwargs = {
+            "prompt_embeds": get_prompt_embeds(embedding_cache, pipe, prompts),
+            "negative_prompt_embeds": get_negative_embeds(embedding_cache, pipe, len(prompts)),
+        }
+    else:
+        prompt_kwargs = {"prompt": prompts}
+    with torch.autocast(device_type=("cuda" if torch.cuda.is_available() else "cpu")):
+        audios = pipe(
+            **prompt_kwargs,
+            num_inference_steps=steps,
+            audio_length_in_s=audio_seconds,
+            guidance_scale=guidance,
+            generator=generator,
+        ).audios
+    return [np.array(audio) for audio in audios]
+
+
+def _render_long_clip(pipe: AudioLDMPipeline, prompt: str, seed: int, audio_seconds: float, steps: int,
+                      guidance: float, segment_seconds: float, overlap_seconds: float, batch_size: int = 1,
+                      embedding_cache: Dict[str, Any] | None = None) -> np.ndarray:
+    """긴 클립을 segment_seconds 길이의 겹치는 세그먼트로 생성해 crossfade로 연결
+
+    모든 세그먼트는 같은 프롬프트와 클립 시드에서 유도한 세그먼트 시드를 쓰고, batch_size개씩 함께 생성된다.
+    """
+    from audio_longform import segment_count, segment_seeds, crossfade_segments
+    
+    count = segment_count(audio_seconds, segment_seconds, overlap_seconds)
+    seeds = segment_seeds(seed, count)
+    segments = []
+    for i in range(0, count, batch_size):
+        chunk = seeds[i:i + batch_size]
+        segments.extend(_render_clips(pipe, [prompt] * len(chunk), chunk, segment_seconds, steps, guidance,
+                                      embedding_cache))
+    return crossfade_segments(segments, overlap_seconds, audio_seconds)
+
+
+def _batches_by_length(jobs: List[Dict[str, Any]], batch_size: int):
+    """길이가 같은 클립끼리 batch_size씩 묶음 (찬 배치부터 내보내 입력 순서를 최대한 유지)"""
+    buckets = {}
+    for job in jobs:
+        bucket = buckets.setdefault(job["seconds"], [])
+        bucket.append(job)
+        if len(bucket) == batch_size:
+            yield buckets.pop(job["seconds"])
+    yield from buckets.values()
+
+
+def _run_clip_jobs(pipe: AudioLDMPipeline, jobs: List[Dict[str, Any]], batch_size: int, steps: int,
+                   guidance: float, clip_cache: Dict[str, Any] | None = None,
+                   embedding_cache: Dict[str, Any] | None = None, segment_seconds: float | None = None,
+                   overlap_seconds: float = 1.0, work: Dict[str, Any] | None = None) -> int:
+    """클립 작업들을 같은 길이끼리 batch_size씩 생성해 저장하고 생성된 클립 수 반환 (job에 generation_order 기록)
+
+    segment_seconds가 주어지면 그보다 긴 클립은 겹치는 세그먼트로 나눠 생성한다.
+    work(공유 작업 디렉토리)가 주어지면 배치를 생성하기 직전에 클립을 claim하고, 다른 노드가 가져간 클립은 건너뛴다.
+    """
+    generated = 0
+    for batch in _batches_by_length(jobs, batch_size):
+        if work is not None:
+            claimed = []
+            for job in batch:
+                if claim(work, job["work_key"]):
+                    claimed.append(job)
+                else:
+                    job["claimed_elsewhere"] = True
+            batch = claimed
+            if not batch:
+                continue
+        audio_seconds = batch[0]["seconds"]
+        
+        if segment_seconds and audio_seconds > segment_seconds:
+            # 긴 클립은 겹치는 세그먼트로 나눠 생성 (메모리는 세그먼트 길이 기준)
+            # 세그먼트 배치의 VAE 디코딩은 하나씩 수행하고, 공유 파이프라인이므로 끝나면 원래대로 되돌림
+            results = []
+            pipe.enable_vae_slicing()
+            try:
+                for job in batch:
+                    try:
+                        audio = _render_long_clip(pipe, job["prompt"], job["seed"], audio_seconds, steps, guidance,
+                                                  segment_seconds, overlap_seconds, batch_size, embedding_cache)
+                        results.append((job, audio, None))
+                    except Exception as e:
+                        results.append((job, None, e))
+            finally:
+                pipe.disable_vae_slicing()
+        else:
+            try:
+                audios = _render_clips(pipe, [job["prompt"] for job in batch], [job["seed"] for job in batch],
+                                       audio_seconds, steps, guidance, embedding_cache)
+                results = list(zip(batch, audios, [None] * len(batch)))
+            except Exception as e:
+                if len(batch) == 1:
+                    results = [(batch[0], None, e)]
+                else:
+                    # 배치 전체가 실패하면 (예: 메모리 부족) 클립별 개별 생성으로 전환
+                    print(f"  ⚠️ 배치 생성 실패, 개별 처리로 전환: {str(e)}")
+                    results = []
+                    for job in batch:
+                        try:
+                            audio = _render_clips(pipe, [job["prompt"]], [job["seed"]], audio_seconds, steps, guidance,
+                                                  embedding_cache)[0]
+                            results.append((job, audio, None))
+                        except Exception as clip_error:
+                            results.append((job, None, clip_error))
+        
+        for job, audio, error in results:
+            if error is not None:
+                print(f"    ❌ {job['base']}/{job['out_name']} 생성 실패: {str(error)}")
+                if work is not None:
+                    release(work, job["work_key"])
+                continue
+            _save_wav(job["out_path"], audio, sample_rate=16000)
+            if clip_cache is not None:
+                store_clip(clip_cache, job["clip_key"], job["out_path"])
+            if work is not None:
+                complete(work, job["work_key"], {"output_file": f"{job['base']}/{job['out_name']}"})
+            print(f"    ✅ {job['base']}/{job['out_name']}")
+            job["generation_order"] = generated
+            generated += 1
+    return generated
+
+
 def generate_audio_for_sound_sources(
     sound_source_dir: str = "sound_sources",
     result_dir: str = "result",
@@ -74,111 +445,335 @@ def generate_audio_for_sound_sources(
     guidance: float = 3.5,
     seed: int | None = None,
     single: str | None = None,
-) -> None:
-    """Sound sources JSON 파일들을 처리하여 오디오 생성"""
+    batch_size: int = 1,
+    use_cache: bool = True,
+    refresh_cache: bool = False,
+    cache_dir: str = DEFAULT_CLIP_CACHE_DIR,
+    cache_max_bytes: int = DEFAULT_CLIP_CACHE_MAX_BYTES,
+    scheduler: str = "default",
+    embedding_cache_dir: str | None = None,
+    draft: bool = False,
+    draft_dir: str = "drafts",
+    draft_steps: int = 20,
+    draft_seconds: float = 2.0,
+    select: str | None = None,
+    min_confidence: float | None = None,
+    max_clips: int | None = None,
+    max_diffusion_seconds: float | None = None,
+    step_cost: float = DEFAULT_STEP_COST,
+    duration_profile: str | None = None,
+    workers: int = 0,
+    threads_per_worker: int | None = None,
+    segment_seconds: float | None = None,
+    overlap_seconds: float = 1.0,
+    work_dir: str | None = None,
+    worker_id: str | None = None,
+    lease_seconds: float = DEFAULT_LEASE_SECONDS,
+    pipe: AudioLDMPipeline | None = None,
+) -> Dict[str, Any] | None:
+    """Sound sources JSON 파일들을 처리하여 오디오 생성
+
+    batch_size > 1이면 여러 이미지에 걸친 프롬프트를 묶어 한 번의 파이프라인 호출로 생성한다.
+    클립 캐시에 같은 키(모델, 프롬프트, 길이, 스텝, guidance, 시드)가 있으면 diffusion 없이 재사용하고,
+    실행 안에서 키가 같은 클립은 한 번만 생성한다.
+    embedding_cache_dir가 주어지면 고유 프롬프트별 텍스트 임베딩을 한 번만 계산해 재사용한다.
+
+    Draft-then-refine: draft=True면 모든 클립을 적은 스텝/짧은 길이로 draft_dir에 생성하고,
+    이후 select(선택 파일) 및/또는 min_confidence로 고른 클립만 같은 시드로 최종 품질 생성한다.
+
+    max_clips / max_diffusion_seconds 예산이 주어지면 전체 장면의 variant를 우선순위(confidence x 악기 매핑)로
+    정렬해 예산 안의 클립만 우선순위 순서대로 생성하고, 계획을 prompts.json 옆 plan.json에 기록한다.
+
+    duration_profile("default" 또는 프로파일 JSON 경로)이 주어지면 클립 길이를 악기 매핑/play_method별로 정하고,
+    배치는 같은 길이의 클립끼리 묶는다.
+
+    workers > 0이면 CPU 워커 프로세스 풀(워커마다 파이프라인 하나, threads_per_worker개 스레드)로 생성한다.
+
+    segment_seconds가 주어지면 그보다 긴 클립은 overlap_seconds만큼 겹치는 세그먼트로 생성해 crossfade하므로
+    최대 메모리가 요청 길이와 무관하게 거의 일정하다. 실행마다 최대 RSS를 보고한다.
+
+    work_dir(공유 파일시스템)가 주어지면 여러 노드가 (장면, 프롬프트) 클립을 claim해 나눠 생성한다.
+    전역 시드는 작업 디렉토리에 처음 기록된 값을 모든 노드가 쓰고, prompts.json은 노드별 파일로 저장한다.
+
+    pipe가 주어지면 새로 로드하지 않고 재사용한다 (여러 번 호출하는 스트리밍 모드용).
+    """
+    
+    if segment_seconds is not None and not 0 <= overlap_seconds < segment_seconds:
+        raise ValueError(f"overlap_seconds must be in [0, segment_seconds): {overlap_seconds}")
+    
+    if draft:
+        audio_seconds = min(draft_seconds, audio_seconds)
+        result_dir, steps = draft_dir, draft_steps
+        print(f"📝 Draft 패스: {steps} steps, {audio_seconds}s -> {result_dir}")
     
     ensure_dir(result_dir)
 
-    hf_token = os.environ.get("HUGGING_FACE_TOKEN") or os.environ.get("HF_TOKEN")
-    pipe = _load_pipeline(model_id, hf_token)
-
-    if seed is not None:
-        generator = torch.Generator(device=pipe.device).manual_seed(seed)
-    else:
-        generator = torch.Generator(device=pipe.device)
-
     # JSON 파일들 찾기
-    if single:
-        if single.lower().endswith(".json"):
-            candidate = single
-        else:
-            # 이미지 파일명에서 기본 이름 추출 (예: data/101.jpg -> 101)
-            base_name = os.path.splitext(os.path.basename(single))[0]
-            # sound_sources 디렉토리에서 해당 이미지의 JSON 파일 찾기
-            json_pattern = os.path.join(sound_source_dir, base_name, f"{base_name}_sound_source.json")
-            candidate = json_pattern if os.path.exists(json_pattern) else single
-        json_files = [candidate] if os.path.exists(candidate) else []
-    else:
-        # sound_sources 디렉토리의 모든 이미지 폴더에서 JSON 파일 찾기
-        json_files = []
-        for image_folder in os.listdir(sound_source_dir):
-            image_folder_path = os.path.join(sound_source_dir, image_folder)
-            if os.path.isdir(image_folder_path):
-                json_pattern = os.path.join(image_folder_path, "*_sound_source.json")
-                json_files.extend(glob.glob(json_pattern))
-        json_files = sorted(json_files)
+    json_files = _find_sound_source_jsons(sound_source_dir, single)
     
     if not json_files:
         print(f"❌ JSON 파일을 찾을 수 없습니다: {sound_source_dir}")
-        return
+        return None
 
     print(f"📁 {len(json_files)}개 JSON 파일 발견. 출력 -> {result_dir}")
 
-    total_audio_generated = 0
+    # refine 패스는 draft와 같은 클립 시드를 써야 하므로 선택 파일(또는 draft_dir의 선택 파일)에 기록된 시드 사용
+    if not draft and (select or min_confidence is not None) and seed is None:
+        draft_selection = os.path.join(draft_dir, "selection.txt")
+        for selection_path in (select, draft_selection):
+            if selection_path and os.path.exists(selection_path):
+                seed = _load_selection_seed(selection_path)
+                if seed is not None:
+                    print(f"📝 Draft 전역 시드 사용: {seed} ({selection_path})")
+                    break
+        if seed is None:
+            raise ValueError("refine 패스에는 draft의 전역 시드가 필요합니다: --seed를 지정하거나 "
+                             "draft가 기록한 selection.txt를 사용하세요")
     
-    for json_path in json_files:
-        print(f"\n🎵 처리 중: {json_path}")
-        
-        # 이미지 이름 추출 (폴더명 또는 파일명에서)
-        if os.path.dirname(json_path) != sound_source_dir:
-            # 하위 폴더에 있는 경우
-            base = os.path.basename(os.path.dirname(json_path))
+    # 전역 시드가 없으면 새로 뽑아 prompts.json에 기록 (재현 가능하도록)
+    if seed is None:
+        seed = random.randrange(2 ** 31)
+    work = None
+    if work_dir:
+        # 클립 시드가 노드마다 같도록 전역 시드를 작업 디렉토리에서 공유
+        shared_seed = shared_value(work_dir, "audio_seed", seed)
+        if shared_seed != seed:
+            print(f"🤝 작업 디렉토리의 전역 시드 사용: {shared_seed} (요청 {seed})")
+        seed = shared_seed
+        stage = f"audio/{sanitize_filename(os.path.basename(os.path.normpath(result_dir)))}"
+        work = open_work_dir(work_dir, stage, worker_id=worker_id, lease_seconds=lease_seconds)
+        print(f"🤝 공유 작업 디렉토리: {work_dir} (worker={work['worker_id']}, lease={lease_seconds:.0f}s)")
+    print(f"🎲 전역 시드: {seed}")
+
+    profile = load_duration_profile(duration_profile) if duration_profile else None
+    jobs, images = _build_clip_jobs(json_files, sound_source_dir, result_dir, seed,
+                                    audio_seconds=audio_seconds, duration_profile=profile)
+    if profile is not None and draft:
+        # draft 패스는 프로파일 길이도 draft 길이로 제한
+        for job in jobs:
+            job["seconds"] = min(job["seconds"], audio_seconds)
+    if select or min_confidence is not None:
+        total_jobs = len(jobs)
+        jobs = _select_jobs(jobs, select, min_confidence)
+        print(f"✂️ Refine 대상: {len(jobs)}/{total_jobs}개 클립 (select={select}, min_confidence={min_confidence})")
+    if not jobs:
+        print("❌ 생성할 오디오 클립이 없습니다")
+        return None
+    
+    start_time = time.perf_counter()
+    
+    for job in jobs:
+        job["clip_key"] = make_clip_key(model_id, {
+            "prompt": job["prompt"],
+            "seconds": job["seconds"],
+            "steps": steps,
+            "guidance": guidance,
+            "seed": job["seed"],
+            "scheduler": scheduler,
+        })
+        if segment_seconds and job["seconds"] > segment_seconds:
+            # 세그먼트 생성 결과는 한 번에 생성한 클립과 다르므로 키를 구분
+            job["clip_key"] = make_clip_key(model_id, {
+                "clip_key": job["clip_key"],
+                "segment_seconds": segment_seconds,
+                "overlap_seconds": overlap_seconds,
+            })
+        if work is not None:
+            job["work_key"] = work_key(f"{job['base']}/{job['out_name']}")
+    
+    clip_cache = None
+    if use_cache:
+        clip_cache = create_clip_cache(cache_dir, model_id=model_id, max_bytes=cache_max_bytes,
+                                       refresh=refresh_cache)
+    
+    # 예산이 있으면 우선순위가 높은 클립부터 예산 안에서만 생성 (캐시 hit/중복은 비용 0)
+    plan = None
+    all_jobs = jobs
+    if max_clips is not None or max_diffusion_seconds is not None:
+        cached_keys = set()
+        if clip_cache is not None:
+            cached_keys = {job["clip_key"] for job in jobs if has_clip(clip_cache, job["clip_key"])}
+        jobs, plan = plan_clip_jobs(jobs, audio_seconds, steps, max_clips=max_clips,
+                                    max_seconds=max_diffusion_seconds, step_cost=step_cost,
+                                    cached_keys=cached_keys)
+        print(f"🗂️ 생성 계획: {plan['planned_clips']}/{plan['total_clips']}개 클립, "
+              f"예상 diffusion {plan['estimated_seconds']:.1f}s "
+              f"(max_clips={max_clips}, max_seconds={max_diffusion_seconds})")
+    
+    # 다른 노드가 이미 끝낸 클립은 건너뜀
+    pending_jobs = jobs
+    if work is not None:
+        pending_jobs = []
+        for job in jobs:
+            if is_done(work, job["work_key"]):
+                job["claimed_elsewhere"] = True
+            else:
+                pending_jobs.append(job)
+        print(f"🤝 완료 기록 {len(jobs) - len(pending_jobs)}개 / 남은 클립 {len(pending_jobs)}개")
+    
+    # 클립 캐시 hit은 diffusion 없이 result 폴더로 배치 (공유 작업 디렉토리에서는 claim한 노드만 배치)
+    if clip_cache is not None:
+        uncached_jobs = []
+        for job in pending_jobs:
+            if work is not None and has_clip(clip_cache, job["clip_key"]) and not claim(work, job["work_key"]):
+                job["claimed_elsewhere"] = True
+                continue
+            if lookup_clip(clip_cache, job["clip_key"], job["out_path"]):
+                job["cache_hit"] = True
+                if work is not None:
+                    complete(work, job["work_key"], {"output_file": f"{job['base']}/{job['out_name']}",
+                                                     "cache_hit": True})
+            else:
+                uncached_jobs.append(job)
+        cached_count = sum(1 for job in pending_jobs if job.get("cache_hit"))
+        pending_jobs = uncached_jobs
+        print(f"\n♻️ 클립 캐시 hit {cached_count}개 / 생성 대상 {len(pending_jobs)}개")
+    
+    # 같은 키(같은 프롬프트/시드/설정)의 클립은 한 번만 생성하고 나머지는 결과를 복제
+    unique_jobs = {}
+    duplicate_jobs = []
+    for job in pending_jobs:
+        if job["clip_key"] in unique_jobs:
+            duplicate_jobs.append(job)
         else:
-            # 직접 sound_sources에 있는 경우
-            base = os.path.splitext(os.path.basename(json_path))[0].replace("_sound_source", "")
-        
+            unique_jobs[job["clip_key"]] = job
+    pending_jobs = list(unique_jobs.values())
+    if duplicate_jobs:
+        print(f"🔁 중복 클립 {len(duplicate_jobs)}개는 한 번만 생성")
+    
+    batch_size = max(1, batch_size)
+    total_audio_generated = 0
+    embedding_cache = None
+    worker_stats = None
+    
+    if pending_jobs and workers > 0:
+        total_audio_generated, worker_stats = run_worker_pool(
+            pending_jobs, workers, threads_per_worker, batch_size=batch_size, model_id=model_id, scheduler=scheduler,
+            steps=steps, guidance=guidance, cache_dir=cache_dir if clip_cache is not None else None,
+            embedding_cache_dir=embedding_cache_dir, segment_seconds=segment_seconds,
+            overlap_seconds=overlap_seconds,
+            work={"work_dir": work_dir, "stage": work["stage"], "worker_id": work["worker_id"],
+                  "lease_seconds": lease_seconds} if work is not None else None,
+        )
+    elif pending_jobs:
+        pipe_key = None
+        if pipe is None:
+            # 레지스트리에 상주 중이면 재사용 (반납 후 메모리 예산을 넘으면 해제됨)
+            pipe_key, pipe = acquire_pipeline(model_id, scheduler=scheduler)
         try:
-            data = _objects_to_sound_sources_if_needed(_load_json(json_path))
-            prompts: List[Dict[str, Any]] = generate_prompts(data)
-            
-            if not prompts:
-                print(f"  ⚠️ {json_path}에서 프롬프트를 생성할 수 없습니다")
-                continue
-
-            # 이미지별 결과 폴더 생성
-            image_out_dir = os.path.join(result_dir, base)
-            ensure_dir(image_out_dir)
-
-            print(f"  🎯 {len(prompts)}개 오디오 클립 생성 중...")
-            
-            for idx, item in enumerate(prompts, 1):
-                prompt_text = item["prompt"]
-                source_name = sanitize_filename(item.get("source_name", "source"))
-                play_method = sanitize_filename(str(item.get("play_method", "act")))
-
-                out_name = f"{idx:02d}_{source_name}_{play_method}.wav"
-                out_path = os.path.join(image_out_dir, out_name)
-
-                try:
-                    with torch.autocast(device_type=("cuda" if torch.cuda.is_available() else "cpu")):
-                        audio = pipe(
-                            prompt_text,
-                            num_inference_steps=steps,
-                            audio_length_in_s=audio_seconds,
-                            guidance_scale=guidance,
-                            generator=generator,
-                        ).audios[0]
-
-                    _save_wav(out_path, np.array(audio), sample_rate=16000)
-                    print(f"    ✅ {out_name}")
-                    total_audio_generated += 1
-                    
-                except Exception as e:
-                    print(f"    ❌ {out_name} 생성 실패: {str(e)}")
-            
-            # 사용된 프롬프트들을 추적용으로 저장
-            prompts_dump = os.path.join(image_out_dir, "prompts.json")
-            with open(prompts_dump, "w", encoding="utf-8") as f:
-                json.dump(prompts, f, ensure_ascii=False, indent=2)
-            
-            print(f"  📄 프롬프트 저장: {prompts_dump}")
-            
-        except Exception as e:
-            print(f"  ❌ {json_path} 처리 중 오류: {str(e)}")
+            if embedding_cache_dir:
+                embedding_cache = create_embedding_cache(embedding_cache_dir, model_id=model_id)
+                unique_prompts = len({job["prompt"] for job in pending_jobs})
+                print(f"🧮 텍스트 임베딩 캐시: 고유 프롬프트 {unique_prompts}개 / 클립 {len(pending_jobs)}개")
+            print(f"\n🎯 총 {len(pending_jobs)}개 오디오 클립 생성 중... (batch={batch_size})")
+            if profile is not None:
+                lengths = {}
+                for job in pending_jobs:
+                    lengths[job["seconds"]] = lengths.get(job["seconds"], 0) + 1
+                print("⏱️ 클립 길이: " + ", ".join(f"{s:g}s x {n}" for s, n in sorted(lengths.items())))
+            total_audio_generated = _run_clip_jobs(pipe, pending_jobs, batch_size, steps, guidance,
+                                                   clip_cache=clip_cache, embedding_cache=embedding_cache,
+                                                   segment_seconds=segment_seconds, overlap_seconds=overlap_seconds,
+                                                   work=work)
+        finally:
+            if pipe_key is not None:
+                release_model(pipe_key)
+    
+    for job in duplicate_jobs:
+        primary = unique_jobs[job["clip_key"]]
+        if "generation_order" in primary:
+            place_file(primary["out_path"], job["out_path"])
+            job["duplicate_of"] = f"{primary['base']}/{primary['out_name']}"
+            if work is not None:
+                complete(work, job["work_key"], {"output_file": f"{job['base']}/{job['out_name']}",
+                                                 "duplicate_of": job["duplicate_of"]})
+            print(f"    🔁 {job['base']}/{job['out_name']} <- {job['duplicate_of']}")
+    
+    elapsed = time.perf_counter() - start_time
+    clips_per_sec = total_audio_generated / elapsed if elapsed > 0 else 0.0
+    cache_hits = sum(1 for job in jobs if job.get("cache_hit"))
+    duplicates = sum(1 for job in jobs if job.get("duplicate_of"))
+    claimed_elsewhere = sum(1 for job in jobs if job.get("claimed_elsewhere"))
+    if clip_cache is not None:
+        evict_lru(clip_cache)
+    
+    # 사용된 프롬프트들을 시드/생성 순서와 함께 추적용으로 저장
+    for job in jobs:
+        images[job["base"]]["prompts"][job["idx"] - 1].update({
+            "output_file": job["out_name"],
+            "seconds": job["seconds"],
+            "global_seed": seed,
+            "clip_seed": job["seed"],
+            "generation_order": job.get("generation_order"),
+            "cache_hit": bool(job.get("cache_hit")),
+            "duplicate_of": job.get("duplicate_of"),
+        })
+        if work is not None:
+            images[job["base"]]["prompts"][job["idx"] - 1]["claimed_elsewhere"] = bool(job.get("claimed_elsewhere"))
+    # 공유 작업 디렉토리에서는 노드마다 자기 기준의 기록을 따로 저장
+    prompts_name = "prompts.json" if work is None else f"prompts.{sanitize_filename(work['worker_id'])}.json"
+    for base, image in images.items():
+        prompts_dump = os.path.join(image["out_dir"], prompts_name)
+        with open(prompts_dump, "w", encoding="utf-8") as f:
+            json.dump(image["prompts"], f, ensure_ascii=False, indent=2)
+        print(f"  📄 프롬프트 저장: {prompts_dump}")
+    if plan is not None:
+        write_plans(images, all_jobs, plan)
+    
+    if draft:
+        selection_path = _write_selection_template(result_dir, jobs, seed)
+        print(f"\n📝 Draft 선택 파일: {selection_path} (남길 클립의 주석을 지우고 --select로 전달)")
     
     print(f"\n🎉 오디오 생성 완료!")
-    print(f"📊 총 {total_audio_generated}개 오디오 파일 생성")
+    print(f"📊 총 {total_audio_generated}개 오디오 파일 생성, {cache_hits}개 캐시 재사용, {duplicates}개 중복 복제")
+    if work is not None:
+        print(f"🤝 다른 노드 처리 {claimed_elsewhere}개 (worker {work['worker_id']})")
+    print(f"⏱️ 생성 시간: {elapsed:.1f}s ({clips_per_sec:.3f} clips/sec, batch={batch_size})")
+    if clip_cache is not None:
+        stats = clip_cache_stats(clip_cache)
+        print(f"♻️ 클립 캐시: hit {stats['hits']} / miss {stats['misses']} "
+              f"(hit rate {stats['hit_rate']:.1%}), 제거 {stats['evictions']}개")
+    rss_mb = peak_rss_mb()
+    # torch가 import되지 않았으면 (모두 캐시 hit) CUDA도 사용되지 않음
+    torch = sys.modules.get("torch")
+    cuda_mb = None
+    if torch is not None and torch.cuda.is_available():
+        cuda_mb = torch.cuda.max_memory_allocated() / (1024 * 1024)
+    segmented = sum(1 for job in jobs if segment_seconds and job["seconds"] > segment_seconds)
+    memory_line = f"🧠 최대 RSS: {rss_mb:.0f} MB" if rss_mb is not None else "🧠 최대 RSS: 측정 불가"
+    if cuda_mb is not None:
+        memory_line += f", 최대 CUDA 메모리: {cuda_mb:.0f} MB"
+    print(memory_line)
     print(f"📁 결과 저장 위치: {result_dir}")
+    
+    return {
+        "clips": total_audio_generated,
+        "cache_hits": cache_hits,
+        "duplicates": duplicates,
+        "failed": len(jobs) - total_audio_generated - cache_hits - duplicates - claimed_elsewhere,
+        "claimed_elsewhere": claimed_elsewhere,
+        "work_claims": work_stats(work),
+        "batch_size": batch_size,
+        "scheduler": scheduler,
+        "steps": steps,
+        "draft": draft,
+        "plan": plan if plan is not None else {"enabled": False},
+        "duration_profile": duration_profile,
+        "audio_seconds_total": round(sum(job["seconds"] for job in jobs), 2),
+        "global_seed": seed,
+        "elapsed_seconds": round(elapsed, 3),
+        "clips_per_sec": round(clips_per_sec, 4),
+        "clip_cache": clip_cache_stats(clip_cache),
+        "embedding_cache": embedding_cache_stats(embedding_cache),
+        "worker_pool": worker_stats if worker_stats is not None else {"enabled": False},
+        "long_form": {
+            "segment_seconds": segment_seconds,
+            "overlap_seconds": overlap_seconds if segment_seconds else None,
+            "segmented_clips": segmented,
+        },
+        "peak_rss_mb": round(rss_mb, 1) if rss_mb is not None else None,
+        "peak_cuda_mb": round(cuda_mb, 1) if cuda_mb is not None else None,
+    }
 
 
 def run_generation(
@@ -190,10 +785,34 @@ def run_generation(
     guidance: float = 3.5,
     seed: int | None = None,
     single: str | None = None,
-) -> None:
+    batch_size: int = 1,
+    use_cache: bool = True,
+    refresh_cache: bool = False,
+    cache_dir: str = DEFAULT_CLIP_CACHE_DIR,
+    scheduler: str = "default",
+    embedding_cache_dir: str | None = None,
+    draft: bool = False,
+    draft_dir: str = "drafts",
+    draft_steps: int = 20,
+    draft_seconds: float = 2.0,
+    select: str | None = None,
+    min_confidence: float | None = None,
+    max_clips: int | None = None,
+    max_diffusion_seconds: float | None = None,
+    step_cost: float = DEFAULT_STEP_COST,
+    duration_profile: str | None = None,
+    workers: int = 0,
+    threads_per_worker: int | None = None,
+    segment_seconds: float | None = None,
+    overlap_seconds: float = 1.0,
+    work_dir: str | None = None,
+    worker_id: str | None = None,
+    lease_seconds: float = DEFAULT_LEASE_SECONDS,
+    pipe: AudioLDMPipeline | None = None,
+) -> Dict[str, Any] | None:
     """오디오 생성 실행"""
     try:
-        generate_audio_for_sound_sources(
+        return generate_audio_for_sound_sources(
             sound_source_dir=sound_source_dir,
             result_dir=result_dir,
             model_id=model_id,
@@ -202,11 +821,36 @@ def run_generation(
             guidance=guidance,
             seed=seed,
             single=single,
+            batch_size=batch_size,
+            use_cache=use_cache,
+            refresh_cache=refresh_cache,
+            cache_dir=cache_dir,
+            scheduler=scheduler,
+            embedding_cache_dir=embedding_cache_dir,
+            draft=draft,
+            draft_dir=draft_dir,
+            draft_steps=draft_steps,
+            draft_seconds=draft_seconds,
+            select=select,
+            min_confidence=min_confidence,
+            max_clips=max_clips,
+            max_diffusion_seconds=max_diffusion_seconds,
+            step_cost=step_cost,
+            duration_profile=duration_profile,
+            workers=workers,
+            threads_per_worker=threads_per_worker,
+            segment_seconds=segment_seconds,
+            overlap_seconds=overlap_seconds,
+            work_dir=work_dir,
+            worker_id=worker_id,
+            lease_seconds=lease_seconds,
+            pipe=pipe,
         )
     except Exception as e:
         print(f"❌ 오디오 생성 중 오류 발생: {str(e)}")
         import traceback
         traceback.print_exc()
+        return None
 
 
 if __name__ == "__main__":
@@ -219,8 +863,40 @@ if __name__ == "__main__":
     parser.add_argument("--seconds", type=float, default=4.0, help="오디오 길이 (초)")
     parser.add_argument("--steps", type=int, default=200, help="Diffusion 스텝 수")
     parser.add_argument("--guidance", type=float, default=3.5, help="Guidance scale")
-    parser.add_argument("--seed", type=int, default=None, help="랜덤 시드")
+    parser.add_argument("--seed", type=int, default=None, help="전역 시드 (클립별 시드를 유도, 생략 시 무작위로 뽑아 기록)")
     parser.add_argument("--single", type=str, default=None, help="단일 샘플: 이미지 이름 (예: 101) 또는 JSON 파일 경로")
+    parser.add_argument("--batch_size", type=int, default=1, help="한 번의 파이프라인 호출로 생성할 클립 수 (이미지 간 묶음)")
+    parser.add_argument("--no_cache", action="store_true", help="클립 캐시 사용 안 함")
+    parser.add_argument("--refresh", action="store_true", help="캐시를 무시하고 다시 생성 (결과는 캐시에 갱신)")
+    parser.add_argument("--cache_dir", type=str, default=DEFAULT_CLIP_CACHE_DIR, help="클립 캐시 디렉토리")
+    parser.add_argument("--scheduler", type=str, default=DEFAULT_SCHEDULER, choices=list(SCHEDULERS),
+                        help="Diffusion 스케줄러 (dpmpp: DPM-Solver++ multistep, 20~30 스텝 권장)")
+    parser.add_argument("--embed_cache", nargs="?", const=DEFAULT_EMBEDDING_CACHE_DIR, default=None,
+                        help=f"텍스트 임베딩 캐시 사용 (디렉토리 생략 시 {DEFAULT_EMBEDDING_CACHE_DIR})")
+    parser.add_argument("--draft", action="store_true", help="Draft 패스: 모든 클립을 저품질로 빠르게 생성")
+    parser.add_argument("--draft_dir", type=str, default="drafts", help="Draft 출력 디렉토리")
+    parser.add_argument("--draft_steps", type=int, default=20, help="Draft diffusion 스텝 수")
+    parser.add_argument("--draft_seconds", type=float, default=2.0, help="Draft 오디오 길이 (초)")
+    parser.add_argument("--select", type=str, default=None, help="최종 품질로 생성할 클립 목록 파일 (draft의 selection.txt)")
+    parser.add_argument("--min_confidence", type=float, default=None, help="이 confidence 이상인 variant만 생성")
+    parser.add_argument("--max_clips", type=int, default=None, help="예산: 우선순위 상위 N개 클립만 생성")
+    parser.add_argument("--max_diffusion_seconds", type=float, default=None, help="예산: 예상 diffusion 시간 합계 상한 (초)")
+    parser.add_argument("--step_cost", type=float, default=DEFAULT_STEP_COST,
+                        help="예산 추정용: 오디오 1초 x 스텝 1회의 소요 시간 (초)")
+    parser.add_argument("--durations", nargs="?", const="default", default=None,
+                        help="악기 매핑/play_method별 클립 길이 사용 (프로파일 JSON 경로 생략 시 기본 프로파일)")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="CPU 워커 프로세스 수 (각자 파이프라인 로드, 0이면 현재 프로세스에서 생성)")
+    parser.add_argument("--threads_per_worker", type=int, default=None,
+                        help="워커당 torch 스레드 수 (생략 시 CPU 코어 수 / 워커 수)")
+    parser.add_argument("--segment_seconds", type=float, default=None,
+                        help="이보다 긴 클립은 이 길이의 겹치는 세그먼트로 나눠 생성 (장시간 ambience용)")
+    parser.add_argument("--overlap_seconds", type=float, default=1.0, help="세그먼트 간 crossfade 길이 (초)")
+    parser.add_argument("--work_dir", type=str, default=None,
+                        help="여러 노드가 클립을 claim해 나눠 생성할 공유 작업 디렉토리")
+    parser.add_argument("--worker_id", type=str, default=None, help="공유 작업 디렉토리의 워커 이름 (생략 시 호스트-PID)")
+    parser.add_argument("--lease_seconds", type=float, default=DEFAULT_LEASE_SECONDS,
+                        help="하트비트가 끊긴 claim을 다른 노드가 가져가기까지의 시간 (초)")
     
     args = parser.parse_args()
 
@@ -238,4 +914,27 @@ if __name__ == "__main__":
         guidance=args.guidance,
         seed=args.seed,
         single=args.single,
+        batch_size=args.batch_size,
+        use_cache=not args.no_cache,
+        refresh_cache=args.refresh,
+        cache_dir=args.cache_dir,
+        scheduler=args.scheduler,
+        embedding_cache_dir=args.embed_cache,
+        draft=args.draft,
+        draft_dir=args.draft_dir,
+        draft_steps=args.draft_steps,
+        draft_seconds=args.draft_seconds,
+        select=args.select,
+        min_confidence=args.min_confidence,
+        max_clips=args.max_clips,
+        max_diffusion_seconds=args.max_diffusion_seconds,
+        step_cost=args.step_cost,
+        duration_profile=args.durations,
+        workers=args.workers,
+        threads_per_worker=args.threads_per_worker,
+        segment_seconds=args.segment_seconds,
+        overlap_seconds=args.overlap_seconds,
+        work_dir=args.work_dir,
+        worker_id=args.worker_id,
+        lease_seconds=args.lease_seconds,
     )
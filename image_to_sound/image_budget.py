@@ -0,0 +1,70 @@
+"""
+Qwen2-VL visual token 예산
+이미지 해상도에 비례해 늘어나는 visual token 수를 상한으로 묶는다.
+예산을 넘는 이미지는 한 번만 리사이즈해 이미지 해시별로 디스크에 저장하고 재사용한다.
+"""
+
+import os
+import math
+from typing import Optional, Tuple
+
+from PIL import Image
+
+from utils import ensure_dir, file_sha256
+
+
+# Qwen2-VL: 14px patch를 2x2로 병합하므로 visual token 1개 = 28x28 픽셀
+PIXELS_PER_TOKEN_SIDE = 28
+# Qwen2-VL image processor 기본 max_pixels
+PROCESSOR_DEFAULT_MAX_PIXELS = 12845056
+
+DEFAULT_RESIZE_CACHE_DIR = os.path.join(".cache", "resized_images")
+
+
+def max_pixels_for_tokens(max_visual_tokens: int) -> int:
+    """visual token 예산을 픽셀 수 상한으로 변환"""
+    return max_visual_tokens * PIXELS_PER_TOKEN_SIDE * PIXELS_PER_TOKEN_SIDE
+
+
+def fit_to_budget(width: int, height: int, max_pixels: int) -> Tuple[int, int]:
+    """processor의 smart_resize와 같은 규칙으로 (width, height)를 28의 배수 + 픽셀 상한에 맞춤"""
+    factor = PIXELS_PER_TOKEN_SIDE
+    h_bar = max(factor, round(height / factor) * factor)
+    w_bar = max(factor, round(width / factor) * factor)
+    if h_bar * w_bar > max_pixels:
+        beta = math.sqrt((height * width) / max_pixels)
+        h_bar = max(factor, math.floor(height / beta / factor) * factor)
+        w_bar = max(factor, math.floor(width / beta / factor) * factor)
+    return w_bar, h_bar
+
+
+def visual_token_count(size: Tuple[int, int], max_pixels: Optional[int] = None) -> int:
+    """이미지 (width, height)가 processor를 거친 뒤의 visual token 수"""
+    width, height = size
+    w_bar, h_bar = fit_to_budget(width, height, max_pixels or PROCESSOR_DEFAULT_MAX_PIXELS)
+    return (w_bar // PIXELS_PER_TOKEN_SIDE) * (h_bar // PIXELS_PER_TOKEN_SIDE)
+
+
+def load_image_with_budget(image_path: str, max_pixels: Optional[int] = None,
+                           cache_dir: str = DEFAULT_RESIZE_CACHE_DIR) -> Image.Image:
+    """RGB 이미지 로드 (예산 초과 시 리사이즈 결과를 해시별로 캐시)"""
+    if not max_pixels:
+        return Image.open(image_path).convert('RGB')
+
+    cached_path = os.path.join(cache_dir, f"{file_sha256(image_path)}_{max_pixels}.png")
+    if os.path.exists(cached_path):
+        return Image.open(cached_path).convert('RGB')
+
+    img = Image.open(image_path).convert('RGB')
+    width, height = img.size
+    if width * height <= max_pixels:
+        return img
+
+    target = fit_to_budget(width, height, max_pixels)
+    img = img.resize(target, Image.LANCZOS)
+
+    ensure_dir(cache_dir)
+    tmp_path = f"{cached_path}.{os.getpid()}.tmp"
+    img.save(tmp_path, format="PNG")
+    os.replace(tmp_path, cached_path)
+    return img
@@ -1,13 +1,36 @@
 import os
 import json
 import glob
+import time
 from datetime import datetime
 import traceback
-from typing import List, Dict, Any
+from itertools import chain, islice
+from typing import Callable, Iterator, List, Dict, Any, Tuple
 
-from vlm_qwen import load_qwen_vl, process_image_with_vlm
+# torch/transformers를 쓰는 vlm_qwen, vlm_prefetch는 모델이 실제로 필요한 함수 안에서 import
+# (--help, 캐시 hit, 저널 복원 경로는 무거운 프레임워크를 로드하지 않음)
+from vlm_config import (
+    DEFAULT_MODEL_ID,
+    DEFAULT_DRAFT_MODEL_ID,
+    GENERATION_KWARGS,
+    SNAPSHOT_CHECKS,
+    DEFAULT_SNAPSHOT_CHECK,
+    CPU_QUANT_MODES,
+    DEFAULT_CPU_QUANT,
+)
+from vlm_journal import journal_path, reset_journal, append_journal, restore_journaled_results
+from vlm_result_cache import (
+    DEFAULT_CACHE_DIR,
+    DEFAULT_MAX_BYTES,
+    create_result_cache,
+    lookup_result,
+    store_result,
+    cache_stats,
+)
 from vlm_prompt.extract_sources import get_scene_to_sound_prompt
-from utils import find_image_files, ensure_dir
+from model_registry import acquire_model, release_model
+from work_claims import DEFAULT_LEASE_SECONDS, open_work_dir, work_key, claim, complete, is_done, work_stats
+from utils import find_image_files, ensure_dir, sanitize_filename
 
 
 def find_images_in_data_folder(data_dir: str = "data") -> List[str]:
@@ -20,77 +43,180 @@ def find_images_in_data_folder(data_dir: str = "data") -> List[str]:
     return image_files
 
 
-def process_single_image(model, processor, image_path: str, output_dir: str, prompt: str, example_images: List) -> Dict[str, Any]:
+def _base_result(image_path: str) -> Dict[str, Any]:
+    """이미지별 결과 딕셔너리 기본값"""
+    return {
+        "image_path": image_path,
+        "filename": os.path.splitext(os.path.basename(image_path))[0],
+        "success": False,
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+def _error_result(image_path: str, e: Exception) -> Dict[str, Any]:
+    """처리 중 예외를 결과 딕셔너리로 변환"""
+    result = _base_result(image_path)
+    result.update({
+        "error": f"Processing error: {str(e)}",
+        "traceback": traceback.format_exc()
+    })
+    print(f"💥 오류: {str(e)}")
+    return result
+
+
+def save_parsed_result(image_path: str, output_dir: str, parsed: Dict[str, Any]) -> Dict[str, Any]:
+    """파싱된 VLM 응답을 검증하고 {base}_sound_source.json으로 저장"""
+    result = _base_result(image_path)
+    result["success"] = parsed['success']
+    base_name = result["filename"]
+    if parsed.get("generation_stats"):
+        result["generation_stats"] = parsed["generation_stats"]
+    
+    if parsed['success']:
+        json_data = parsed['json_data']
+        
+        # JSON 구조 검증
+        validation_issues = validate_json_structure(json_data)
+        total_variants = count_total_variants(json_data)
+        
+        result.update({
+            "json_data": json_data,
+            "total_variants": total_variants,
+            "validation_issues": validation_issues,
+            "meets_minimum_variants": total_variants >= 5,
+            "sound_sources_count": len(json_data.get('sound_sources', [])),
+            "scene_description": json_data.get('scene_description', 'N/A'),
+            "mood_description": json_data.get('mood_description', 'N/A')
+        })
+        
+        # 이미지별 폴더 생성
+        image_output_dir = os.path.join(output_dir, base_name)
+        os.makedirs(image_output_dir, exist_ok=True)
+        
+        # JSON 파일 저장
+        json_filename = f"{base_name}_sound_source.json"
+        json_path = os.path.join(image_output_dir, json_filename)
+        
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(json_data, f, indent=2, ensure_ascii=False)
+        
+        result["output_json_path"] = json_path
+        
+        print(f"✅ 성공! Variants: {total_variants}/5")
+        if total_variants < 5:
+            print(f"⚠️ 최소 요구사항 미달 (5개 미만)")
+        if validation_issues:
+            print(f"⚠️ 구조 문제: {len(validation_issues)}개")
+            
+    else:
+        result.update({
+            "error": parsed['error'],
+            "raw_response": parsed['raw_response']
+        })
+        print(f"❌ 실패: {parsed['error']}")
+    
+    return result
+
+
+def process_single_image(model, processor, image_path: str, output_dir: str, prompt: str, example_images: List,
+                         prefix_cache: Dict[str, Any] | None = None,
+                         result_cache: Dict[str, Any] | None = None,
+                         constrained: bool = False,
+                         prepared: Dict[str, Any] | None = None) -> Dict[str, Any]:
     """단일 이미지를 처리하여 sound source JSON 생성"""
-    print(f"\n처리 중: {os.path.basename(image_path)}")
+    from vlm_qwen import process_image_with_vlm
     
-    base_name = os.path.splitext(os.path.basename(image_path))[0]
+    print(f"\n처리 중: {os.path.basename(image_path)}")
     
     try:
         print("JSON 생성 중...")
         
         # VLM을 사용하여 이미지 처리
-        parsed = process_image_with_vlm(model, processor, image_path, prompt, example_images)
-        
-        result = {
-            "image_path": image_path,
-            "filename": base_name,
-            "success": parsed['success'],
-            "timestamp": datetime.now().isoformat()
-        }
-        
-        if parsed['success']:
-            json_data = parsed['json_data']
-            
-            # JSON 구조 검증
-            validation_issues = validate_json_structure(json_data)
-            total_variants = count_total_variants(json_data)
-            
-            result.update({
-                "json_data": json_data,
-                "total_variants": total_variants,
-                "validation_issues": validation_issues,
-                "meets_minimum_variants": total_variants >= 5,
-                "sound_sources_count": len(json_data.get('sound_sources', [])),
-                "scene_description": json_data.get('scene_description', 'N/A'),
-                "mood_description": json_data.get('mood_description', 'N/A')
-            })
-            
-            # 이미지별 폴더 생성
-            image_output_dir = os.path.join(output_dir, base_name)
-            os.makedirs(image_output_dir, exist_ok=True)
-            
-            # JSON 파일 저장
-            json_filename = f"{base_name}_sound_source.json"
-            json_path = os.path.join(image_output_dir, json_filename)
-            
-            with open(json_path, 'w', encoding='utf-8') as f:
-                json.dump(json_data, f, indent=2, ensure_ascii=False)
-            
-            result["output_json_path"] = json_path
-            
-            print(f"✅ 성공! Variants: {total_variants}/5")
-            if total_variants < 5:
-                print(f"⚠️ 최소 요구사항 미달 (5개 미만)")
-            if validation_issues:
-                print(f"⚠️ 구조 문제: {len(validation_issues)}개")
-                
-        else:
-            result.update({
-                "error": parsed['error'],
-                "raw_response": parsed['raw_response']
-            })
-            print(f"❌ 실패: {parsed['error']}")
+        parsed = process_image_with_vlm(model, processor, image_path, prompt, example_images,
+                                        prefix_cache=prefix_cache, constrained=constrained,
+                                        prepared=prepared)
+        if result_cache is not None:
+            store_result(result_cache, image_path, prompt, parsed)
+        return save_parsed_result(image_path, output_dir, parsed)
             
     except Exception as e:
-        result.update({
-            "success": False,
-            "error": f"Processing error: {str(e)}",
-            "traceback": traceback.format_exc()
-        })
-        print(f"💥 오류: {str(e)}")
+        return _error_result(image_path, e)
+
+
+def process_image_batch(model, processor, image_paths: List[str], output_dir: str, prompt: str,
+                        example_images: List, result_cache: Dict[str, Any] | None = None,
+                        constrained: bool = False) -> List[Dict[str, Any]]:
+    """여러 이미지를 한 번의 generate 호출로 처리 (이미지별 실패는 서로 독립)"""
+    from vlm_qwen import process_images_with_vlm_batch
     
-    return result
+    print(f"\n배치 처리 중 ({len(image_paths)}개): {', '.join(os.path.basename(p) for p in image_paths)}")
+    print("JSON 생성 중...")
+    
+    try:
+        parsed_list = process_images_with_vlm_batch(model, processor, image_paths, prompt, example_images,
+                                                    constrained=constrained)
+    except Exception as e:
+        return [_error_result(image_path, e) for image_path in image_paths]
+    
+    results = []
+    for image_path, parsed in zip(image_paths, parsed_list):
+        print(f"  [{os.path.basename(image_path)}] ", end="")
+        try:
+            if result_cache is not None:
+                store_result(result_cache, image_path, prompt, parsed)
+            results.append(save_parsed_result(image_path, output_dir, parsed))
+        except Exception as e:
+            results.append(_error_result(image_path, e))
+    return results
+
+
+def restore_cached_results(image_files: List[str], output_dir: str, prompt: str,
+                           result_cache: Dict[str, Any] | None) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+    """캐시에 결과가 있는 이미지는 VLM 없이 복원하고, 처리해야 할 이미지 목록을 반환"""
+    if result_cache is None:
+        return {}, list(image_files)
+    
+    restored = {}
+    pending = []
+    for image_path in image_files:
+        try:
+            parsed = lookup_result(result_cache, image_path, prompt)
+        except OSError as e:
+            print(f"⚠️ 캐시 조회 실패 ({os.path.basename(image_path)}): {str(e)}")
+            parsed = None
+        
+        if parsed is None:
+            pending.append(image_path)
+            continue
+        
+        print(f"♻️ 캐시 사용: {os.path.basename(image_path)} ", end="")
+        result = save_parsed_result(image_path, output_dir, parsed)
+        result["cache_hit"] = True
+        restored[image_path] = result
+    
+    return restored, pending
+
+
+def claim_pending_images(work: Dict[str, Any], image_files: List[str], data_dir: str, output_dir: str,
+                         prompt: str, result_cache: Dict[str, Any] | None,
+                         record_result: Callable[[str, Dict[str, Any]], None]) -> Iterator[str]:
+    """공유 작업 디렉토리에서 이미지를 하나씩 claim해 VLM이 처리할 이미지만 반환 (소비할 때마다 다음 claim)
+
+    claim한 이미지가 캐시에 있으면 VLM 없이 복원해 기록하고 다음 이미지로 넘어간다.
+    """
+    for image_path in image_files:
+        if not claim(work, image_work_key(image_path, data_dir)):
+            continue
+        restored, _ = restore_cached_results([image_path], output_dir, prompt, result_cache)
+        if image_path in restored:
+            record_result(image_path, restored[image_path])
+            continue
+        yield image_path
+
+
+def image_work_key(image_path: str, data_dir: str) -> str:
+    """공유 작업 디렉토리의 이미지 키 (data_dir 기준 상대 경로라 노드마다 마운트 위치가 달라도 같음)"""
+    return work_key(os.path.relpath(image_path, data_dir))
 
 
 def count_total_variants(json_data: Dict[str, Any]) -> int:
@@ -133,22 +259,80 @@ def validate_json_structure(json_data: Dict[str, Any]) -> List[str]:
     return issues
 
 
-def batch_process_images(data_dir: str = "data", output_dir: str = "sound_sources") -> Dict[str, Any]:
-    """data 폴더의 모든 이미지를 배치 처리"""
+def _cache_model_id(cpu_quant: str) -> str:
+    """결과 캐시 키에 쓰는 모델 식별자 (양자화 모드는 출력이 달라지므로 구분)"""
+    return DEFAULT_MODEL_ID if cpu_quant == "none" else f"{DEFAULT_MODEL_ID}+cpu-{cpu_quant}"
+
+
+def _cache_generation_kwargs(constrained: bool, max_visual_tokens: int | None) -> Dict[str, Any]:
+    """결과 캐시 키에 쓰는 생성 설정 (출력에 영향을 주는 옵션 포함)"""
+    return {**GENERATION_KWARGS, "constrained": constrained, "max_visual_tokens": max_visual_tokens}
+
+
+def _vlm_registry_key(cpu_quant: str, max_visual_tokens: int | None, draft_model: str | None) -> str:
+    """모델 레지스트리 키 (로드 결과가 달라지는 옵션 포함)"""
+    return f"vlm:{_cache_model_id(cpu_quant)}:visual={max_visual_tokens}:draft={draft_model}"
+
+
+def acquire_vlm(snapshot_check: str = "size", cpu_quant: str = "none", max_visual_tokens: int | None = None,
+                draft_model: str | None = None) -> Tuple[str, Any, Any]:
+    """레지스트리에서 VLM을 받아 (레지스트리 키, model, processor) 반환 (상주 중이 아니면 로드)
+
+    사용이 끝나면 release_model(키)로 반납한다.
+    """
+    def load():
+        from vlm_qwen import load_qwen_vl
+
+        print("VLM 모델 로딩 중...")
+        model, processor = load_qwen_vl(snapshot_check=snapshot_check, cpu_quant=cpu_quant,
+                                        max_visual_tokens=max_visual_tokens, draft_model_id=draft_model)
+        print(f"✅ VLM 모델 로드 완료! Device: {model.device}")
+        return model, processor
+
+    key = _vlm_registry_key(cpu_quant, max_visual_tokens, draft_model)
+    model, processor = acquire_model(key, load)
+    return key, model, processor
+
+
+def batch_process_images(data_dir: str = "data", output_dir: str = "sound_sources",
+                         use_prefix_cache: bool = False, vlm_batch_size: int = 1,
+                         use_cache: bool = True, refresh_cache: bool = False,
+                         cache_dir: str = DEFAULT_CACHE_DIR, cache_max_bytes: int = DEFAULT_MAX_BYTES,
+                         constrained: bool = False, snapshot_check: str = "size",
+                         cpu_quant: str = "none", max_visual_tokens: int | None = None,
+                         prefetch_depth: int = 0, prefetch_workers: int = 1,
+                         draft_model: str | None = None, resume: bool = False,
+                         on_result: Callable[[str, Dict[str, Any]], None] | None = None,
+                         work_dir: str | None = None, worker_id: str | None = None,
+                         lease_seconds: float = DEFAULT_LEASE_SECONDS) -> Dict[str, Any]:
+    """data 폴더의 모든 이미지를 배치 처리 (prefetch_depth > 0이면 다음 이미지 전처리를 미리 수행)
+
+    이미지별 결과는 끝나는 즉시 저널(JSONL)에 기록되며, resume=True면 이전 실행에서
+    출력 JSON과 입력 해시가 그대로인 이미지는 건너뛰고 저널에서 결과를 복원한다.
+    on_result가 주어지면 이미지별 결과(복원/캐시 hit 포함)가 확정되는 즉시 (이미지 경로, 결과)로 호출한다.
+
+    work_dir(공유 파일시스템)가 주어지면 여러 노드가 이미지를 하나씩 claim해 나눠 처리한다. 저널 대신
+    작업 디렉토리의 완료 기록으로 이어서 처리하며, 요약에는 이 노드가 처리한 이미지만 포함된다.
+    """
     print("🚀 배치 Sound Source 생성 시작")
     print("=" * 80)
 
     ensure_dir(output_dir)
     print(f"출력 디렉토리: {output_dir}")
     
-    # VLM 모델 로드
-    print("VLM 모델 로딩 중...")
-    model, processor = load_qwen_vl()
-    print(f"✅ VLM 모델 로드 완료! Device: {model.device}")
-    
     # 프롬프트 및 예시 데이터 로드
     prompt, example_images = get_scene_to_sound_prompt()
     print(f"✅ 프롬프트 로드 완료! 예시 이미지: {len(example_images)}개")
+    
+    # 결과 캐시 (이미지/프롬프트/모델/생성 파라미터 기준)
+    result_cache = None
+    if use_cache:
+        result_cache = create_result_cache(
+            cache_dir, model_id=_cache_model_id(cpu_quant),
+            generation_kwargs=_cache_generation_kwargs(constrained, max_visual_tokens),
+            max_bytes=cache_max_bytes, refresh=refresh_cache
+        )
+        print(f"✅ 결과 캐시: {cache_dir} (refresh={refresh_cache})")
   
     # data 폴더에서 이미지 파일 찾기
     image_files = find_images_in_data_folder(data_dir)
@@ -162,6 +346,11 @@ def batch_process_images(data_dir: str = "data", output_dir: str = "sound_source
     for img_file in image_files:
         print(f"  - {os.path.basename(img_file)}")
     
+    work = None
+    if work_dir:
+        work = open_work_dir(work_dir, "vlm", worker_id=worker_id, lease_seconds=lease_seconds)
+        print(f"🤝 공유 작업 디렉토리: {work_dir} (worker={work['worker_id']}, lease={lease_seconds:.0f}s)")
+    
     # 결과 저장용
     all_results = []
     successful_results = []
@@ -173,10 +362,133 @@ def batch_process_images(data_dir: str = "data", output_dir: str = "sound_source
     print("이미지 처리 시작")
     print("=" * 80)
     
-    for i, image_path in enumerate(image_files, 1):
-        print(f"\n[{i}/{len(image_files)}]", end="")
+    start_time = time.perf_counter()
+    
+    # 저널: resume이면 이전 실행에서 끝난 이미지를 복원, 아니면 새 저널 시작
+    # (공유 작업 디렉토리에서는 완료 기록이 저널 역할을 하므로 다른 노드가 끝낸 이미지는 건너뜀)
+    if work is not None:
+        results_by_path = {}
+        remaining_files = [p for p in image_files if not is_done(work, image_work_key(p, data_dir))]
+        print(f"\n🤝 완료 기록 {len(image_files) - len(remaining_files)}개 / 남은 이미지 {len(remaining_files)}개")
+    elif resume:
+        results_by_path, remaining_files = restore_journaled_results(image_files, output_dir)
+        print(f"\n📒 저널 복원 {len(results_by_path)}개 / 남은 이미지 {len(remaining_files)}개")
+    else:
+        reset_journal(output_dir)
+        results_by_path, remaining_files = {}, list(image_files)
+    resumed_count = len(results_by_path)
+    if on_result is not None:
+        for image_path, result in results_by_path.items():
+            on_result(image_path, result)
+    
+    def record_result(image_path: str, result: Dict[str, Any]) -> None:
+        results_by_path[image_path] = result
+        if work is None:
+            append_journal(output_dir, image_path, result)
+        else:
+            complete(work, image_work_key(image_path, data_dir), {
+                "image_path": os.path.relpath(image_path, data_dir),
+                "success": result.get("success"),
+                "output_json_path": result.get("output_json_path"),
+            })
+        if on_result is not None:
+            on_result(image_path, result)
+    
+    if work is not None:
+        # 처리 직전에 하나씩 claim (빠른 노드가 더 많이 가져가므로 노드 수에 비례해 처리량 증가)
+        pending_files = claim_pending_images(work, remaining_files, data_dir, output_dir, prompt, result_cache,
+                                             record_result)
+        first = next(pending_files, None)
+        pending_files = chain([first], pending_files) if first is not None else []
+        pending_total = len(remaining_files)
+    else:
+        # 캐시 hit 이미지는 VLM 없이 복원
+        cached_results, pending_files = restore_cached_results(remaining_files, output_dir, prompt, result_cache)
+        for image_path, result in cached_results.items():
+            record_result(image_path, result)
+        if result_cache is not None:
+            print(f"\n♻️ 캐시 hit {len(cached_results)}개 / 처리 대상 {len(pending_files)}개")
+        pending_total = len(pending_files)
+    
+    vlm_batch_size = max(1, vlm_batch_size)
+    prefix_cache = None
+    model_load = None
+    vlm_key = None
+    
+    if pending_files:
+        # VLM 모델 로드 (처리할 이미지가 있을 때만, 레지스트리에 상주 중이면 재사용)
+        from vlm_qwen import get_few_shot_prefix_cache
         
-        result = process_single_image(model, processor, image_path, output_dir, prompt, example_images)
+        if draft_model and constrained:
+            # JSON 제약 processor는 거절된 draft 토큰을 되돌릴 수 없으므로 draft 모델을 로드하지 않음
+            print("⚠️ JSON 제약 디코딩에서는 speculative decoding을 사용하지 않습니다. draft 모델을 무시합니다.")
+            draft_model = None
+        vlm_key, model, processor = acquire_vlm(snapshot_check=snapshot_check, cpu_quant=cpu_quant,
+                                                max_visual_tokens=max_visual_tokens, draft_model=draft_model)
+        model_load = getattr(model, "load_timings", None)
+        
+        # Few-shot prefix KV cache (모델 로드당 한 번 계산)
+        if use_prefix_cache and vlm_batch_size > 1:
+            print("⚠️ prefix cache는 배치 크기 1에서만 사용됩니다. 배치 모드로 진행합니다.")
+        if use_prefix_cache and vlm_batch_size == 1:
+            prefix_cache = get_few_shot_prefix_cache(model, processor, example_images)
+        if prefetch_depth > 0 and vlm_batch_size > 1:
+            print("⚠️ prefetch는 배치 크기 1에서만 사용됩니다. 배치 모드로 진행합니다.")
+        if draft_model and (vlm_batch_size > 1 or prefix_cache is not None):
+            print("⚠️ speculative decoding은 배치 크기 1, prefix cache 미사용 시에만 적용됩니다.")
+    
+    use_prefetch = prefetch_depth > 0 and vlm_batch_size == 1 and bool(pending_files)
+    if use_prefetch:
+        # 현재 이미지 생성 중 다음 prefetch_depth개 이미지의 디코딩/전처리를 백그라운드에서 수행
+        from vlm_prefetch import prefetch_vlm_inputs
+        
+        print(f"\n⏩ 이미지 prefetch: depth={prefetch_depth}, workers={prefetch_workers}")
+        prefetched = prefetch_vlm_inputs(pending_files, processor, prompt, example_images,
+                                         prefix_cache=prefix_cache, depth=prefetch_depth,
+                                         num_workers=prefetch_workers)
+        for i, (image_path, prepared, error) in enumerate(prefetched):
+            print(f"\n[{i + 1}/{pending_total}]", end="")
+            if error is not None:
+                # 전처리 실패 시 일반 경로에서 다시 시도해 기존과 같은 방식으로 오류 처리
+                print(f" ⚠️ prefetch 실패, 동기 처리로 전환: {str(error)}")
+            record_result(image_path, process_single_image(
+                model, processor, image_path, output_dir, prompt, example_images,
+                prefix_cache=prefix_cache, result_cache=result_cache, constrained=constrained,
+                prepared=prepared
+            ))
+    
+    else:
+        pending_iter = iter(pending_files)
+        i = 0
+        while True:
+            chunk = list(islice(pending_iter, vlm_batch_size))
+            if not chunk:
+                break
+            print(f"\n[{i + 1}-{i + len(chunk)}/{pending_total}]", end="")
+            i += len(chunk)
+            
+            if vlm_batch_size == 1:
+                chunk_results = [
+                    process_single_image(model, processor, chunk[0], output_dir, prompt, example_images,
+                                         prefix_cache=prefix_cache, result_cache=result_cache,
+                                         constrained=constrained)
+                ]
+            else:
+                chunk_results = process_image_batch(model, processor, chunk, output_dir, prompt, example_images,
+                                                    result_cache=result_cache, constrained=constrained)
+            
+            for image_path, result in zip(chunk, chunk_results):
+                record_result(image_path, result)
+    
+    if vlm_key is not None:
+        # 반납 후 다음 단계 모델이 메모리 예산을 넘기면 레지스트리가 VLM을 해제
+        release_model(vlm_key)
+    
+    for image_path in image_files:
+        if image_path not in results_by_path:
+            # 다른 노드가 처리한 이미지
+            continue
+        result = results_by_path[image_path]
         all_results.append(result)
         
         if result['success']:
@@ -186,19 +498,79 @@ def batch_process_images(data_dir: str = "data", output_dir: str = "sound_source
         else:
             failed_results.append(result)
     
+    elapsed = time.perf_counter() - start_time
+    images_per_sec = len(all_results) / elapsed if elapsed > 0 else 0.0
+    
+    token_counts = [
+        r["generation_stats"]["generated_tokens"]
+        for r in all_results if "generated_tokens" in r.get("generation_stats", {})
+    ]
+    avg_generated_tokens = sum(token_counts) / len(token_counts) if token_counts else 0.0
+    
+    visual_token_counts = [
+        r["generation_stats"]["visual_tokens"]
+        for r in all_results if "visual_tokens" in r.get("generation_stats", {})
+    ]
+    
+    def _avg_stat(key: str) -> float:
+        values = [r["generation_stats"][key] for r in all_results if key in r.get("generation_stats", {})]
+        return round(sum(values) / len(values), 3) if values else 0.0
+    
+    speculative_stats = [
+        r["generation_stats"]["speculative"]
+        for r in all_results if "speculative" in r.get("generation_stats", {})
+    ]
+    draft_tokens = sum(s["draft_tokens"] for s in speculative_stats)
+    accepted_tokens = sum(s["accepted_tokens"] for s in speculative_stats)
+    
     # 종합 결과 저장
     summary = {
         "processing_info": {
             "timestamp": datetime.now().isoformat(),
-            "total_images": len(image_files),
+            "total_images": len(all_results),
             "successful": len(successful_results),
             "failed": len(failed_results),
-            "insufficient_variants": len(insufficient_variants)
+            "insufficient_variants": len(insufficient_variants),
+            "resumed": resumed_count,
+            "journal": journal_path(output_dir) if work is None else None,
+            "work_claims": work_stats(work),
+            "prefix_cache": prefix_cache is not None,
+            "vlm_batch_size": vlm_batch_size,
+            "elapsed_seconds": round(elapsed, 3),
+            "images_per_sec": round(images_per_sec, 4),
+            "result_cache": cache_stats(result_cache),
+            "constrained": constrained,
+            "avg_generated_tokens": round(avg_generated_tokens, 1),
+            "max_visual_tokens": max_visual_tokens,
+            "visual_tokens": {
+                "per_image": {r["filename"]: r["generation_stats"]["visual_tokens"]
+                              for r in all_results if "visual_tokens" in r.get("generation_stats", {})},
+                "avg": round(sum(visual_token_counts) / len(visual_token_counts), 1) if visual_token_counts else 0.0,
+                "max": max(visual_token_counts) if visual_token_counts else 0
+            },
+            "prefetch": {
+                "enabled": use_prefetch,
+                "depth": prefetch_depth if use_prefetch else 0,
+                "workers": prefetch_workers if use_prefetch else 0,
+                "avg_preprocess_seconds": _avg_stat("preprocess_seconds"),
+                "avg_wait_seconds": _avg_stat("prefetch_wait_seconds")
+            },
+            "speculative": {
+                "draft_model": draft_model,
+                "images": len(speculative_stats),
+                "acceptance_rate": round(accepted_tokens / draft_tokens, 4) if draft_tokens else 0.0,
+                "avg_elapsed_seconds": _avg_stat("elapsed_seconds")
+            },
+            "model_load": model_load
         },
         "results": all_results
     }
     
-    summary_path = os.path.join(output_dir, "processing_summary.json")
+    summary_name = "processing_summary.json"
+    if work is not None:
+        # 노드마다 자기가 처리한 이미지의 요약을 따로 저장
+        summary_name = f"processing_summary.{sanitize_filename(work['worker_id'])}.json"
+    summary_path = os.path.join(output_dir, summary_name)
     with open(summary_path, 'w', encoding='utf-8') as f:
         json.dump(summary, f, indent=2, ensure_ascii=False)
     
@@ -206,11 +578,24 @@ def batch_process_images(data_dir: str = "data", output_dir: str = "sound_source
     print("\n" + "=" * 80)
     print("📊 최종 처리 결과")
     print("=" * 80)
-    print(f"📸 총 이미지 수: {len(image_files)}")
+    print(f"📸 총 이미지 수: {len(all_results)}")
     print(f"✅ 성공: {len(successful_results)}")
     print(f"❌ 실패: {len(failed_results)}")
     print(f"⚠️ Variants 부족 (5개 미만): {len(insufficient_variants)}")
+    print(f"⏱️ 처리 시간: {elapsed:.1f}s ({images_per_sec:.3f} images/sec, batch={vlm_batch_size})")
+    print(f"⏱️ 이미지당 전처리: {_avg_stat('preprocess_seconds'):.3f}s, "
+          f"prefetch 대기: {_avg_stat('prefetch_wait_seconds'):.3f}s")
+    if speculative_stats:
+        acceptance_rate = summary["processing_info"]["speculative"]["acceptance_rate"]
+        print(f"⚡ Speculative ({draft_model}): 수락률 {acceptance_rate:.2%} ({accepted_tokens}/{draft_tokens}), "
+              f"이미지당 {_avg_stat('elapsed_seconds'):.2f}s")
     print(f"📁 요약 파일: {summary_path}")
+    if work is None:
+        print(f"📒 저널: {journal_path(output_dir)} (이어서 처리로 복원: {resumed_count}개)")
+    else:
+        claims = work_stats(work)
+        print(f"🤝 claim {claims['claimed']}개 (만료 회수 {claims['taken_over']}개), "
+              f"다른 노드 처리/완료 {claims['skipped']}개 - worker {claims['worker_id']}")
     
     if insufficient_variants:
         print("\n🔍 Variants 부족 파일들:")
@@ -222,9 +607,11 @@ def batch_process_images(data_dir: str = "data", output_dir: str = "sound_source
         for result in failed_results:
             print(f"  - {result['filename']}: {result.get('error', 'Unknown error')}")
     
-    # 성공률 계산
-    success_rate = (len(successful_results) / len(image_files)) * 100
-    minimum_variants_rate = ((len(successful_results) - len(insufficient_variants)) / len(image_files)) * 100
+    # 성공률 계산 (공유 작업 디렉토리에서는 이 노드가 처리한 이미지 기준)
+    processed_count = len(all_results)
+    success_rate = (len(successful_results) / processed_count) * 100 if processed_count else 0.0
+    minimum_variants_rate = (((len(successful_results) - len(insufficient_variants)) / processed_count) * 100
+                             if processed_count else 0.0)
     
     print(f"\n📈 성공률: {success_rate:.1f}%")
     print(f"📈 최소 요구사항 충족률: {minimum_variants_rate:.1f}%")
@@ -237,20 +624,50 @@ def batch_process_images(data_dir: str = "data", output_dir: str = "sound_source
     }
 
 
-def process_single_image_with_vlm(image_path: str, output_dir: str) -> Dict[str, Any]:
+def process_single_image_with_vlm(image_path: str, output_dir: str, use_prefix_cache: bool = False,
+                                  use_cache: bool = True, refresh_cache: bool = False,
+                                  cache_dir: str = DEFAULT_CACHE_DIR,
+                                  cache_max_bytes: int = DEFAULT_MAX_BYTES,
+                                  constrained: bool = False, snapshot_check: str = "size",
+                                  cpu_quant: str = "none", max_visual_tokens: int | None = None,
+                                  draft_model: str | None = None) -> Dict[str, Any]:
     """단일 이미지를 VLM으로 처리하는 고수준 함수"""
     try:
-        # VLM 모델 로드
-        print("VLM 모델 로딩 중...")
-        model, processor = load_qwen_vl()
-        print(f"✅ VLM 모델 로드 완료! Device: {model.device}")
-        
         # 프롬프트 및 예시 데이터 로드
         prompt, example_images = get_scene_to_sound_prompt()
         print(f"✅ 프롬프트 로드 완료! 예시 이미지: {len(example_images)}개")
         
-        # 단일 이미지 처리
-        result = process_single_image(model, processor, image_path, output_dir, prompt, example_images)
+        # 캐시 hit이면 모델 로드 없이 결과 복원
+        result_cache = None
+        if use_cache:
+            result_cache = create_result_cache(
+                cache_dir, model_id=_cache_model_id(cpu_quant),
+                generation_kwargs=_cache_generation_kwargs(constrained, max_visual_tokens),
+                max_bytes=cache_max_bytes, refresh=refresh_cache
+            )
+            restored, _ = restore_cached_results([image_path], output_dir, prompt, result_cache)
+            if image_path in restored:
+                return restored[image_path]
+        
+        # VLM 모델 로드 (레지스트리에 상주 중이면 재사용)
+        from vlm_qwen import get_few_shot_prefix_cache
+        
+        if draft_model and constrained:
+            # JSON 제약 processor는 거절된 draft 토큰을 되돌릴 수 없으므로 draft 모델을 로드하지 않음
+            print("⚠️ JSON 제약 디코딩에서는 speculative decoding을 사용하지 않습니다. draft 모델을 무시합니다.")
+            draft_model = None
+        vlm_key, model, processor = acquire_vlm(snapshot_check=snapshot_check, cpu_quant=cpu_quant,
+                                                max_visual_tokens=max_visual_tokens, draft_model=draft_model)
+        try:
+            prefix_cache = get_few_shot_prefix_cache(model, processor, example_images) if use_prefix_cache else None
+            
+            # 단일 이미지 처리
+            result = process_single_image(model, processor, image_path, output_dir, prompt, example_images,
+                                          prefix_cache=prefix_cache, result_cache=result_cache,
+                                          constrained=constrained)
+        finally:
+            release_model(vlm_key)
+        result["model_load"] = getattr(model, "load_timings", None)
         return result
         
     except Exception as e:
@@ -264,10 +681,24 @@ def process_single_image_with_vlm(image_path: str, output_dir: str) -> Dict[str,
         }
 
 
-def run_batch_processing():
+def run_batch_processing(data_dir: str = "data", output_dir: str = "sound_sources", use_prefix_cache: bool = False,
+                         vlm_batch_size: int = 1, use_cache: bool = True, refresh_cache: bool = False,
+                         cache_dir: str = DEFAULT_CACHE_DIR, constrained: bool = False,
+                         snapshot_check: str = "size", cpu_quant: str = "none",
+                         max_visual_tokens: int | None = None, prefetch_depth: int = 0,
+                         prefetch_workers: int = 1, draft_model: str | None = None,
+                         resume: bool = False, work_dir: str | None = None, worker_id: str | None = None,
+                         lease_seconds: float = DEFAULT_LEASE_SECONDS):
     """배치 처리 실행"""
     try:
-        results = batch_process_images()
+        results = batch_process_images(data_dir, output_dir, use_prefix_cache=use_prefix_cache,
+                                       vlm_batch_size=vlm_batch_size, use_cache=use_cache,
+                                       refresh_cache=refresh_cache, cache_dir=cache_dir,
+                                       constrained=constrained, snapshot_check=snapshot_check,
+                                       cpu_quant=cpu_quant, max_visual_tokens=max_visual_tokens,
+                                       prefetch_depth=prefetch_depth, prefetch_workers=prefetch_workers,
+                                       draft_model=draft_model, resume=resume, work_dir=work_dir,
+                                       worker_id=worker_id, lease_seconds=lease_seconds)
         return results
     except Exception as e:
         print(f"❌ 배치 처리 중 오류 발생: {str(e)}")
@@ -283,16 +714,45 @@ if __name__ == "__main__":
     parser.add_argument("--single", type=str, default=None, help="단일 이미지 경로 (예: data/101.jpg)")
     parser.add_argument("--out", type=str, default="sound_sources", help="출력 디렉토리")
     parser.add_argument("--data", type=str, default="data", help="입력 데이터 디렉토리")
+    parser.add_argument("--prefix_cache", action="store_true", help="Few-shot prefix KV cache 재사용")
+    parser.add_argument("--vlm_batch_size", type=int, default=1, help="한 번의 generate 호출로 처리할 이미지 수")
+    parser.add_argument("--no_cache", action="store_true", help="결과 캐시 사용 안 함")
+    parser.add_argument("--refresh", action="store_true", help="캐시를 무시하고 다시 생성 (결과는 캐시에 갱신)")
+    parser.add_argument("--cache_dir", type=str, default=DEFAULT_CACHE_DIR, help="결과 캐시 디렉토리")
+    parser.add_argument("--constrained", action="store_true", help="Sound source JSON 스키마 제약 디코딩")
+    parser.add_argument("--snapshot_check", type=str, default=DEFAULT_SNAPSHOT_CHECK, choices=SNAPSHOT_CHECKS,
+                        help="모델 스냅샷 확인 방식 (size/hash: 로컬 확인 후 누락 시만 다운로드, download: 항상 동기화)")
+    parser.add_argument("--cpu_quant", type=str, default=DEFAULT_CPU_QUANT, choices=CPU_QUANT_MODES,
+                        help="CPU 전용 환경의 양자화 모드 (bf16 가중치 / 동적 int8 Linear)")
+    parser.add_argument("--max_visual_tokens", type=int, default=None,
+                        help="이미지당 visual token 상한 (초과 이미지는 리사이즈 후 캐시)")
+    parser.add_argument("--prefetch", type=int, default=0,
+                        help="생성 중 미리 디코딩/전처리할 다음 이미지 수 (0: 사용 안 함)")
+    parser.add_argument("--prefetch_workers", type=int, default=1, help="prefetch 스레드 수")
+    parser.add_argument("--draft_model", type=str, nargs="?", const=DEFAULT_DRAFT_MODEL_ID, default=None,
+                        help=f"Speculative decoding draft 모델 (값 생략 시 {DEFAULT_DRAFT_MODEL_ID})")
+    parser.add_argument("--resume", action="store_true",
+                        help="중단된 배치 이어서 처리 (저널에 완료된 이미지는 건너뜀)")
+    parser.add_argument("--work_dir", type=str, default=None,
+                        help="여러 노드가 이미지를 claim해 나눠 처리할 공유 작업 디렉토리")
+    parser.add_argument("--worker_id", type=str, default=None, help="공유 작업 디렉토리의 워커 이름 (생략 시 호스트-PID)")
+    parser.add_argument("--lease_seconds", type=float, default=DEFAULT_LEASE_SECONDS,
+                        help="하트비트가 끊긴 claim을 다른 노드가 가져가기까지의 시간 (초)")
     args = parser.parse_args()
 
     print("🚀 Sound Source 생성기")
-    print(f"ARGS: single={args.single}, out={args.out}, data={args.data}")
+    print(f"ARGS: single={args.single}, out={args.out}, data={args.data}, prefix_cache={args.prefix_cache}")
 
     if args.single:
         print("모드: 단일 이미지 처리")
         ensure_dir(args.out)
         
-        res = process_single_image_with_vlm(args.single, args.out)
+        res = process_single_image_with_vlm(args.single, args.out, use_prefix_cache=args.prefix_cache,
+                                            use_cache=not args.no_cache, refresh_cache=args.refresh,
+                                            cache_dir=args.cache_dir, constrained=args.constrained,
+                                            snapshot_check=args.snapshot_check, cpu_quant=args.cpu_quant,
+                                            max_visual_tokens=args.max_visual_tokens,
+                                            draft_model=args.draft_model)
         if res.get("success"):
             print("\n🎉 단일 처리 완료!")
             print(f"JSON: {res.get('output_json_path')}")
@@ -301,7 +761,15 @@ if __name__ == "__main__":
     else:
         print("모드: 배치 처리")
         # 배치 처리 실행
-        results = run_batch_processing()
+        results = run_batch_processing(args.data, args.out, use_prefix_cache=args.prefix_cache,
+                                       vlm_batch_size=args.vlm_batch_size, use_cache=not args.no_cache,
+                                       refresh_cache=args.refresh, cache_dir=args.cache_dir,
+                                       constrained=args.constrained, snapshot_check=args.snapshot_check,
+                                       cpu_quant=args.cpu_quant, max_visual_tokens=args.max_visual_tokens,
+                                       prefetch_depth=args.prefetch, prefetch_workers=args.prefetch_workers,
+                                       draft_model=args.draft_model, resume=args.resume,
+                                       work_dir=args.work_dir, worker_id=args.worker_id,
+                                       lease_seconds=args.lease_seconds)
         if results:
             print("\n🎉 배치 처리 완료!")
             print("생성된 파일들을 'sound_sources' 디렉토리에서 확인하세요.")
@@ -0,0 +1,82 @@
+"""
+Import 시간 예산 확인
+`python -X importtime main.py --help`를 실행해 최상위 import의 누적 시간을 합산하고,
+예산을 넘거나 무거운 프레임워크(torch, transformers, diffusers 등)가 import되면 0이 아닌 코드로 종료한다.
+"""
+
+import os
+import sys
+import subprocess
+from typing import Dict, Any, List
+
+
+# --help / 의존성 확인 / 단계 건너뛰기 경로에서 import되면 안 되는 모듈
+HEAVY_MODULES = ("torch", "transformers", "diffusers", "scipy", "numpy", "PIL", "huggingface_hub")
+DEFAULT_BUDGET_MS = 300.0
+
+
+def measure_imports(script: str = "main.py", args: List[str] | None = None) -> Dict[str, Any]:
+    """스크립트를 -X importtime으로 실행해 최상위 import별 누적 시간(ms)과 무거운 모듈 목록 반환"""
+    script = os.path.abspath(script)
+    command = [sys.executable, "-X", "importtime", script] + list(args if args is not None else ["--help"])
+    # 스크립트 폴더를 작업 디렉토리로 (형제 모듈 import와 상대 경로 기본값 기준)
+    completed = subprocess.run(command, capture_output=True, text=True, cwd=os.path.dirname(script))
+
+    top_level = {}
+    heavy = set()
+    for line in completed.stderr.splitlines():
+        # 형식: "import time:  self [us] | cumulative | imported package" (들여쓰기 = 중첩 import)
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, package = line[len("import time:"):].split("|", 2)
+        name = package.strip()
+        if name.split(".")[0] in HEAVY_MODULES:
+            heavy.add(name.split(".")[0])
+        if not package[1:].startswith(" "):
+            top_level[name] = int(cumulative) / 1000.0
+
+    return {
+        "command": " ".join(command),
+        "returncode": completed.returncode,
+        "total_ms": round(sum(top_level.values()), 1),
+        "top_level_ms": top_level,
+        "heavy_modules": sorted(heavy),
+    }
+
+
+def check_import_budget(script: str = "main.py", args: List[str] | None = None,
+                        budget_ms: float = DEFAULT_BUDGET_MS) -> bool:
+    """예산 안이고 무거운 모듈이 없으면 True"""
+    result = measure_imports(script, args)
+    print(f"⏱️ {result['command']}")
+    print(f"📦 최상위 import 누적 {result['total_ms']:.1f} ms (예산 {budget_ms:.0f} ms)")
+    slowest = sorted(result["top_level_ms"].items(), key=lambda item: item[1], reverse=True)[:10]
+    for name, ms in slowest:
+        print(f"  - {name:<40} {ms:8.1f} ms")
+
+    ok = True
+    if result["returncode"] != 0:
+        print(f"❌ 스크립트 종료 코드 {result['returncode']}")
+        ok = False
+    if result["heavy_modules"]:
+        print(f"❌ 무거운 모듈 import: {', '.join(result['heavy_modules'])}")
+        ok = False
+    if result["total_ms"] > budget_ms:
+        print(f"❌ import 시간 예산 초과: {result['total_ms']:.1f} ms > {budget_ms:.0f} ms")
+        ok = False
+    if ok:
+        print("✅ import 시간 예산 통과")
+    return ok
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="스크립트 시작 시 import 시간 예산 확인 (python -X importtime 기반)")
+    parser.add_argument("--script", type=str, default="main.py", help="확인할 스크립트")
+    parser.add_argument("--budget_ms", type=float, default=DEFAULT_BUDGET_MS, help="최상위 import 누적 시간 예산 (ms)")
+    parser.add_argument("script_args", nargs=argparse.REMAINDER, help="스크립트 인자 (생략 시 --help)")
+    args = parser.parse_args()
+
+    script_args = args.script_args[1:] if args.script_args[:1] == ["--"] else args.script_args
+    sys.exit(0 if check_import_budget(args.script, script_args or None, args.budget_ms) else 1)
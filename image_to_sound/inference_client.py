@@ -0,0 +1,69 @@
+"""
+로컬 추론 서버 클라이언트
+inference_server.py 데몬이 떠 있으면 이미지->장면 JSON, 장면 JSON->오디오 클립 작업을 서버로 보내고,
+서버가 없거나 설정이 맞지 않으면 None을 반환해 호출 측이 로컬 실행으로 전환하게 한다.
+"""
+
+import os
+import json
+import urllib.error
+import urllib.request
+from typing import Dict, Any
+
+
+DEFAULT_SERVER_URL = os.environ.get("SCENE_TO_SOUND_SERVER", "http://127.0.0.1:8765")
+
+# 서버 작업 디렉토리와 무관하도록 절대 경로로 바꿔 보내는 인자
+PATH_KEYS = ("image_path", "single", "output_dir", "sound_source_dir", "result_dir", "cache_dir",
+             "embedding_cache_dir", "select", "draft_dir", "duration_profile", "work_dir")
+
+
+def _absolute_paths(payload: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        # duration_profile의 "default"는 경로가 아니라 기본 프로파일 이름
+        key: os.path.abspath(value) if key in PATH_KEYS and isinstance(value, str) and value != "default" else value
+        for key, value in payload.items()
+    }
+
+
+def _request(url: str, method: str = "GET", payload: Dict[str, Any] | None = None,
+             timeout: float | None = None) -> Dict[str, Any]:
+    data = json.dumps(payload).encode("utf-8") if payload is not None else None
+    request = urllib.request.Request(url, data=data, method=method, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read().decode("utf-8"))
+
+
+def server_status(server_url: str = DEFAULT_SERVER_URL, timeout: float = 0.5) -> Dict[str, Any] | None:
+    """서버 상태 (서버가 없으면 None)"""
+    try:
+        return _request(f"{server_url}/status", timeout=timeout)
+    except (OSError, ValueError):
+        return None
+
+
+def _submit(server_url: str, endpoint: str, payload: Dict[str, Any]) -> Dict[str, Any] | None:
+    try:
+        return _request(f"{server_url}/{endpoint}", method="POST", payload=_absolute_paths(payload))
+    except urllib.error.HTTPError as e:
+        try:
+            reason = json.loads(e.read().decode("utf-8")).get("error")
+        except ValueError:
+            reason = e.reason
+        print(f"⚠️ 추론 서버 {endpoint} 요청 거절 ({e.code}): {reason}")
+        return None
+    except (OSError, ValueError) as e:
+        print(f"⚠️ 추론 서버 {endpoint} 요청 실패: {str(e)}")
+        return None
+
+
+def request_scene(image_path: str, output_dir: str, options: Dict[str, Any],
+                  server_url: str = DEFAULT_SERVER_URL) -> Dict[str, Any] | None:
+    """이미지 -> 장면 JSON (process_single_image_with_vlm과 같은 결과 딕셔너리, 실패 시 None)"""
+    return _submit(server_url, "scene", {"image_path": image_path, "output_dir": output_dir, **options})
+
+
+def request_clips(single: str, audio_kwargs: Dict[str, Any],
+                  server_url: str = DEFAULT_SERVER_URL) -> Dict[str, Any] | None:
+    """장면 JSON(또는 이미지 경로) -> 오디오 클립 ({"audio_stats": 생성 통계}, 실패 시 None)"""
+    return _submit(server_url, "clips", {"single": single, **audio_kwargs})
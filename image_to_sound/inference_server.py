@@ -0,0 +1,315 @@
+"""
+로컬 추론 서버
+Qwen2-VL과 AudioLDM을 한 번만 로드해 메모리에 유지하고, localhost HTTP로
+이미지->장면 JSON(/scene), 장면 JSON->오디오 클립(/clips) 작업을 받는다.
+모델은 공용 모델 레지스트리에 상주하며 메모리 예산을 넘으면 LRU 순으로 해제된다.
+모델 사용은 단일 작업 스레드로 직렬화되며, /status에서 요청 지연 시간, 대기 작업 수, 모델 상주 상태를 보여준다.
+"""
+
+import json
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Tuple
+from urllib.parse import urlparse
+
+from inference_client import DEFAULT_SERVER_URL
+from model_registry import get_registry, set_memory_budget, release_model, registry_stats
+from utils import ensure_dir, peak_rss_mb
+from vlm_config import DEFAULT_SNAPSHOT_CHECK, DEFAULT_CPU_QUANT
+
+
+# 로드된 VLM을 결정하는 설정 (요청 값이 다르면 409로 거절해 클라이언트가 로컬 실행으로 전환)
+VLM_MODEL_KEYS = ("cpu_quant", "max_visual_tokens", "draft_model")
+LATENCY_WINDOW = 200
+
+DEFAULT_SERVER_CONFIG = {
+    "snapshot_check": DEFAULT_SNAPSHOT_CHECK,
+    "cpu_quant": DEFAULT_CPU_QUANT,
+    "max_visual_tokens": None,
+    "draft_model": None,
+    "audio_model": "cvssp/audioldm-s-full-v2",
+    "audio_scheduler": "default",
+    "audio_device": None,
+    # None이면 두 모델을 모두 상주
+    "model_budget_mb": None,
+}
+
+
+def create_server_state(config: Dict[str, Any]) -> Dict[str, Any]:
+    """서버 설정, 모델 상주 상태, 요청 통계를 담는 딕셔너리 생성"""
+    return {
+        "config": config,
+        "started": time.time(),
+        # 모델은 한 번에 하나의 작업만 사용
+        "executor": ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference"),
+        "lock": threading.Lock(),
+        "queued": 0,
+        "in_flight": 0,
+        "requests": {endpoint: {"count": 0, "errors": 0, "latencies": deque(maxlen=LATENCY_WINDOW)}
+                     for endpoint in ("scene", "clips")},
+        "prompt": None,
+        # 모델은 공용 레지스트리에 상주 (image_to_text/audioldm2와 같은 키 사용)
+        "registry": get_registry(),
+    }
+
+
+def _acquire_vlm(state: Dict[str, Any]) -> Tuple[str, Any, Any]:
+    """레지스트리에서 서버 설정의 VLM을 받음 (상주 중이 아니면 로드)"""
+    from image_to_text import acquire_vlm
+
+    config = state["config"]
+    return acquire_vlm(snapshot_check=config["snapshot_check"], cpu_quant=config["cpu_quant"],
+                       max_visual_tokens=config["max_visual_tokens"], draft_model=config["draft_model"])
+
+
+def _acquire_audio(state: Dict[str, Any], scheduler: str | None = None) -> Tuple[str, Any]:
+    """레지스트리에서 서버 설정의 AudioLDM 파이프라인을 받음 (상주 중이 아니면 로드)"""
+    from audioldm2 import acquire_pipeline
+
+    config = state["config"]
+    return acquire_pipeline(config["audio_model"], scheduler=scheduler or config["audio_scheduler"],
+                            device=config["audio_device"])
+
+
+def _run_scene(state: Dict[str, Any], payload: Dict[str, Any]) -> Dict[str, Any]:
+    """이미지 하나를 상주 VLM으로 처리 (캐시 hit이면 모델 없이 복원)"""
+    from image_to_text import (
+        restore_cached_results, process_single_image, _cache_model_id, _cache_generation_kwargs,
+    )
+    from vlm_prompt.extract_sources import get_scene_to_sound_prompt
+    from vlm_result_cache import DEFAULT_CACHE_DIR, create_result_cache
+
+    config = state["config"]
+    image_path = payload["image_path"]
+    output_dir = payload["output_dir"]
+    constrained = payload.get("constrained", False)
+    ensure_dir(output_dir)
+
+    if state["prompt"] is None:
+        state["prompt"] = get_scene_to_sound_prompt()
+    prompt, example_images = state["prompt"]
+
+    result_cache = None
+    if payload.get("use_cache", True):
+        result_cache = create_result_cache(
+            payload.get("cache_dir") or DEFAULT_CACHE_DIR, model_id=_cache_model_id(config["cpu_quant"]),
+            generation_kwargs=_cache_generation_kwargs(constrained, config["max_visual_tokens"]),
+            refresh=payload.get("refresh_cache", False)
+        )
+        restored, _ = restore_cached_results([image_path], output_dir, prompt, result_cache)
+        if image_path in restored:
+            return restored[image_path]
+
+    vlm_key, model, processor = _acquire_vlm(state)
+    try:
+        prefix_cache = None
+        if payload.get("use_prefix_cache"):
+            # 모델 객체에 붙여 두면 모델이 해제/재로드될 때 함께 무효화됨
+            if getattr(model, "server_prefix_cache", None) is None:
+                from vlm_qwen import get_few_shot_prefix_cache
+                model.server_prefix_cache = get_few_shot_prefix_cache(model, processor, example_images)
+            prefix_cache = model.server_prefix_cache
+        return process_single_image(model, processor, image_path, output_dir, prompt, example_images,
+                                    prefix_cache=prefix_cache, result_cache=result_cache, constrained=constrained)
+    finally:
+        release_model(vlm_key)
+
+
+def _run_clips(state: Dict[str, Any], payload: Dict[str, Any]) -> Dict[str, Any]:
+    """장면 JSON 하나의 오디오 클립을 상주 AudioLDM으로 생성"""
+    from audioldm2 import generate_audio_for_sound_sources
+
+    kwargs = dict(payload)
+    # 워커 프로세스 풀은 상주 파이프라인을 쓸 수 없으므로 서버에서는 항상 현재 프로세스에서 생성
+    kwargs.pop("workers", None)
+    kwargs.pop("threads_per_worker", None)
+    kwargs.pop("model_id", None)
+    scheduler = kwargs.pop("scheduler", state["config"]["audio_scheduler"])
+
+    pipe_key, pipe = _acquire_audio(state, scheduler)
+    try:
+        stats = generate_audio_for_sound_sources(model_id=state["config"]["audio_model"], scheduler=scheduler,
+                                                 pipe=pipe, **kwargs)
+    finally:
+        release_model(pipe_key)
+    return {"audio_stats": stats}
+
+
+def _check_request(state: Dict[str, Any], endpoint: str, payload: Dict[str, Any]) -> str | None:
+    """상주 모델과 맞지 않는 요청이면 이유 반환"""
+    config = state["config"]
+    if endpoint == "scene":
+        for key in VLM_MODEL_KEYS:
+            if key in payload and payload[key] != config[key]:
+                return f"{key} mismatch (server={config[key]}, request={payload[key]})"
+    elif payload.get("model_id", config["audio_model"]) != config["audio_model"]:
+        return f"model_id mismatch (server={config['audio_model']}, request={payload['model_id']})"
+    return None
+
+
+def _execute(state: Dict[str, Any], endpoint: str, payload: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+    """작업 스레드에서 실행하고 대기 시간을 포함한 요청 지연 시간을 기록"""
+    run = _run_scene if endpoint == "scene" else _run_clips
+    stats = state["requests"][endpoint]
+    start_time = time.perf_counter()
+
+    def job() -> Dict[str, Any]:
+        with state["lock"]:
+            state["queued"] -= 1
+            state["in_flight"] += 1
+        try:
+            return run(state, payload)
+        finally:
+            with state["lock"]:
+                state["in_flight"] -= 1
+
+    with state["lock"]:
+        state["queued"] += 1
+        stats["count"] += 1
+    try:
+        status, body = 200, state["executor"].submit(job).result()
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        status, body = 500, {"error": str(e)}
+    with state["lock"]:
+        stats["latencies"].append(time.perf_counter() - start_time)
+        if status != 200:
+            stats["errors"] += 1
+    return status, body
+
+
+def _latency_summary(latencies) -> Dict[str, Any]:
+    values = sorted(latencies)
+    if not values:
+        return {"mean": None, "p50": None, "p95": None, "last": None}
+    return {
+        "mean": round(sum(values) / len(values), 3),
+        "p50": round(values[len(values) // 2], 3),
+        "p95": round(values[min(len(values) - 1, int(len(values) * 0.95))], 3),
+        "last": round(latencies[-1], 3),
+    }
+
+
+def server_status(state: Dict[str, Any]) -> Dict[str, Any]:
+    """/status 응답: 요청 지연 시간, 대기 작업 수, 모델 상주 상태"""
+    with state["lock"]:
+        requests = {
+            endpoint: {"count": stats["count"], "errors": stats["errors"],
+                       "latency_seconds": _latency_summary(stats["latencies"])}
+            for endpoint, stats in state["requests"].items()
+        }
+        queue_depth, in_flight = state["queued"], state["in_flight"]
+    return {
+        "uptime_seconds": round(time.time() - state["started"], 1),
+        "queue_depth": queue_depth,
+        "in_flight": in_flight,
+        "requests": requests,
+        "models": registry_stats(state["registry"]),
+        "config": state["config"],
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def _make_handler(state: Dict[str, Any]):
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, status: int, body: Dict[str, Any]) -> None:
+            data = json.dumps(body, ensure_ascii=False, default=str).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if urlparse(self.path).path == "/status":
+                self._reply(200, server_status(state))
+            else:
+                self._reply(404, {"error": f"unknown endpoint: {self.path}"})
+
+        def do_POST(self):
+            endpoint = urlparse(self.path).path.strip("/")
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            except ValueError as e:
+                self._reply(400, {"error": f"invalid JSON: {str(e)}"})
+                return
+
+            if endpoint == "shutdown":
+                self._reply(200, {"shutdown": True})
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+            elif endpoint in ("scene", "clips"):
+                conflict = _check_request(state, endpoint, payload)
+                if conflict:
+                    self._reply(409, {"error": conflict})
+                else:
+                    self._reply(*_execute(state, endpoint, payload))
+            else:
+                self._reply(404, {"error": f"unknown endpoint: {self.path}"})
+
+        def log_message(self, format, *args):
+            print(f"🛰️ {self.address_string()} {format % args}")
+
+    return Handler
+
+
+def serve(host: str = "127.0.0.1", port: int = 8765, config: Dict[str, Any] | None = None,
+          preload: bool = False) -> None:
+    """추론 서버 실행 (preload=True면 시작 시 두 모델을 미리 로드)"""
+    state = create_server_state({**DEFAULT_SERVER_CONFIG, **(config or {})})
+    set_memory_budget(state["config"]["model_budget_mb"], state["registry"])
+    if preload:
+        release_model(_acquire_vlm(state)[0])
+        release_model(_acquire_audio(state)[0])
+
+    server = ThreadingHTTPServer((host, port), _make_handler(state))
+    print(f"🛰️ 추론 서버 시작: http://{host}:{port} (상태: /status, 종료: POST /shutdown)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        state["executor"].shutdown(wait=True)
+        print("🛑 추론 서버 종료")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from vlm_config import DEFAULT_DRAFT_MODEL_ID, SNAPSHOT_CHECKS, CPU_QUANT_MODES
+    from audioldm2 import SCHEDULERS
+
+    default_url = urlparse(DEFAULT_SERVER_URL)
+    parser = argparse.ArgumentParser(description="VLM/AudioLDM을 메모리에 유지하는 로컬 추론 서버")
+    parser.add_argument("--host", type=str, default=default_url.hostname, help="바인드 주소 (localhost 권장)")
+    parser.add_argument("--port", type=int, default=default_url.port, help="포트")
+    parser.add_argument("--preload", action="store_true", help="시작 시 VLM과 AudioLDM을 미리 로드")
+    parser.add_argument("--snapshot_check", type=str, default=DEFAULT_SNAPSHOT_CHECK, choices=SNAPSHOT_CHECKS,
+                        help="VLM 스냅샷 확인 방식")
+    parser.add_argument("--cpu_quant", type=str, default=DEFAULT_CPU_QUANT, choices=CPU_QUANT_MODES,
+                        help="CPU 전용 환경의 VLM 양자화 모드")
+    parser.add_argument("--max_visual_tokens", type=int, default=None, help="이미지당 visual token 상한")
+    parser.add_argument("--draft_model", type=str, nargs="?", const=DEFAULT_DRAFT_MODEL_ID, default=None,
+                        help=f"Speculative decoding draft 모델 (값 생략 시 {DEFAULT_DRAFT_MODEL_ID})")
+    parser.add_argument("--audio_model", type=str, default="cvssp/audioldm-s-full-v2", help="AudioLDM 모델 ID")
+    parser.add_argument("--audio_scheduler", type=str, default=DEFAULT_SERVER_CONFIG["audio_scheduler"],
+                        choices=list(SCHEDULERS), help="초기 diffusion 스케줄러")
+    parser.add_argument("--audio_device", type=str, default=None, help="AudioLDM 디바이스 (생략 시 자동)")
+    parser.add_argument("--model_budget_mb", type=float, default=None,
+                        help="상주 모델 메모리 예산 (MB, 초과 시 LRU 순으로 해제; 생략 시 무제한)")
+    args = parser.parse_args()
+
+    serve(args.host, args.port, config={
+        "snapshot_check": args.snapshot_check,
+        "cpu_quant": args.cpu_quant,
+        "max_visual_tokens": args.max_visual_tokens,
+        "draft_model": args.draft_model,
+        "audio_model": args.audio_model,
+        "audio_scheduler": args.audio_scheduler,
+        "audio_device": args.audio_device,
+        "model_budget_mb": args.model_budget_mb,
+    }, preload=args.preload)
@@ -6,13 +6,21 @@ Scene-to-Sound Generation Pipeline
 
 import os
 import json
+import time
+import queue
+import random
 import argparse
+import threading
 from datetime import datetime
 from typing import Dict, Any, Optional
 
-from image_to_text import batch_process_images, process_single_image_with_vlm
-from audioldm2 import run_generation as generate_audio
+from image_to_text import batch_process_images, process_single_image_with_vlm, image_work_key
+from audioldm2 import run_generation as generate_audio, acquire_pipeline, SCHEDULERS, DEFAULT_SCHEDULER
+from model_registry import set_memory_budget, release_model, registry_stats
+from inference_client import DEFAULT_SERVER_URL, server_status, request_scene, request_clips
+from work_claims import DEFAULT_LEASE_SECONDS, open_work_dir, wait_for_stage
 from utils import check_required_directories, check_required_files, ensure_dir
+from vlm_config import SNAPSHOT_CHECKS, DEFAULT_SNAPSHOT_CHECK, CPU_QUANT_MODES, DEFAULT_CPU_QUANT
 
 
 def print_banner():
@@ -68,6 +76,111 @@ def check_dependencies():
     return True
 
 
+def wait_for_vlm_stage(vlm_kwargs: Dict[str, Any]) -> None:
+    """공유 작업 디렉토리의 모든 이미지가 끝날 때까지 대기 (주인 없는 이미지가 남으면 이 노드가 다시 처리)
+
+    오디오 단계가 다른 노드의 장면 JSON까지 보도록 VLM 단계 뒤에 호출한다.
+    """
+    from utils import find_image_files
+    
+    data_dir = vlm_kwargs["data_dir"]
+    work = open_work_dir(vlm_kwargs["work_dir"], "vlm", worker_id=vlm_kwargs["worker_id"],
+                         lease_seconds=vlm_kwargs["lease_seconds"])
+    keys = [image_work_key(image_path, data_dir) for image_path in find_image_files(data_dir)]
+    while wait_for_stage(work, keys):
+        print("🤝 주인 없는 이미지가 남아 다시 처리합니다")
+        batch_process_images(**vlm_kwargs)
+
+
+def run_streaming_stages(vlm_kwargs: Dict[str, Any], audio_kwargs: Dict[str, Any], queue_size: int = 2,
+                         audio_device: Optional[str] = None) -> Dict[str, Any]:
+    """VLM 배치와 오디오 생성을 겹쳐 실행 (장면 JSON이 나오는 즉시 오디오 워커가 생성)
+
+    장면 큐는 queue_size개로 제한되어 오디오가 밀리면 VLM이 기다린다(backpressure).
+    한 장면의 오디오 실패는 기록만 하고 다음 장면을 계속 처리하며, VLM이 끝나거나 실패하면
+    종료 신호를 넣어 오디오 워커가 남은 장면을 마친 뒤 종료한다.
+    장면마다 따로 생성하므로 프로세스 풀(workers)은 쓰지 않고 한 파이프라인을 공유하며,
+    클립/diffusion 예산과 장면 간 배치는 장면 단위로 적용된다.
+    """
+    if audio_kwargs.get("workers", 0) > 0:
+        # 장면마다 spawn 풀을 새로 띄우게 되므로 스트리밍 동안 한 파이프라인만 사용
+        print("⚠️ 스트리밍 모드에서는 --audio_workers를 사용하지 않습니다 (오디오 스레드 하나가 한 파이프라인으로 생성)")
+        audio_kwargs = dict(audio_kwargs, workers=0)
+    if audio_kwargs.get("max_clips") is not None or audio_kwargs.get("max_diffusion_seconds") is not None:
+        print("⚠️ 스트리밍 모드에서는 오디오 예산(--audio_max_clips, --audio_max_diffusion_seconds)이 "
+              "전체가 아닌 장면마다 적용됩니다")
+    scene_queue = queue.Queue(maxsize=max(1, queue_size))
+    # 모든 장면이 같은 전역 시드에서 클립 시드를 유도하도록 한 번만 결정
+    if audio_kwargs.get("seed") is None:
+        audio_kwargs = dict(audio_kwargs, seed=random.randrange(2 ** 31))
+    audio_scenes = {}
+    audio_errors = []
+    first_audio = {}
+    start_time = time.perf_counter()
+    
+    def audio_worker() -> None:
+        pipe = None
+        pipe_key = None
+        failed = False
+        if audio_kwargs.get("workers", 0) <= 0:
+            # VLM이 첫 장면을 만드는 동안 AudioLDM 로드 (레지스트리에 상주 중이면 재사용)
+            try:
+                pipe_key, pipe = acquire_pipeline(audio_kwargs["model_id"],
+                                                  scheduler=audio_kwargs.get("scheduler", "default"),
+                                                  device=audio_device)
+            except Exception as e:
+                print(f"❌ [audio] 파이프라인 로드 실패: {str(e)}")
+                audio_errors.append(f"오디오 파이프라인 로드 실패: {str(e)}")
+                failed = True
+        
+        while True:
+            json_path = scene_queue.get()
+            if json_path is None:
+                break
+            if failed:
+                # VLM이 막히지 않도록 큐는 계속 비움
+                continue
+            print(f"\n🎧 [audio] 장면 수신: {json_path} (대기 {scene_queue.qsize()}개)")
+            stats = generate_audio(single=json_path, pipe=pipe, **audio_kwargs)
+            audio_scenes[json_path] = stats
+            if stats is None:
+                audio_errors.append(f"오디오 생성 실패: {json_path}")
+            elif not first_audio:
+                first_audio["seconds"] = round(time.perf_counter() - start_time, 3)
+        if pipe_key is not None:
+            release_model(pipe_key)
+    
+    worker = threading.Thread(target=audio_worker, name="audio-stream")
+    worker.start()
+    
+    def enqueue_scene(image_path: str, result: Dict[str, Any]) -> None:
+        if result.get("success") and result.get("output_json_path"):
+            scene_queue.put(result["output_json_path"])
+    
+    try:
+        vlm_results = batch_process_images(on_result=enqueue_scene, **vlm_kwargs)
+    finally:
+        scene_queue.put(None)
+        worker.join()
+    
+    elapsed = time.perf_counter() - start_time
+    print(f"\n🌊 스트리밍 완료: 장면 {len(audio_scenes)}개, 오디오 실패 {len(audio_errors)}개, "
+          f"첫 오디오 {first_audio.get('seconds')}s, 전체 {elapsed:.1f}s")
+    return {
+        "vlm_results": vlm_results,
+        "audio_stats": {
+            "streaming": True,
+            "queue_size": max(1, queue_size),
+            "budget_scope": "per_scene",
+            "global_seed": audio_kwargs["seed"],
+            "scenes": audio_scenes,
+            "first_audio_seconds": first_audio.get("seconds"),
+            "elapsed_seconds": round(elapsed, 3),
+        },
+        "audio_errors": audio_errors,
+    }
+
+
 def run_full_pipeline(
     data_dir: str = "data",
     sound_sources_dir: str = "sound_sources", 
@@ -79,9 +192,52 @@ def run_full_pipeline(
     audio_seconds: float = 4.0,
     audio_steps: int = 200,
     audio_guidance: float = 3.5,
-    audio_seed: Optional[int] = None
+    audio_seed: Optional[int] = None,
+    audio_batch_size: int = 1,
+    audio_cache_dir: str = os.path.join(".cache", "audio_clips"),
+    audio_scheduler: str = "default",
+    audio_embed_cache: Optional[str] = None,
+    audio_draft: bool = False,
+    audio_draft_steps: int = 20,
+    audio_draft_seconds: float = 2.0,
+    audio_select: Optional[str] = None,
+    audio_min_confidence: Optional[float] = None,
+    audio_max_clips: Optional[int] = None,
+    audio_max_diffusion_seconds: Optional[float] = None,
+    audio_step_cost: float = 0.02,
+    audio_durations: Optional[str] = None,
+    audio_workers: int = 0,
+    audio_threads_per_worker: Optional[int] = None,
+    audio_segment_seconds: Optional[float] = None,
+    audio_overlap_seconds: float = 1.0,
+    vlm_prefix_cache: bool = False,
+    vlm_batch_size: int = 1,
+    use_cache: bool = True,
+    refresh_cache: bool = False,
+    vlm_cache_dir: str = os.path.join(".cache", "vlm_results"),
+    vlm_constrained: bool = False,
+    vlm_snapshot_check: str = "size",
+    vlm_cpu_quant: str = "none",
+    vlm_max_visual_tokens: Optional[int] = None,
+    vlm_prefetch: int = 0,
+    vlm_prefetch_workers: int = 1,
+    vlm_draft_model: Optional[str] = None,
+    resume: bool = False,
+    work_dir: Optional[str] = None,
+    worker_id: Optional[str] = None,
+    lease_seconds: float = DEFAULT_LEASE_SECONDS,
+    stream: bool = False,
+    stream_queue_size: int = 2,
+    audio_device: Optional[str] = None,
+    server_url: Optional[str] = DEFAULT_SERVER_URL,
+    model_budget_mb: Optional[float] = 0
 ) -> Dict[str, Any]:
-    """전체 파이프라인 실행"""
+    """전체 파이프라인 실행 (stream=True면 VLM 배치와 오디오 생성을 겹쳐 실행)
+
+    단일 이미지 모드에서 server_url의 추론 서버가 떠 있으면 모델 로드 없이 서버에 작업을 보낸다.
+    model_budget_mb는 단계 사이에 상주시킬 모델 메모리 예산 (0이면 사용이 끝난 모델을 바로 해제, None이면 무제한).
+    """
+    set_memory_budget(model_budget_mb)
     
     results = {
         "start_time": datetime.now().isoformat(),
@@ -89,6 +245,62 @@ def run_full_pipeline(
         "errors": []
     }
     
+    vlm_kwargs = dict(
+        data_dir=data_dir,
+        output_dir=sound_sources_dir,
+        use_prefix_cache=vlm_prefix_cache,
+        vlm_batch_size=vlm_batch_size,
+        use_cache=use_cache,
+        refresh_cache=refresh_cache,
+        cache_dir=vlm_cache_dir,
+        constrained=vlm_constrained,
+        snapshot_check=vlm_snapshot_check,
+        cpu_quant=vlm_cpu_quant,
+        max_visual_tokens=vlm_max_visual_tokens,
+        prefetch_depth=vlm_prefetch,
+        prefetch_workers=vlm_prefetch_workers,
+        draft_model=vlm_draft_model,
+        resume=resume,
+        work_dir=work_dir,
+        worker_id=worker_id,
+        lease_seconds=lease_seconds
+    )
+    audio_kwargs = dict(
+        sound_source_dir=sound_sources_dir,
+        result_dir=result_dir,
+        model_id=audio_model,
+        audio_seconds=audio_seconds,
+        steps=audio_steps,
+        guidance=audio_guidance,
+        seed=audio_seed,
+        batch_size=audio_batch_size,
+        use_cache=use_cache,
+        refresh_cache=refresh_cache,
+        cache_dir=audio_cache_dir,
+        scheduler=audio_scheduler,
+        embedding_cache_dir=audio_embed_cache,
+        draft=audio_draft,
+        draft_steps=audio_draft_steps,
+        draft_seconds=audio_draft_seconds,
+        select=audio_select,
+        min_confidence=audio_min_confidence,
+        max_clips=audio_max_clips,
+        max_diffusion_seconds=audio_max_diffusion_seconds,
+        step_cost=audio_step_cost,
+        duration_profile=audio_durations,
+        workers=audio_workers,
+        threads_per_worker=audio_threads_per_worker,
+        segment_seconds=audio_segment_seconds,
+        overlap_seconds=audio_overlap_seconds,
+        work_dir=work_dir,
+        worker_id=worker_id,
+        lease_seconds=lease_seconds
+    )
+    streamed = False
+    use_server = bool(server_url and single_image) and server_status(server_url) is not None
+    if use_server:
+        print(f"🔌 추론 서버 사용: {server_url}")
+    
     try:
         # 1단계: 의존성 확인
         print_step(1, 4, "의존성 확인")
@@ -99,13 +311,37 @@ def run_full_pipeline(
         results["steps_completed"].append("dependency_check")
         
         # 2단계: VLM을 사용한 Sound Sources 생성
-        if not skip_vlm:
+        if stream and not skip_vlm and not skip_audio and not single_image:
+            print_step(2, 4, "VLM + 오디오 스트리밍 생성")
+            stream_results = run_streaming_stages(vlm_kwargs, audio_kwargs, queue_size=stream_queue_size,
+                                                  audio_device=audio_device)
+            streamed = True
+            vlm_results = stream_results["vlm_results"]
+            results["audio_stats"] = stream_results["audio_stats"]
+            results["errors"].extend(stream_results["audio_errors"])
+            if vlm_results and not vlm_results.get("error"):
+                results["steps_completed"].append("vlm_batch")
+                results["vlm_results"] = vlm_results
+            else:
+                results["errors"].append("VLM 배치 처리 실패")
+            results["steps_completed"].append("audio_streaming")
+        elif not skip_vlm:
             print_step(2, 4, "VLM을 사용한 Sound Sources 생성")
             
             if single_image:
                 # 단일 이미지 처리
                 print(f"단일 이미지 처리: {single_image}")
-                result = process_single_image_with_vlm(single_image, sound_sources_dir)
+                single_vlm_kwargs = dict(
+                    use_prefix_cache=vlm_prefix_cache, use_cache=use_cache, refresh_cache=refresh_cache,
+                    cache_dir=vlm_cache_dir, constrained=vlm_constrained, snapshot_check=vlm_snapshot_check,
+                    cpu_quant=vlm_cpu_quant, max_visual_tokens=vlm_max_visual_tokens,
+                    draft_model=vlm_draft_model
+                )
+                result = None
+                if use_server:
+                    result = request_scene(single_image, sound_sources_dir, single_vlm_kwargs, server_url)
+                if result is None:
+                    result = process_single_image_with_vlm(single_image, sound_sources_dir, **single_vlm_kwargs)
                 
                 if result.get("success"):
                     print(f"✅ 단일 이미지 처리 완료: {result.get('output_json_path')}")
@@ -115,7 +351,10 @@ def run_full_pipeline(
                     results["errors"].append(f"VLM 단일 처리 실패: {result.get('error')}")
             else:
                 # 배치 처리
-                vlm_results = batch_process_images(data_dir, sound_sources_dir)
+                vlm_results = batch_process_images(**vlm_kwargs)
+                if work_dir and vlm_results and not vlm_results.get("error") and not skip_audio:
+                    # 오디오 단계는 모든 노드의 장면 JSON이 준비된 뒤 시작
+                    wait_for_vlm_stage(vlm_kwargs)
                 
                 if vlm_results and not vlm_results.get("error"):
                     successful = len(vlm_results.get("successful_results", []))
@@ -149,20 +388,20 @@ def run_full_pipeline(
         results["sound_source_files"] = sound_source_files
         
         # 4단계: AudioLDM2를 사용한 오디오 생성
-        if not skip_audio:
+        if streamed:
+            print_step(4, 4, "AudioLDM2를 사용한 오디오 생성")
+            print("✅ 오디오는 스트리밍 단계에서 생성됨")
+        elif not skip_audio:
             print_step(4, 4, "AudioLDM2를 사용한 오디오 생성")
             
             try:
-                generate_audio(
-                    sound_source_dir=sound_sources_dir,
-                    result_dir=result_dir,
-                    model_id=audio_model,
-                    audio_seconds=audio_seconds,
-                    steps=audio_steps,
-                    guidance=audio_guidance,
-                    seed=audio_seed,
-                    single=single_image
-                )
+                audio_stats = None
+                if use_server:
+                    response = request_clips(single_image, audio_kwargs, server_url)
+                    audio_stats = response["audio_stats"] if response is not None else None
+                if audio_stats is None:
+                    audio_stats = generate_audio(single=single_image, **audio_kwargs)
+                results["audio_stats"] = audio_stats
                 print("✅ 오디오 생성 완료")
                 results["steps_completed"].append("audio_generation")
             except Exception as e:
@@ -190,6 +429,12 @@ def run_full_pipeline(
         print(f"📁 Sound Sources: {sound_sources_dir}")
         print(f"📁 결과 오디오: {result_dir}")
         
+        registry = registry_stats()
+        results["model_registry"] = registry
+        if registry["loads"]:
+            print(f"🧠 모델 로드 {registry['loads']}회 / 해제 {registry['evictions']}회, "
+                  f"상주 {registry['resident_mb']:.0f} MB")
+        
     except Exception as e:
         print(f"💥 파이프라인 실행 중 오류 발생: {str(e)}")
         results["errors"].append(f"파이프라인 오류: {str(e)}")
@@ -216,12 +461,84 @@ def main():
     parser.add_argument("--skip_vlm", action="store_true", help="VLM 단계 건너뛰기")
     parser.add_argument("--skip_audio", action="store_true", help="오디오 생성 단계 건너뛰기")
     
+    # VLM 설정
+    parser.add_argument("--vlm_prefix_cache", action="store_true", help="Few-shot prefix KV cache 재사용")
+    parser.add_argument("--vlm_batch_size", type=int, default=1, help="한 번의 generate 호출로 처리할 이미지 수")
+    parser.add_argument("--vlm_constrained", action="store_true", help="Sound source JSON 스키마 제약 디코딩")
+    parser.add_argument("--vlm_snapshot_check", type=str, default=DEFAULT_SNAPSHOT_CHECK, choices=SNAPSHOT_CHECKS,
+                        help="VLM 스냅샷 확인 방식 (size/hash: 로컬 확인 후 누락 시만 다운로드, download: 항상 동기화)")
+    parser.add_argument("--vlm_cpu_quant", type=str, default=DEFAULT_CPU_QUANT, choices=CPU_QUANT_MODES,
+                        help="CPU 전용 환경의 VLM 양자화 모드 (bf16 가중치 / 동적 int8 Linear)")
+    parser.add_argument("--vlm_max_visual_tokens", type=int, default=None,
+                        help="이미지당 visual token 상한 (초과 이미지는 리사이즈 후 캐시)")
+    parser.add_argument("--vlm_prefetch", type=int, default=0,
+                        help="생성 중 미리 디코딩/전처리할 다음 이미지 수 (0: 사용 안 함)")
+    parser.add_argument("--vlm_prefetch_workers", type=int, default=1, help="VLM prefetch 스레드 수")
+    parser.add_argument("--vlm_draft_model", type=str, nargs="?", const="Qwen/Qwen2-VL-2B-Instruct", default=None,
+                        help="Speculative decoding draft 모델 (값 생략 시 Qwen/Qwen2-VL-2B-Instruct)")
+    parser.add_argument("--vlm_cache_dir", type=str, default=os.path.join(".cache", "vlm_results"), help="VLM 결과 캐시 디렉토리")
+    
+    # 캐시 설정
+    parser.add_argument("--no_cache", action="store_true", help="결과 캐시 사용 안 함")
+    parser.add_argument("--refresh", action="store_true", help="캐시를 무시하고 다시 생성 (결과는 캐시에 갱신)")
+    parser.add_argument("--resume", action="store_true", help="중단된 VLM 배치 이어서 처리 (저널에 완료된 이미지는 건너뜀)")
+    
+    # 여러 노드 분산 처리
+    parser.add_argument("--work_dir", type=str, default=None,
+                        help="여러 노드가 이미지/클립을 claim해 나눠 처리할 공유 작업 디렉토리 (코디네이터 불필요)")
+    parser.add_argument("--worker_id", type=str, default=None, help="공유 작업 디렉토리의 워커 이름 (생략 시 호스트-PID)")
+    parser.add_argument("--lease_seconds", type=float, default=DEFAULT_LEASE_SECONDS,
+                        help="하트비트가 끊긴 claim을 다른 노드가 가져가기까지의 시간 (초)")
+    
+    # 스트리밍 설정
+    parser.add_argument("--stream", action="store_true",
+                        help="VLM과 오디오 생성을 겹쳐 실행 (장면 JSON이 나오는 즉시 오디오 생성)")
+    parser.add_argument("--stream_queue_size", type=int, default=2,
+                        help="오디오 대기 장면 수 상한 (가득 차면 VLM이 대기)")
+    
     # 오디오 생성 설정
     parser.add_argument("--audio_model", type=str, default="cvssp/audioldm-s-full-v2", help="AudioLDM 모델 ID")
     parser.add_argument("--audio_seconds", type=float, default=4.0, help="오디오 길이 (초)")
     parser.add_argument("--audio_steps", type=int, default=200, help="Diffusion 스텝 수")
     parser.add_argument("--audio_guidance", type=float, default=3.5, help="Guidance scale")
     parser.add_argument("--audio_seed", type=int, default=None, help="랜덤 시드")
+    parser.add_argument("--audio_batch_size", type=int, default=1, help="한 번의 AudioLDM 호출로 생성할 클립 수")
+    parser.add_argument("--audio_scheduler", type=str, default=DEFAULT_SCHEDULER, choices=list(SCHEDULERS),
+                        help="Diffusion 스케줄러 (dpmpp: DPM-Solver++ multistep, --audio_steps 20~30 권장)")
+    parser.add_argument("--audio_embed_cache", nargs="?", const=os.path.join(".cache", "text_embeddings"), default=None,
+                        help="AudioLDM 텍스트 임베딩 캐시 사용 (디렉토리 생략 시 .cache/text_embeddings)")
+    parser.add_argument("--audio_draft", action="store_true", help="Draft 패스: 모든 클립을 저품질로 drafts/에 생성")
+    parser.add_argument("--audio_draft_steps", type=int, default=20, help="Draft diffusion 스텝 수")
+    parser.add_argument("--audio_draft_seconds", type=float, default=2.0, help="Draft 오디오 길이 (초)")
+    parser.add_argument("--audio_select", type=str, default=None, help="최종 품질로 생성할 클립 목록 파일 (drafts/selection.txt)")
+    parser.add_argument("--audio_min_confidence", type=float, default=None, help="이 confidence 이상인 variant만 생성")
+    parser.add_argument("--audio_max_clips", type=int, default=None, help="예산: 우선순위 상위 N개 클립만 생성")
+    parser.add_argument("--audio_max_diffusion_seconds", type=float, default=None,
+                        help="예산: 예상 diffusion 시간 합계 상한 (초)")
+    parser.add_argument("--audio_step_cost", type=float, default=0.02,
+                        help="예산 추정용: 오디오 1초 x 스텝 1회의 소요 시간 (초)")
+    parser.add_argument("--audio_durations", nargs="?", const="default", default=None,
+                        help="악기 매핑/play_method별 클립 길이 사용 (프로파일 JSON 경로 생략 시 기본 프로파일)")
+    parser.add_argument("--audio_workers", type=int, default=0,
+                        help="CPU 오디오 워커 프로세스 수 (0이면 현재 프로세스에서 생성)")
+    parser.add_argument("--audio_threads_per_worker", type=int, default=None,
+                        help="오디오 워커당 torch 스레드 수 (생략 시 CPU 코어 수 / 워커 수)")
+    parser.add_argument("--audio_segment_seconds", type=float, default=None,
+                        help="이보다 긴 클립은 이 길이의 겹치는 세그먼트로 나눠 생성 (장시간 ambience용)")
+    parser.add_argument("--audio_overlap_seconds", type=float, default=1.0, help="세그먼트 간 crossfade 길이 (초)")
+    parser.add_argument("--audio_device", type=str, default=None,
+                        help="스트리밍 모드의 AudioLDM 디바이스 (예: cuda:1, cpu; 생략 시 자동)")
+    parser.add_argument("--audio_cache_dir", type=str, default=os.path.join(".cache", "audio_clips"), help="오디오 클립 캐시 디렉토리")
+    
+    # 추론 서버
+    parser.add_argument("--server", type=str, default=DEFAULT_SERVER_URL,
+                        help="단일 이미지 모드에서 사용할 추론 서버 주소 (inference_server.py, 없으면 로컬 실행)")
+    parser.add_argument("--no_server", action="store_true", help="추론 서버가 떠 있어도 로컬에서 실행")
+    
+    # 모델 레지스트리
+    parser.add_argument("--model_budget_mb", type=float, default=0,
+                        help="단계 사이에 VLM/AudioLDM을 상주시킬 메모리 예산 (MB). 초과 시 LRU 순으로 해제 "
+                             "(0: 사용이 끝난 모델은 바로 해제, 음수: 무제한)")
     
     # 결과 저장
     parser.add_argument("--save_log", type=str, default=None, help="실행 로그 저장 파일")
@@ -246,7 +563,45 @@ def main():
         audio_seconds=args.audio_seconds,
         audio_steps=args.audio_steps,
         audio_guidance=args.audio_guidance,
-        audio_seed=args.audio_seed
+        audio_seed=args.audio_seed,
+        audio_batch_size=args.audio_batch_size,
+        audio_cache_dir=args.audio_cache_dir,
+        audio_scheduler=args.audio_scheduler,
+        audio_embed_cache=args.audio_embed_cache,
+        audio_draft=args.audio_draft,
+        audio_draft_steps=args.audio_draft_steps,
+        audio_draft_seconds=args.audio_draft_seconds,
+        audio_select=args.audio_select,
+        audio_min_confidence=args.audio_min_confidence,
+        audio_max_clips=args.audio_max_clips,
+        audio_max_diffusion_seconds=args.audio_max_diffusion_seconds,
+        audio_step_cost=args.audio_step_cost,
+        audio_durations=args.audio_durations,
+        audio_workers=args.audio_workers,
+        audio_threads_per_worker=args.audio_threads_per_worker,
+        audio_segment_seconds=args.audio_segment_seconds,
+        audio_overlap_seconds=args.audio_overlap_seconds,
+        vlm_prefix_cache=args.vlm_prefix_cache,
+        vlm_batch_size=args.vlm_batch_size,
+        use_cache=not args.no_cache,
+        refresh_cache=args.refresh,
+        vlm_cache_dir=args.vlm_cache_dir,
+        vlm_constrained=args.vlm_constrained,
+        vlm_snapshot_check=args.vlm_snapshot_check,
+        vlm_cpu_quant=args.vlm_cpu_quant,
+        vlm_max_visual_tokens=args.vlm_max_visual_tokens,
+        vlm_prefetch=args.vlm_prefetch,
+        vlm_prefetch_workers=args.vlm_prefetch_workers,
+        vlm_draft_model=args.vlm_draft_model,
+        resume=args.resume,
+        work_dir=args.work_dir,
+        worker_id=args.worker_id,
+        lease_seconds=args.lease_seconds,
+        stream=args.stream,
+        stream_queue_size=args.stream_queue_size,
+        audio_device=args.audio_device,
+        server_url=None if args.no_server else args.server,
+        model_budget_mb=None if args.model_budget_mb < 0 else args.model_budget_mb
     )
     
     # 로그 저장
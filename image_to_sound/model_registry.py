@@ -0,0 +1,197 @@
+"""
+모델 레지스트리
+VLM(Qwen2-VL)과 AudioLDM 파이프라인을 필요할 때 로드해 메모리 예산 안에서 상주시키고,
+예산을 넘으면 사용 중이 아닌 모델을 가장 오래 전에 사용한 것부터 해제한다(torch 메모리 반환 포함).
+로드/해제 이벤트는 소요 시간과 함께 출력하고 기록한다.
+"""
+
+import gc
+import sys
+import time
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, Callable, List
+
+# 이벤트 기록은 최근 것만 유지
+MAX_EVENTS = 200
+
+_default_registry = None
+
+
+def create_model_registry(budget_mb: float | None = None) -> Dict[str, Any]:
+    """레지스트리 생성 (budget_mb=None이면 무제한, 0이면 사용이 끝난 모델을 바로 해제)"""
+    return {
+        "budget_mb": budget_mb,
+        # key -> 항목, 앞쪽이 가장 오래 전에 사용한 모델
+        "models": OrderedDict(),
+        # 한 번 로드해 본 모델의 크기 (다음 로드 전에 미리 자리를 비우는 데 사용)
+        "known_sizes": {},
+        "loading": {},
+        "events": [],
+        "lock": threading.RLock(),
+    }
+
+
+def get_registry() -> Dict[str, Any]:
+    """프로세스 공용 레지스트리 (VLM 단계와 오디오 단계가 함께 사용)"""
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = create_model_registry()
+    return _default_registry
+
+
+def set_memory_budget(budget_mb: float | None, registry: Dict[str, Any] | None = None) -> None:
+    """메모리 예산 변경 (줄어들면 바로 초과분 해제)"""
+    registry = registry or get_registry()
+    with registry["lock"]:
+        registry["budget_mb"] = budget_mb
+        _make_room(registry, 0.0)
+
+
+def estimate_size_mb(model: Any) -> float:
+    """모델(또는 (model, processor) 튜플, diffusers 파이프라인)의 파라미터+버퍼 크기 (MB)"""
+    objects = list(model) if isinstance(model, (tuple, list)) else [model]
+    modules = []
+    for obj in objects:
+        # diffusers 파이프라인은 components에 unet/vae/text_encoder 등을 가짐
+        components = getattr(obj, "components", None)
+        modules.extend(components.values() if isinstance(components, dict) else [obj])
+        # speculative decoding draft는 본 모델의 모듈 트리 밖에 붙어 있으므로 따로 포함
+        draft_model = getattr(obj, "__dict__", {}).get("_draft_model")
+        if draft_model is not None:
+            modules.append(draft_model)
+
+    seen = set()
+    total = 0
+    for module in modules:
+        if not hasattr(module, "parameters") or not hasattr(module, "buffers"):
+            continue
+        for tensor in list(module.parameters()) + list(module.buffers()):
+            # tied weight는 한 번만 계산
+            ptr = tensor.data_ptr()
+            if ptr in seen:
+                continue
+            seen.add(ptr)
+            total += tensor.numel() * tensor.element_size()
+    return round(total / (1024 * 1024), 1)
+
+
+def _resident_mb(registry: Dict[str, Any]) -> float:
+    return round(sum(entry["size_mb"] for entry in registry["models"].values()), 1)
+
+
+def _record(registry: Dict[str, Any], event: str, key: str, **fields) -> None:
+    registry["events"].append({"event": event, "key": key, "time": datetime.now().isoformat(),
+                               "resident_mb": _resident_mb(registry), **fields})
+    del registry["events"][:-MAX_EVENTS]
+
+
+def _release_torch_memory() -> None:
+    gc.collect()
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+
+def _evict(registry: Dict[str, Any], key: str, reason: str) -> None:
+    start_time = time.perf_counter()
+    entry = registry["models"].pop(key)
+    size_mb = entry["size_mb"]
+    del entry
+    _release_torch_memory()
+    elapsed = time.perf_counter() - start_time
+    _record(registry, "evict", key, seconds=round(elapsed, 3), size_mb=size_mb, reason=reason)
+    print(f"🗑️ 모델 해제: {key} ({size_mb:.0f} MB, {elapsed:.2f}s, {reason}) -> 상주 {_resident_mb(registry):.0f} MB")
+
+
+def _make_room(registry: Dict[str, Any], needed_mb: float, keep: str | None = None) -> None:
+    """상주 크기 + needed_mb가 예산 안에 들어올 때까지 사용 중이 아닌 모델을 LRU 순으로 해제"""
+    budget_mb = registry["budget_mb"]
+    if budget_mb is None:
+        return
+    while _resident_mb(registry) + needed_mb > budget_mb:
+        candidates = [key for key, entry in registry["models"].items() if entry["in_use"] == 0 and key != keep]
+        if not candidates:
+            in_use = [key for key, entry in registry["models"].items() if entry["in_use"] > 0]
+            if in_use and needed_mb > 0:
+                print(f"⚠️ 메모리 예산 {budget_mb:.0f} MB 초과: 사용 중인 모델({', '.join(in_use)})은 해제할 수 없습니다")
+            return
+        _evict(registry, candidates[0], reason=f"budget {budget_mb:.0f} MB")
+
+
+def acquire_model(key: str, loader: Callable[[], Any], registry: Dict[str, Any] | None = None) -> Any:
+    """key의 모델을 반환 (없으면 loader()로 로드). 사용이 끝나면 release_model로 반납해야 해제 대상이 된다."""
+    registry = registry or get_registry()
+    while True:
+        with registry["lock"]:
+            entry = registry["models"].get(key)
+            if entry is not None:
+                entry["in_use"] += 1
+                entry["uses"] += 1
+                entry["last_used"] = datetime.now().isoformat()
+                registry["models"].move_to_end(key)
+                return entry["model"]
+            loading = registry["loading"].get(key)
+            if loading is None:
+                # 이 스레드가 로드 담당 (다른 스레드는 로드가 끝날 때까지 대기)
+                loading = registry["loading"][key] = threading.Event()
+                _make_room(registry, registry["known_sizes"].get(key, 0.0))
+                break
+        loading.wait()
+
+    try:
+        start_time = time.perf_counter()
+        model = loader()
+        load_seconds = time.perf_counter() - start_time
+        size_mb = estimate_size_mb(model)
+        with registry["lock"]:
+            now = datetime.now().isoformat()
+            registry["models"][key] = {"model": model, "size_mb": size_mb, "load_seconds": round(load_seconds, 3),
+                                       "loaded_at": now, "last_used": now, "uses": 1, "in_use": 1}
+            registry["known_sizes"][key] = size_mb
+            _record(registry, "load", key, seconds=round(load_seconds, 3), size_mb=size_mb)
+            print(f"📥 모델 로드: {key} ({size_mb:.0f} MB, {load_seconds:.2f}s) -> 상주 {_resident_mb(registry):.0f} MB")
+            _make_room(registry, 0.0, keep=key)
+        return model
+    finally:
+        with registry["lock"]:
+            registry["loading"].pop(key).set()
+
+
+def release_model(key: str, registry: Dict[str, Any] | None = None) -> None:
+    """acquire_model로 받은 모델 반납 (예산을 넘으면 이때 해제될 수 있음)"""
+    registry = registry or get_registry()
+    with registry["lock"]:
+        entry = registry["models"].get(key)
+        if entry is None:
+            return
+        entry["in_use"] = max(0, entry["in_use"] - 1)
+        _make_room(registry, 0.0)
+
+
+def evict_model(key: str, registry: Dict[str, Any] | None = None) -> bool:
+    """사용 중이 아닌 모델을 명시적으로 해제 (해제했으면 True)"""
+    registry = registry or get_registry()
+    with registry["lock"]:
+        entry = registry["models"].get(key)
+        if entry is None or entry["in_use"] > 0:
+            return False
+        _evict(registry, key, reason="explicit")
+        return True
+
+
+def registry_stats(registry: Dict[str, Any] | None = None) -> Dict[str, Any]:
+    """예산, 상주 모델, 로드/해제 이벤트 요약"""
+    registry = registry or get_registry()
+    with registry["lock"]:
+        events: List[Dict[str, Any]] = list(registry["events"])
+        return {
+            "budget_mb": registry["budget_mb"],
+            "resident_mb": _resident_mb(registry),
+            "models": {key: {k: v for k, v in entry.items() if k != "model"}
+                       for key, entry in registry["models"].items()},
+            "loads": sum(1 for event in events if event["event"] == "load"),
+            "evictions": sum(1 for event in events if event["event"] == "evict"),
+            "events": events,
+        }
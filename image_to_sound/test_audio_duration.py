@@ -0,0 +1,20 @@
+"""
+클립 길이 프로파일의 play_method 키워드가 단어 단위로만 일치하는지 확인 (pytest)
+"""
+
+from audio_duration import load_duration_profile, clip_duration
+
+
+def test_keyword_does_not_match_inside_other_words():
+    profile = load_duration_profile()
+    for play_method in ("tapestry sway", "tape hiss", "white noise whistle", "steppe wind", "stepwise glide"):
+        assert clip_duration({"play_method": play_method, "instrument": "guitar"}, profile, 4.0) == 5.0
+        assert clip_duration({"play_method": play_method, "instrument": None}, profile, 4.0) == 4.0
+
+
+def test_keyword_matches_inflected_forms():
+    profile = load_duration_profile()
+    assert clip_duration({"play_method": "tapping lightly", "instrument": "guitar"}, profile, 4.0) == 1.0
+    assert clip_duration({"play_method": "footsteps on gravel", "instrument": None}, profile, 4.0) == 1.5
+    assert clip_duration({"play_method": "rattling chain", "instrument": None}, profile, 4.0) == 2.0
+    assert clip_duration({"play_method": "rustling leaves", "instrument": None}, profile, 4.0) == 4.0
@@ -0,0 +1,12 @@
+"""
+main.py --help가 import 시간 예산 안에서 무거운 프레임워크 없이 시작되는지 확인 (pytest)
+"""
+
+import os
+
+from import_budget import check_import_budget
+
+
+def test_main_help_within_import_budget():
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    assert check_import_budget(script) is True
@@ -0,0 +1,32 @@
+"""
+few-shot 예시 답변이 JSON 스키마 제약을 통과하는지 확인 (pytest)
+"""
+
+import os
+
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from vlm_json_constraint import initial_state, feed_text, is_complete
+
+
+PROMPT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "vlm_prompt")
+
+
+@pytest.mark.parametrize("name", ["111_sound_source.json", "211_sound_source.json"])
+def test_few_shot_example_satisfies_schema(name):
+    with open(os.path.join(PROMPT_DIR, name), "r", encoding="utf-8") as f:
+        text = f.read().strip()
+    state = feed_text(initial_state(), text)
+    assert state is not None
+    assert is_complete(state)
+
+
+def test_variant_confidence_is_optional_number():
+    variant = '{"play_method": "tap", "timbre": ["dry"], "mapping_to_music_instrument": null, "confidence": 0.8}'
+    text = ('{"scene_description": "s", "mood_description": "m", "sound_sources": '
+            '[{"name": "cup", "material": "glass", "variants": [' + variant + ']}]}')
+    assert is_complete(feed_text(initial_state(), text))
+    assert feed_text(initial_state(), text.replace("0.8", '"high"')) is None
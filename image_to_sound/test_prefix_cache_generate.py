@@ -0,0 +1,93 @@
+"""
+Few-shot prefix cache 경로의 디코딩 루프가 model.generate와 같은 토큰을 내는지 확인 (pytest)
+작은 랜덤 Qwen2-VL 설정에서 greedy + repetition penalty로 비교한다 (텍스트만, 모델 다운로드 없음).
+"""
+
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+from vlm_qwen import _generate_with_prefix_cache, _get_rope_index, _freeze_past_key_values
+
+
+EOS_TOKEN_ID = 127
+PAD_TOKEN_ID = 0
+
+
+class _SuffixInputs:
+    """processor 출력 대신 쓰는 텍스트 전용 입력 (이미지 없음)"""
+
+    def __init__(self, input_ids):
+        self.input_ids = input_ids
+        self.attention_mask = torch.ones_like(input_ids)
+        self.pixel_values = None
+        self.image_grid_thw = torch.zeros((0, 3), dtype=torch.long)
+
+    def to(self, device):
+        return self
+
+
+class _Processor:
+    """토큰 id를 그대로 문자열로 바꾸는 processor 대역"""
+
+    def __init__(self):
+        self.tokenizer = type("Tokenizer", (), {"pad_token_id": PAD_TOKEN_ID, "eos_token_id": EOS_TOKEN_ID})()
+
+    def batch_decode(self, sequences, **kwargs):
+        return [" ".join(str(int(token)) for token in sequence) for sequence in sequences]
+
+
+def _tiny_model():
+    config = transformers.Qwen2VLConfig(
+        vocab_size=128,
+        hidden_size=32,
+        intermediate_size=64,
+        num_hidden_layers=2,
+        num_attention_heads=4,
+        num_key_value_heads=2,
+        max_position_embeddings=256,
+        initializer_range=0.2,
+        rope_scaling={"type": "mrope", "mrope_section": [2, 1, 1]},
+        vision_start_token_id=120,
+        vision_end_token_id=121,
+        image_token_id=122,
+        video_token_id=123,
+        eos_token_id=EOS_TOKEN_ID,
+        pad_token_id=PAD_TOKEN_ID,
+        vision_config={"depth": 1, "embed_dim": 16, "hidden_size": 32, "num_heads": 2, "mlp_ratio": 2},
+    )
+    model = transformers.Qwen2VLForConditionalGeneration(config).double().eval()
+    model.generation_config.eos_token_id = EOS_TOKEN_ID
+    model.generation_config.pad_token_id = PAD_TOKEN_ID
+    return model
+
+
+def test_prefix_cache_greedy_matches_generate():
+    torch.manual_seed(0)
+    model = _tiny_model()
+    prefix_ids = torch.randint(1, 100, (1, 10))
+    suffix_ids = torch.randint(1, 100, (1, 6))
+    generation_kwargs = {"max_new_tokens": 12, "do_sample": False, "repetition_penalty": 1.3}
+
+    prefix_mask = torch.ones_like(prefix_ids)
+    empty_grid = torch.zeros((0, 3), dtype=torch.long)
+    position_ids, _ = _get_rope_index(model, prefix_ids, empty_grid, prefix_mask)
+    with torch.no_grad():
+        outputs = model(input_ids=prefix_ids, attention_mask=prefix_mask, position_ids=position_ids, use_cache=True)
+    prefix_cache = {
+        "input_ids": prefix_ids,
+        "attention_mask": prefix_mask,
+        "image_grid_thw": empty_grid,
+        "past_key_values": _freeze_past_key_values(outputs.past_key_values),
+    }
+    cached = _generate_with_prefix_cache(model, _Processor(), _SuffixInputs(suffix_ids), prefix_cache,
+                                         generation_kwargs)
+
+    full_ids = torch.cat([prefix_ids, suffix_ids], dim=1)
+    with torch.no_grad():
+        output_ids = model.generate(input_ids=full_ids, attention_mask=torch.ones_like(full_ids),
+                                    **generation_kwargs)
+    expected = _Processor().batch_decode([output_ids[0, full_ids.shape[1]:]])[0]
+
+    assert cached == expected
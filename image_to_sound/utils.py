@@ -4,7 +4,9 @@
 """
 
 import os
-from typing import List
+import sys
+import hashlib
+from typing import List, Optional
 
 
 def ensure_dir(path: str) -> None:
@@ -53,6 +55,26 @@ def check_required_files(required_files: List[str]) -> List[str]:
     return missing_files
 
 
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    """파일 내용의 SHA-256 해시"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def peak_rss_mb() -> Optional[float]:
+    """현재 프로세스의 최대 RSS (MB, 측정 불가 플랫폼이면 None)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux는 KB, macOS는 byte 단위
+    return usage / (1024 * 1024) if sys.platform == "darwin" else usage / 1024
+
+
 def sanitize_filename(text: str, max_length: int = 120) -> str:
     """파일명에 사용할 수 없는 문자를 제거하고 길이를 제한"""
     invalid_chars = '<>:"/\\|?*'
@@ -0,0 +1,23 @@
+"""
+VLM 설정 상수
+torch/transformers 없이 import할 수 있도록 모델 ID, 생성 파라미터, CLI 선택지를 모아 둔다.
+(CLI --help와 캐시 키 계산이 무거운 프레임워크를 로드하지 않게 하기 위함)
+"""
+
+DEFAULT_MODEL_ID = "Qwen/Qwen2-VL-7B-Instruct"
+DEFAULT_DRAFT_MODEL_ID = "Qwen/Qwen2-VL-2B-Instruct"
+
+# size: 파일 목록과 크기만 확인 / hash: SHA-256까지 확인 / download: 항상 Hub와 동기화
+SNAPSHOT_CHECKS = ("size", "hash", "download")
+DEFAULT_SNAPSHOT_CHECK = "size"
+
+CPU_QUANT_MODES = ("none", "bf16", "int8")
+DEFAULT_CPU_QUANT = "none"
+
+# generate_sound_json 기본 생성 파라미터 (캐시 경로와 비캐시 경로가 공유)
+GENERATION_KWARGS = {
+    "max_new_tokens": 1024,
+    "do_sample": True,
+    "temperature": 0.3,
+    "top_p": 0.8,
+}
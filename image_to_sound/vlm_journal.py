@@ -0,0 +1,86 @@
+"""
+배치 처리 저널
+이미지별 결과를 처리 직후 JSONL 파일에 한 줄씩 기록해 두고,
+중단된 배치를 다시 실행하면 이미 끝난 이미지는 건너뛰고 저널로 결과를 복원한다.
+"""
+
+import os
+import json
+from datetime import datetime
+from typing import Dict, Any, List, Tuple
+
+from utils import file_sha256
+
+
+JOURNAL_NAME = "processing_journal.jsonl"
+
+
+def journal_path(output_dir: str) -> str:
+    return os.path.join(output_dir, JOURNAL_NAME)
+
+
+def reset_journal(output_dir: str) -> None:
+    """새 배치를 시작할 때 이전 저널 삭제"""
+    path = journal_path(output_dir)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def append_journal(output_dir: str, image_path: str, result: Dict[str, Any]) -> None:
+    """이미지 하나의 결과를 저널에 추가 (fsync까지 완료해야 반환)"""
+    entry = {
+        "image_path": os.path.abspath(image_path),
+        "image_sha256": file_sha256(image_path) if os.path.exists(image_path) else None,
+        "journaled": datetime.now().isoformat(),
+        "result": result,
+    }
+    path = journal_path(output_dir)
+    line = json.dumps(entry, ensure_ascii=False) + "\n"
+    if os.path.exists(path) and os.path.getsize(path) > 0:
+        with open(path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                # 중단으로 잘린 마지막 줄과 새 항목이 붙지 않도록 줄 구분
+                line = "\n" + line
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(line)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def load_journal(output_dir: str) -> Dict[str, Dict[str, Any]]:
+    """이미지별 마지막 저널 항목 (중단 시 잘린 마지막 줄은 무시)"""
+    path = journal_path(output_dir)
+    entries = {}
+    if not os.path.exists(path):
+        return entries
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            entries[entry["image_path"]] = entry
+    return entries
+
+
+def restore_journaled_results(image_files: List[str],
+                              output_dir: str) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+    """출력 JSON이 남아 있고 입력 해시가 같은 성공 결과는 복원하고, 나머지를 처리 대상으로 반환"""
+    journal = load_journal(output_dir)
+    restored = {}
+    pending = []
+    for image_path in image_files:
+        entry = journal.get(os.path.abspath(image_path))
+        result = entry["result"] if entry else None
+        if (
+            result is not None
+            and result.get("success")
+            and os.path.exists(result.get("output_json_path", ""))
+            and entry["image_sha256"] == file_sha256(image_path)
+        ):
+            restored[image_path] = dict(result, resumed=True)
+        else:
+            pending.append(image_path)
+    return restored, pending
@@ -0,0 +1,305 @@
+"""
+Sound source JSON 스키마 제약 디코딩
+validate_json_structure가 검사하는 구조(scene_description, mood_description,
+sound_sources → variants → play_method/timbre/mapping_to_music_instrument, 선택 항목 confidence)를
+문자 단위 pushdown automaton으로 표현하고, 생성 중 스키마를 벗어나는 토큰을 마스킹한다.
+최상위 객체가 닫히는 즉시 생성을 종료한다.
+"""
+
+import re
+from typing import Dict, Any, List, Optional, Tuple
+
+import torch
+from transformers import LogitsProcessor, StoppingCriteria
+
+
+_STRING = {"type": ["string"]}
+
+SOUND_SOURCE_SCHEMA: Dict[str, Any] = {
+    "type": ["object"],
+    "properties": {
+        "scene_description": _STRING,
+        "mood_description": _STRING,
+        "sound_sources": {
+            "type": ["array"],
+            "items": {
+                "type": ["object"],
+                "properties": {
+                    "name": _STRING,
+                    "material": _STRING,
+                    "variants": {
+                        "type": ["array"],
+                        "items": {
+                            "type": ["object"],
+                            "properties": {
+                                "play_method": _STRING,
+                                "timbre": {"type": ["array"], "items": _STRING},
+                                "mapping_to_music_instrument": {"type": ["string", "null"]},
+                                "confidence": {"type": ["number"]},
+                            },
+                            # confidence는 선택 항목 (few-shot 예시와 validate_json_structure는 요구하지 않음)
+                            "required": ["play_method", "timbre", "mapping_to_music_instrument"],
+                        },
+                    },
+                },
+                "required": ["name", "material", "variants"],
+            },
+        },
+    },
+    "required": ["scene_description", "mood_description", "sound_sources"],
+}
+
+_WHITESPACE = " \t\n\r"
+_HEX = "0123456789abcdefABCDEF"
+_NUMBER_PREFIX = re.compile(r"-?(\d+(\.\d*)?([eE][+-]?\d*)?)?")
+_NUMBER_FULL = re.compile(r"-?\d+(\.\d+)?([eE][+-]?\d+)?")
+
+# 상태는 불변 tuple 스택: 후보 토큰 검사 시 복사 없이 분기 가능
+# ("value", schema) / ("obj", schema, used, phase, key) / ("arr", item_schema, phase)
+# ("str", escape) / ("num", buf) / ("lit", remaining)
+State = Tuple[tuple, ...]
+
+
+def initial_state(schema: Dict[str, Any] = SOUND_SOURCE_SCHEMA) -> State:
+    """스키마 최상위 값을 기다리는 초기 상태"""
+    return (("value", schema),)
+
+
+def is_complete(state: Optional[State]) -> bool:
+    """최상위 객체가 닫혔는지 여부"""
+    return state == ()
+
+
+def _start_value(frames: State, schema: Dict[str, Any], ch: str) -> Optional[State]:
+    types = schema["type"]
+    if ch == '"' and "string" in types:
+        return frames + (("str", 0),)
+    if ch == "{" and "object" in types:
+        return frames + (("obj", schema, frozenset(), "open", ""),)
+    if ch == "[" and "array" in types:
+        return frames + (("arr", schema["items"], "open"),)
+    if ch == "n" and "null" in types:
+        return frames + (("lit", "ull"),)
+    if (ch == "-" or ch in "0123456789") and "number" in types:
+        return frames + (("num", ch),)
+    return None
+
+
+def _feed_object(frames: State, frame: tuple, ch: str) -> Optional[State]:
+    _, schema, used, phase, key = frame
+    props = schema["properties"]
+    parent = frames[:-1]
+
+    if phase == "key":
+        if ch == '"':
+            if key in props and key not in used:
+                return parent + (("obj", schema, used, "colon", key),)
+            return None
+        candidate = key + ch
+        if ch != "\\" and any(k.startswith(candidate) and k not in used for k in props):
+            return parent + (("obj", schema, used, "key", candidate),)
+        return None
+
+    if ch in _WHITESPACE:
+        return frames
+
+    closable = all(k in used for k in schema.get("required", []))
+    if phase in ("open", "need_key"):
+        if ch == '"':
+            return parent + (("obj", schema, used, "key", ""),)
+        if ch == "}" and phase == "open" and closable:
+            return parent
+        return None
+    if phase == "colon":
+        if ch == ":":
+            return parent + (("obj", schema, used | {key}, "comma_or_close", ""), ("value", props[key]))
+        return None
+    if phase == "comma_or_close":
+        if ch == "," and len(used) < len(props):
+            return parent + (("obj", schema, used, "need_key", ""),)
+        if ch == "}" and closable:
+            return parent
+    return None
+
+
+def _feed_array(frames: State, frame: tuple, ch: str) -> Optional[State]:
+    _, item_schema, phase = frame
+    parent = frames[:-1]
+
+    if ch in _WHITESPACE:
+        return frames
+    if phase == "open" and ch == "]":
+        return parent
+    if phase in ("open", "need_value"):
+        return _start_value(parent + (("arr", item_schema, "comma_or_close"),), item_schema, ch)
+    if phase == "comma_or_close":
+        if ch == ",":
+            return parent + (("arr", item_schema, "need_value"),)
+        if ch == "]":
+            return parent
+    return None
+
+
+def feed_char(frames: Optional[State], ch: str) -> Optional[State]:
+    """문자 하나를 소비한 다음 상태 (스키마 위반이면 None)"""
+    if frames is None:
+        return None
+    if not frames:
+        # 최상위 객체가 닫힌 뒤에는 공백만 허용
+        return frames if ch in _WHITESPACE else None
+
+    frame = frames[-1]
+    kind = frame[0]
+
+    if kind == "value":
+        if ch in _WHITESPACE:
+            return frames
+        return _start_value(frames[:-1], frame[1], ch)
+
+    if kind == "str":
+        escape = frame[1]
+        if escape == 0:
+            if ch == '"':
+                return frames[:-1]
+            if ch == "\\":
+                return frames[:-1] + (("str", -1),)
+            if ord(ch) < 0x20:
+                return None
+            return frames
+        if escape == -1:
+            if ch == "u":
+                return frames[:-1] + (("str", 4),)
+            if ch in '"\\/bfnrt':
+                return frames[:-1] + (("str", 0),)
+            return None
+        if ch in _HEX:
+            return frames[:-1] + (("str", escape - 1),)
+        return None
+
+    if kind == "num":
+        buf = frame[1] + ch
+        if _NUMBER_PREFIX.fullmatch(buf):
+            return frames[:-1] + (("num", buf),)
+        if not _NUMBER_FULL.fullmatch(frame[1]):
+            return None
+        # 숫자가 끝났으므로 현재 문자는 상위 프레임이 처리
+        return feed_char(frames[:-1], ch)
+
+    if kind == "lit":
+        remaining = frame[1]
+        if ch != remaining[0]:
+            return None
+        if len(remaining) == 1:
+            return frames[:-1]
+        return frames[:-1] + (("lit", remaining[1:]),)
+
+    if kind == "obj":
+        return _feed_object(frames, frame, ch)
+
+    if kind == "arr":
+        return _feed_array(frames, frame, ch)
+
+    return None
+
+
+def feed_text(frames: Optional[State], text: str) -> Optional[State]:
+    """문자열 전체를 소비한 다음 상태"""
+    for ch in text:
+        frames = feed_char(frames, ch)
+        if frames is None:
+            return None
+    return frames
+
+
+class JsonSchemaLogitsProcessor(LogitsProcessor):
+    """스키마를 벗어나는 토큰을 -inf로 마스킹하는 logits processor
+
+    전체 vocab을 매 스텝 검사하지 않고 점수 상위 후보부터 검사하며,
+    유효한 후보가 없을 때만 범위를 넓힌다.
+    """
+
+    def __init__(self, tokenizer, eos_token_ids: List[int], schema: Dict[str, Any] = SOUND_SOURCE_SCHEMA,
+                 top_candidates: int = 32, scan_chunk: int = 2048):
+        self.tokenizer = tokenizer
+        self.eos_token_ids = list(eos_token_ids)
+        self.schema = schema
+        self.top_candidates = top_candidates
+        self.scan_chunk = scan_chunk
+        self.special_ids = set(tokenizer.all_special_ids) | set(tokenizer.get_added_vocab().values())
+        self.token_text: Dict[int, str] = {}
+        self.states: List[Optional[State]] = []
+        self.consumed: List[int] = []
+        self.prompt_length: Optional[int] = None
+
+    def _text(self, token_id: int) -> str:
+        text = self.token_text.get(token_id)
+        if text is None:
+            text = "" if token_id in self.special_ids else self.tokenizer.decode([token_id])
+            self.token_text[token_id] = text
+        return text
+
+    def sync(self, input_ids: torch.LongTensor) -> None:
+        """새로 생성된 토큰들을 상태에 반영 (여러 번 호출해도 안전)"""
+        if self.prompt_length is None:
+            self.prompt_length = input_ids.shape[1]
+            self.states = [initial_state(self.schema) for _ in range(input_ids.shape[0])]
+            self.consumed = [self.prompt_length] * input_ids.shape[0]
+            return
+
+        for row in range(input_ids.shape[0]):
+            for token_id in input_ids[row, self.consumed[row]:].tolist():
+                text = self._text(token_id)
+                if text and self.states[row] is not None and not is_complete(self.states[row]):
+                    self.states[row] = feed_text(self.states[row], text)
+            self.consumed[row] = input_ids.shape[1]
+
+    def is_done(self, row: int) -> bool:
+        return is_complete(self.states[row]) if row < len(self.states) else False
+
+    def _allowed_tokens(self, state: State, row_scores: torch.FloatTensor) -> List[int]:
+        order = torch.argsort(row_scores, descending=True).tolist()
+
+        allowed = []
+        start, end = 0, min(self.top_candidates, len(order))
+        while start < len(order) and not allowed:
+            for token_id in order[start:end]:
+                text = self._text(token_id)
+                if text and feed_text(state, text) is not None:
+                    allowed.append(token_id)
+            start, end = end, min(end + self.scan_chunk, len(order))
+        return allowed
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor) -> torch.FloatTensor:
+        self.sync(input_ids)
+
+        masked = torch.full_like(scores, float("-inf"))
+        for row in range(scores.shape[0]):
+            state = self.states[row]
+            if state is None:
+                # 상태를 잃은 경우 해당 행은 제약 없이 생성
+                masked[row] = scores[row]
+                continue
+
+            allowed = self.eos_token_ids if is_complete(state) else self._allowed_tokens(state, scores[row])
+            if not allowed:
+                masked[row] = scores[row]
+                continue
+
+            index = torch.tensor(allowed, device=scores.device)
+            masked[row, index] = scores[row, index]
+            if not torch.isfinite(masked[row]).any():
+                # 앞선 warper가 유효 토큰을 모두 잘라낸 경우 유효 토큰 중 균등 선택
+                masked[row, index] = 0.0
+        return masked
+
+
+class JsonObjectStoppingCriteria(StoppingCriteria):
+    """최상위 JSON 객체가 닫히면 해당 행의 생성을 종료"""
+
+    def __init__(self, constraint: JsonSchemaLogitsProcessor):
+        self.constraint = constraint
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs) -> torch.BoolTensor:
+        self.constraint.sync(input_ids)
+        done = [self.constraint.is_done(row) for row in range(input_ids.shape[0])]
+        return torch.tensor(done, dtype=torch.bool, device=input_ids.device)
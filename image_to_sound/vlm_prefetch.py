@@ -0,0 +1,71 @@
+"""
+VLM 입력 prefetch
+현재 이미지가 생성되는 동안 다음 K개 이미지의 디코딩/리사이즈/processor 전처리를
+스레드 풀에서 미리 수행한다. 미리 준비해 두는 입력은 최대 K개로 제한된다.
+"""
+
+import copy
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from vlm_qwen import prepare_vlm_inputs
+
+
+def prefetch(items: Iterable[Any], prepare: Callable[[Any], Any], depth: int = 2,
+             num_workers: int = 1) -> Iterator[Tuple[Any, Any, Optional[Exception], float]]:
+    """items 순서대로 (item, 준비 결과, 예외, 대기 시간)을 반환하며 다음 depth개를 미리 준비"""
+    items = iter(items)
+    pending = deque()
+    executor = ThreadPoolExecutor(max_workers=max(1, num_workers), thread_name_prefix="vlm-prefetch")
+
+    def submit_next() -> None:
+        for item in items:
+            pending.append((item, executor.submit(prepare, item)))
+            return
+
+    try:
+        for _ in range(max(1, depth)):
+            submit_next()
+
+        while pending:
+            item, future = pending.popleft()
+            # 현재 항목을 꺼낸 자리만큼 다음 항목 예약 (메모리는 depth개로 제한)
+            submit_next()
+
+            wait_start = time.perf_counter()
+            try:
+                result, error = future.result(), None
+            except Exception as e:
+                result, error = None, e
+            yield item, result, error, time.perf_counter() - wait_start
+    finally:
+        # 소비자가 중간에 멈추면 아직 시작하지 않은 작업은 취소
+        for _, future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+def prefetch_vlm_inputs(image_paths: List[str], processor, prompt: str, example_images=None,
+                        prefix_cache: Dict[str, Any] | None = None, depth: int = 2,
+                        num_workers: int = 1) -> Iterator[Tuple[str, Dict[str, Any] | None, Optional[Exception]]]:
+    """이미지 경로 순서대로 (경로, prepare_vlm_inputs 결과, 예외) 반환
+
+    결과의 wait_seconds는 생성 루프가 전처리를 기다린 시간 (0에 가까울수록 완전히 겹침).
+    """
+    # fast tokenizer는 스레드 간 동시 사용이 안전하지 않으므로 워커 전용 processor 사본 사용
+    worker_processor = copy.deepcopy(processor)
+    processor_lock = threading.Lock()
+
+    def prepare(image_path: str) -> Dict[str, Any]:
+        return prepare_vlm_inputs(
+            worker_processor, image_path, prompt, use_few_shot=True, example_images=example_images,
+            prefix_cache=prefix_cache, processor_lock=processor_lock
+        )
+
+    for image_path, prepared, error, wait_seconds in prefetch(image_paths, prepare, depth, num_workers):
+        if prepared is not None:
+            prepared["wait_seconds"] = round(wait_seconds, 3)
+        yield image_path, prepared, error
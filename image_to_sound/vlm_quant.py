@@ -0,0 +1,304 @@
+"""
+CPU 양자화 추론 모드
+CPU 전용 환경에서 Qwen2-VL을 bf16 가중치 또는 동적 int8 Linear로 로드한다.
+변환 결과는 원본 스냅샷 옆 디렉토리에 한 번 저장해 두고 이후 실행에서는 바로 로드한다.
+int8은 모듈 객체가 아닌 state_dict만 저장하고 weights_only=True로 읽는다 (캐시 파일의 pickle 코드 실행 방지).
+"""
+
+import os
+import sys
+import json
+import time
+import subprocess
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+import torch
+import transformers
+from transformers import Qwen2VLForConditionalGeneration
+
+from utils import ensure_dir, peak_rss_mb
+from vlm_config import CPU_QUANT_MODES
+
+_META_NAME = "wave_quant_meta.json"
+_INT8_WEIGHTS_NAME = "model_int8.pt"
+# 저장 형식이 바뀌면 올려서 이전 변환본을 다시 만들게 함
+_INT8_FORMAT = "state_dict-v1"
+
+
+def quantized_dir(local_dir: str, mode: str) -> str:
+    """변환 결과 저장 위치 (원본 스냅샷 디렉토리 옆)"""
+    return f"{os.path.normpath(local_dir)}-{mode}"
+
+
+def _conversion_meta(local_dir: str, mode: str) -> Dict[str, Any]:
+    """변환 결과를 재사용해도 되는지 판단하는 메타데이터"""
+    return {
+        "mode": mode,
+        "source": os.path.abspath(local_dir),
+        "torch": torch.__version__,
+        "transformers": transformers.__version__,
+        "format": _INT8_FORMAT if mode == "int8" else None,
+    }
+
+
+def _is_conversion_valid(out_dir: str, meta: Dict[str, Any]) -> bool:
+    meta_path = os.path.join(out_dir, _META_NAME)
+    if not os.path.exists(meta_path):
+        return False
+    with open(meta_path, "r", encoding="utf-8") as f:
+        saved = json.load(f)
+    return all(saved.get(k) == v for k, v in meta.items())
+
+
+def _language_model(model):
+    """디코더 부분 (transformers 버전에 따라 model.model 또는 model.model.language_model)"""
+    inner = model.model
+    return getattr(inner, "language_model", inner)
+
+
+def _convert_bf16(local_dir: str, out_dir: str) -> None:
+    model = Qwen2VLForConditionalGeneration.from_pretrained(
+        local_dir,
+        dtype=torch.bfloat16,
+        low_cpu_mem_usage=True,
+        trust_remote_code=True,
+        local_files_only=True,
+    )
+    model.save_pretrained(out_dir, safe_serialization=True)
+
+
+def _convert_int8(local_dir: str, out_dir: str) -> None:
+    model = Qwen2VLForConditionalGeneration.from_pretrained(
+        local_dir,
+        dtype=torch.float32,
+        low_cpu_mem_usage=True,
+        trust_remote_code=True,
+        local_files_only=True,
+    )
+    # 디코더의 Linear만 동적 int8로 변환 (vision tower와 lm_head는 float32 유지)
+    torch.ao.quantization.quantize_dynamic(
+        _language_model(model), {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+    )
+    model.config.save_pretrained(out_dir)
+    # 비영속 버퍼(rotary inv_freq 등)는 state_dict에 없으므로 함께 저장
+    torch.save({"state_dict": model.state_dict(), "buffers": dict(model.named_buffers())},
+               os.path.join(out_dir, _INT8_WEIGHTS_NAME))
+
+
+def _replace_linear_with_dynamic(module) -> None:
+    """nn.Linear를 같은 크기의 동적 int8 Linear로 교체 (가중치는 load_state_dict로 채움)"""
+    for name, child in module.named_children():
+        if isinstance(child, torch.nn.Linear):
+            setattr(module, name, torch.ao.nn.quantized.dynamic.Linear(
+                child.in_features, child.out_features, bias_=child.bias is not None, dtype=torch.qint8
+            ))
+        else:
+            _replace_linear_with_dynamic(child)
+
+
+def _load_int8(out_dir: str):
+    """저장된 config로 meta 디바이스에 뼈대를 만들고 int8 state_dict를 채움 (float32 전체를 올리지 않음)"""
+    config = Qwen2VLForConditionalGeneration.config_class.from_pretrained(out_dir)
+    with torch.device("meta"):
+        model = Qwen2VLForConditionalGeneration._from_config(config)
+    _replace_linear_with_dynamic(_language_model(model))
+
+    saved = torch.load(os.path.join(out_dir, _INT8_WEIGHTS_NAME), weights_only=True)
+    model.load_state_dict(saved["state_dict"], assign=True)
+    for name, buffer in saved["buffers"].items():
+        module_name, _, buffer_name = name.rpartition(".")
+        module = model.get_submodule(module_name)
+        module.register_buffer(buffer_name, buffer, persistent=buffer_name not in module._non_persistent_buffers_set)
+    model.tie_weights()
+    return model
+
+
+def ensure_cpu_quantized(local_dir: str, mode: str) -> bool:
+    """변환본이 없거나 버전이 바뀌었으면 한 번 변환 후 저장 (이번에 변환했으면 True)"""
+    if mode not in CPU_QUANT_MODES or mode == "none":
+        raise ValueError(f"cpu quant mode must be one of {CPU_QUANT_MODES[1:]}: {mode}")
+
+    out_dir = quantized_dir(local_dir, mode)
+    meta = _conversion_meta(local_dir, mode)
+
+    converted = False
+    if not _is_conversion_valid(out_dir, meta):
+        print(f"CPU {mode} 변환 중 (1회): {out_dir}")
+        ensure_dir(out_dir)
+        if mode == "bf16":
+            _convert_bf16(local_dir, out_dir)
+        else:
+            _convert_int8(local_dir, out_dir)
+        meta["created"] = datetime.now().isoformat()
+        with open(os.path.join(out_dir, _META_NAME), "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+        print(f"✅ CPU {mode} 변환 저장 완료")
+        converted = True
+    return converted
+
+
+def load_cpu_quantized(local_dir: str, mode: str):
+    """양자화된 CPU 모델 로드 (변환본이 없거나 버전이 바뀌었으면 한 번 변환 후 저장)"""
+    ensure_cpu_quantized(local_dir, mode)
+    out_dir = quantized_dir(local_dir, mode)
+
+    if mode == "bf16":
+        model = Qwen2VLForConditionalGeneration.from_pretrained(
+            out_dir,
+            dtype=torch.bfloat16,
+            trust_remote_code=True,
+            local_files_only=True,
+        )
+    else:
+        model = _load_int8(out_dir)
+    model.eval()
+    return model
+
+
+def _source_names(json_data: Optional[Dict[str, Any]]) -> set:
+    if not isinstance(json_data, dict):
+        return set()
+    return {str(s.get("name", "")).lower() for s in json_data.get("sound_sources", [])}
+
+
+def _run_convert_worker(mode: str, output_path: str) -> None:
+    """변환만 수행하고 변환 피크 RSS를 JSON으로 저장 (측정 프로세스와 분리하기 위해 하위 프로세스에서 실행)"""
+    from vlm_qwen import resolve_model_dir
+    from vlm_config import DEFAULT_MODEL_ID
+
+    start_time = time.perf_counter()
+    local_dir = resolve_model_dir(DEFAULT_MODEL_ID, "qwen2-vl-7b-instruct")
+    converted = ensure_cpu_quantized(local_dir, mode)
+    report = {
+        "mode": mode,
+        "converted": converted,
+        "seconds": round(time.perf_counter() - start_time, 3),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+
+def _run_subprocess_report(worker_args: List[str], output_path: str) -> Dict[str, Any]:
+    subprocess.run([sys.executable, os.path.abspath(__file__), *worker_args, "--out", output_path], check=True)
+    with open(output_path, "r", encoding="utf-8") as f:
+        report = json.load(f)
+    os.remove(output_path)
+    return report
+
+
+def _run_mode_worker(mode: str, seed: int, output_path: str) -> None:
+    """한 모드를 로드해 예시 이미지들을 처리하고 측정값을 JSON으로 저장 (하위 프로세스에서 실행)"""
+    from vlm_qwen import load_qwen_vl, process_image_with_vlm
+    from vlm_prompt.extract_sources import get_scene_to_sound_prompt
+    from image_to_text import validate_json_structure, count_total_variants
+
+    model, processor = load_qwen_vl(cpu_quant=mode)
+    prompt, example_images = get_scene_to_sound_prompt()
+
+    images = []
+    for image_path, _ in example_images:
+        torch.manual_seed(seed)
+        # 예시 이미지 자체를 few-shot으로 넣으면 답을 복사하므로 few-shot 없이 비교
+        parsed = process_image_with_vlm(model, processor, image_path, prompt, example_images=None)
+        stats = parsed.get("generation_stats", {})
+        tokens = stats.get("generated_tokens", 0)
+        elapsed = stats.get("elapsed_seconds", 0.0)
+        images.append({
+            "image_path": image_path,
+            "success": parsed["success"],
+            "json_data": parsed["json_data"],
+            "validation_issues": validate_json_structure(parsed["json_data"]) if parsed["success"] else None,
+            "total_variants": count_total_variants(parsed["json_data"]),
+            "generated_tokens": tokens,
+            "elapsed_seconds": elapsed,
+            "tokens_per_sec": round(tokens / elapsed, 3) if elapsed else 0.0,
+        })
+
+    report = {
+        "mode": mode,
+        "model_load": getattr(model, "load_timings", None),
+        "peak_rss_mb": peak_rss_mb(),
+        "images": images,
+    }
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+def compare_modes(modes: List[str], seed: int = 0, report_path: str = "quant_report.json") -> Dict[str, Any]:
+    """모드별로 별도 프로세스에서 측정해 메모리/속도/float32 대비 정확도를 비교
+
+    1회 변환(float32 로드 포함)은 측정 프로세스 전에 별도 프로세스에서 끝내 두므로
+    peak_rss_mb는 추론 RSS만, conversion_peak_rss_mb는 변환 RSS만 나타낸다.
+    """
+    reports = {}
+    for mode in modes:
+        output_path = f"{report_path}.{mode}.tmp"
+        conversion = None
+        if mode != "none":
+            print(f"\n🔧 {mode} 변환 확인 중...")
+            conversion = _run_subprocess_report(["--convert", mode], output_path)
+        print(f"\n🔬 {mode} 측정 중...")
+        reports[mode] = _run_subprocess_report(["--worker", mode, "--seed", str(seed)], output_path)
+        reports[mode]["conversion"] = conversion
+
+    reference = reports.get("none")
+    summary = []
+    for mode, report in reports.items():
+        images = report["images"]
+        total_tokens = sum(img["generated_tokens"] for img in images)
+        total_seconds = sum(img["elapsed_seconds"] for img in images)
+        row = {
+            "mode": mode,
+            "peak_rss_mb": report["peak_rss_mb"],
+            # 이번 실행에서 변환했을 때만 값이 있음 (기존 변환본을 재사용했으면 None)
+            "conversion_peak_rss_mb": (report["conversion"]["peak_rss_mb"]
+                                       if report["conversion"] and report["conversion"]["converted"] else None),
+            "load_seconds": (report["model_load"] or {}).get("total_seconds"),
+            "tokens_per_sec": round(total_tokens / total_seconds, 3) if total_seconds else 0.0,
+            "json_valid": sum(1 for img in images if img["success"]),
+            "images": len(images),
+        }
+        if reference is not None:
+            # float32 출력과 사운드 소스 이름 집합의 Jaccard 유사도
+            overlaps = []
+            for img, ref in zip(images, reference["images"]):
+                a, b = _source_names(img["json_data"]), _source_names(ref["json_data"])
+                overlaps.append(len(a & b) / len(a | b) if a | b else 1.0)
+            row["source_jaccard_vs_fp32"] = round(sum(overlaps) / len(overlaps), 3) if overlaps else None
+        summary.append(row)
+
+    result = {"timestamp": datetime.now().isoformat(), "seed": seed, "summary": summary, "reports": reports}
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+
+    print("\n📊 CPU 양자화 모드 비교")
+    for row in summary:
+        print(
+            f"  - {row['mode']:>5}: RSS {row['peak_rss_mb']} MB (변환 {row['conversion_peak_rss_mb']} MB), "
+            f"{row['tokens_per_sec']} tok/s, "
+            f"JSON {row['json_valid']}/{row['images']}, fp32 대비 {row.get('source_jaccard_vs_fp32')}"
+        )
+    print(f"📁 리포트: {report_path}")
+    return result
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Qwen2-VL CPU 양자화 모드 비교 (메모리, tokens/sec, float32 대비 정확도)")
+    parser.add_argument("--modes", nargs="+", default=list(CPU_QUANT_MODES), choices=CPU_QUANT_MODES, help="비교할 모드")
+    parser.add_argument("--seed", type=int, default=0, help="모드 간 동일한 샘플링 시드")
+    parser.add_argument("--report", type=str, default="quant_report.json", help="리포트 저장 경로")
+    parser.add_argument("--worker", type=str, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--convert", type=str, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--out", type=str, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.convert:
+        _run_convert_worker(args.convert, args.out)
+    elif args.worker:
+        _run_mode_worker(args.worker, args.seed, args.out)
+    else:
+        compare_modes(args.modes, seed=args.seed, report_path=args.report)
@@ -1,17 +1,37 @@
 import os
+import copy
 import json
 import re
-from PIL import Image
+import time
+import contextlib
 import torch
 from datetime import datetime
 import traceback
-from typing import Tuple
+from typing import Tuple, Dict, Any, List
 from huggingface_hub import snapshot_download
 from transformers import (
     Qwen2VLForConditionalGeneration,
     AutoProcessor,
+    LogitsProcessorList,
+    RepetitionPenaltyLogitsProcessor,
+    TemperatureLogitsWarper,
+    TopKLogitsWarper,
+    TopPLogitsWarper,
+    StoppingCriteriaList,
 )
 
+from vlm_json_constraint import JsonSchemaLogitsProcessor, JsonObjectStoppingCriteria
+from vlm_config import (
+    DEFAULT_MODEL_ID,
+    DEFAULT_DRAFT_MODEL_ID,
+    SNAPSHOT_CHECKS,
+    CPU_QUANT_MODES,
+    GENERATION_KWARGS,
+)
+from vlm_quant import load_cpu_quantized
+from image_budget import max_pixels_for_tokens, visual_token_count, load_image_with_budget
+from utils import file_sha256
+
 
 def _ensure_hf_caches_on_windows():
     """Set HF cache envs to safe paths (avoid symlinks issues on Windows)."""
@@ -35,30 +55,244 @@ def _download_snapshot(model_id: str, local_dir: str) -> str:
     return local_dir
 
 
+MANIFEST_NAME = ".wave_snapshot_manifest.json"
+
+def _list_snapshot_files(local_dir: str) -> List[str]:
+    """스냅샷 디렉토리의 모델 파일 목록 (manifest와 HF 내부 캐시 폴더 제외)"""
+    files = []
+    for root_dir, dirs, names in os.walk(local_dir):
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        for name in names:
+            if name == MANIFEST_NAME or name.endswith(".incomplete") or name.endswith(".lock"):
+                continue
+            files.append(os.path.relpath(os.path.join(root_dir, name), local_dir).replace(os.sep, "/"))
+    return sorted(files)
+
+
+def _write_snapshot_manifest(local_dir: str, model_id: str) -> Dict[str, Any]:
+    """다운로드 완료된 스냅샷의 파일 목록 + 크기 + 해시를 manifest로 저장"""
+    manifest = {
+        "model_id": model_id,
+        "created": datetime.now().isoformat(),
+        "files": {
+            rel_path: {
+                "size": os.path.getsize(os.path.join(local_dir, rel_path)),
+                "sha256": file_sha256(os.path.join(local_dir, rel_path)),
+            }
+            for rel_path in _list_snapshot_files(local_dir)
+        },
+    }
+    with open(os.path.join(local_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def _legacy_snapshot_is_complete(local_dir: str) -> bool:
+    """manifest 이전에 받은 스냅샷: config와 safetensors index의 shard가 모두 있으면 완전한 것으로 간주"""
+    if not os.path.exists(os.path.join(local_dir, "config.json")):
+        return False
+    index_path = os.path.join(local_dir, "model.safetensors.index.json")
+    if os.path.exists(index_path):
+        with open(index_path, "r", encoding="utf-8") as f:
+            shards = set(json.load(f).get("weight_map", {}).values())
+        return bool(shards) and all(os.path.exists(os.path.join(local_dir, s)) for s in shards)
+    return os.path.exists(os.path.join(local_dir, "model.safetensors"))
+
+
+def check_snapshot(local_dir: str, verify_hashes: bool = False) -> List[str]:
+    """manifest 기준으로 누락/손상된 파일 목록 반환 (빈 리스트면 완전한 스냅샷)"""
+    manifest_path = os.path.join(local_dir, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return [MANIFEST_NAME]
+
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    problems = []
+    for rel_path, info in manifest.get("files", {}).items():
+        path = os.path.join(local_dir, rel_path)
+        if not os.path.exists(path) or os.path.getsize(path) != info["size"]:
+            problems.append(rel_path)
+        elif verify_hashes and file_sha256(path) != info["sha256"]:
+            problems.append(rel_path)
+    return problems
+
+
+def resolve_model_dir(model_id: str, cache_subdir: str, snapshot_check: str = "size") -> str:
+    """로컬 스냅샷이 완전하면 네트워크 없이 경로를 반환하고, 누락이 있거나 요청된 경우에만 다운로드"""
+    if snapshot_check not in SNAPSHOT_CHECKS:
+        raise ValueError(f"snapshot_check must be one of {SNAPSHOT_CHECKS}: {snapshot_check}")
+
+    local_dir = os.path.join(os.environ["TRANSFORMERS_CACHE"], cache_subdir)
+
+    if snapshot_check != "download" and os.path.isdir(local_dir):
+        problems = check_snapshot(local_dir, verify_hashes=(snapshot_check == "hash"))
+        if problems == [MANIFEST_NAME] and _legacy_snapshot_is_complete(local_dir):
+            print("기존 스냅샷에 manifest 생성 중...")
+            _write_snapshot_manifest(local_dir, model_id)
+            problems = []
+        if not problems:
+            return local_dir
+        print(f"⚠️ 로컬 스냅샷 불완전: {', '.join(problems[:5])}{' ...' if len(problems) > 5 else ''}")
+
+    if os.environ.get("HF_HUB_OFFLINE", "").lower() in ("1", "true", "yes"):
+        raise RuntimeError(f"오프라인 모드에서 모델 스냅샷이 불완전합니다: {local_dir}")
+
+    print(f"모델 스냅샷 다운로드 중: {model_id}")
+    _download_snapshot(model_id=model_id, local_dir=local_dir)
+    _write_snapshot_manifest(local_dir, model_id)
+    return local_dir
+
+
 def load_qwen_vl(
-    model_id: str = "Qwen/Qwen2-VL-7B-Instruct",
+    model_id: str = DEFAULT_MODEL_ID,
     cache_subdir: str = "qwen2-vl-7b-instruct",
+    snapshot_check: str = "size",
+    cpu_quant: str = "none",
+    max_visual_tokens: int | None = None,
+    draft_model_id: str | None = None,
 ) -> Tuple[Qwen2VLForConditionalGeneration, AutoProcessor]:
     _ensure_hf_caches_on_windows()
 
-    local_dir = os.path.join(os.environ["TRANSFORMERS_CACHE"], cache_subdir)
-    _download_snapshot(model_id=model_id, local_dir=local_dir)
+    if cpu_quant not in CPU_QUANT_MODES:
+        raise ValueError(f"cpu_quant must be one of {CPU_QUANT_MODES}: {cpu_quant}")
+    if cpu_quant != "none" and torch.cuda.is_available():
+        print(f"⚠️ CUDA 사용 가능: CPU 양자화 모드({cpu_quant})를 무시합니다")
+        cpu_quant = "none"
+
+    start_time = time.perf_counter()
+    local_dir = resolve_model_dir(model_id, cache_subdir, snapshot_check=snapshot_check)
+    resolve_seconds = time.perf_counter() - start_time
 
     torch_dtype = torch.float16 if torch.cuda.is_available() else torch.float32
 
-    model = Qwen2VLForConditionalGeneration.from_pretrained(
-        local_dir,
-        dtype=torch_dtype,
-        device_map="auto",
-        trust_remote_code=True,
-    )
+    if cpu_quant != "none":
+        model = load_cpu_quantized(local_dir, cpu_quant)
+    else:
+        model = Qwen2VLForConditionalGeneration.from_pretrained(
+            local_dir,
+            dtype=torch_dtype,
+            device_map="auto",
+            trust_remote_code=True,
+            local_files_only=True,
+        )
     processor = AutoProcessor.from_pretrained(
         local_dir,
-        trust_remote_code=True
+        trust_remote_code=True,
+        local_files_only=True,
     )
+    load_seconds = time.perf_counter() - start_time - resolve_seconds
+    apply_visual_token_budget(processor, max_visual_tokens)
+
+    model.load_timings = {
+        "snapshot_check": snapshot_check,
+        "cpu_quant": cpu_quant,
+        "resolve_seconds": round(resolve_seconds, 3),
+        "load_seconds": round(load_seconds, 3),
+        "total_seconds": round(resolve_seconds + load_seconds, 3),
+    }
+    print(f"⏱️ 모델 경로 확인 {resolve_seconds:.2f}s ({snapshot_check}) + 가중치 로드 {load_seconds:.2f}s")
+
+    if draft_model_id:
+        attach_draft_model(model, draft_model_id, snapshot_check=snapshot_check, cpu_quant=cpu_quant)
     return model, processor
 
 
+def _draft_cache_subdir(draft_model_id: str) -> str:
+    """draft 모델 캐시 디렉토리 이름 (예: Qwen/Qwen2-VL-2B-Instruct -> qwen2-vl-2b-instruct)"""
+    return draft_model_id.split("/")[-1].lower()
+
+
+def attach_draft_model(model, draft_model_id: str = DEFAULT_DRAFT_MODEL_ID, snapshot_check: str = "size",
+                       cpu_quant: str = "none") -> None:
+    """Speculative decoding용 소형 Qwen2-VL draft 모델을 로드해 본 모델에 연결 (get_draft_model로 조회)
+
+    draft는 본 모델과 같은 tokenizer/vision 토큰 규칙을 써야 하므로 같은 Qwen2-VL 계열만 지원한다.
+    """
+    start_time = time.perf_counter()
+    local_dir = resolve_model_dir(draft_model_id, _draft_cache_subdir(draft_model_id), snapshot_check=snapshot_check)
+
+    if cpu_quant != "none":
+        draft_model = load_cpu_quantized(local_dir, cpu_quant)
+    else:
+        draft_model = Qwen2VLForConditionalGeneration.from_pretrained(
+            local_dir,
+            dtype=model.dtype,
+            device_map="auto",
+            trust_remote_code=True,
+            local_files_only=True,
+        )
+    draft_model.eval()
+    draft_model.draft_model_id = draft_model_id
+    # nn.Module 속성으로 등록하면 draft가 본 모델의 submodule이 되어 parameters()/state_dict()와
+    # forward hook에 섞이므로 모듈 트리 밖에 붙임
+    object.__setattr__(model, "_draft_model", draft_model)
+
+    load_seconds = time.perf_counter() - start_time
+    if getattr(model, "load_timings", None) is not None:
+        model.load_timings["draft_model"] = {"model_id": draft_model_id, "load_seconds": round(load_seconds, 3)}
+    print(f"✅ Draft 모델 로드 완료: {draft_model_id} ({load_seconds:.2f}s)")
+
+
+def get_draft_model(model):
+    """attach_draft_model로 연결된 draft 모델 (없으면 None)"""
+    return model.__dict__.get("_draft_model")
+
+
+class _ForwardCounter:
+    """모듈의 forward 호출 횟수를 세는 context manager (draft 제안/본 모델 검증 횟수 측정용)"""
+
+    def __init__(self, module):
+        self.module = module
+        self.calls = 0
+        self._handle = None
+
+    def _hook(self, module, args, output):
+        self.calls += 1
+
+    def __enter__(self):
+        self._handle = self.module.register_forward_hook(self._hook)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._handle.remove()
+        return False
+
+
+def _speculative_stats(draft_model, generated_tokens: int, target_calls: int, draft_calls: int) -> Dict[str, Any]:
+    """assisted generation 통계
+
+    한 번의 검증 forward마다 (수락된 draft 토큰 + 1)개가 확정되므로
+    수락 토큰 = 생성 토큰 - 검증 횟수, draft forward 1회 = 제안 토큰 1개.
+    """
+    accepted = max(0, generated_tokens - target_calls)
+    return {
+        "draft_model": getattr(draft_model, "draft_model_id", None),
+        "draft_tokens": draft_calls,
+        "accepted_tokens": accepted,
+        "target_forward_passes": target_calls,
+        "acceptance_rate": round(accepted / draft_calls, 4) if draft_calls else 0.0,
+    }
+
+
+def apply_visual_token_budget(processor, max_visual_tokens: int | None) -> None:
+    """질의/few-shot 이미지 모두에 적용할 visual token 상한을 processor에 설정"""
+    if not max_visual_tokens:
+        processor.visual_max_pixels = None
+        return
+    max_pixels = max_pixels_for_tokens(max_visual_tokens)
+    processor.visual_max_pixels = max_pixels
+    image_processor = processor.image_processor
+    image_processor.max_pixels = max_pixels
+    if isinstance(getattr(image_processor, "size", None), dict) and "longest_edge" in image_processor.size:
+        image_processor.size["longest_edge"] = max_pixels
+    print(f"✅ Visual token 예산: {max_visual_tokens} tokens ({max_pixels} pixels)")
+
+
+def _visual_max_pixels(processor) -> int | None:
+    return getattr(processor, "visual_max_pixels", None)
+
+
 def _strip_examples_from_prompt(prompt_text):
     marker = "Final Output"
     if marker in prompt_text:
@@ -67,68 +301,374 @@ def _strip_examples_from_prompt(prompt_text):
     return prompt_text
 
 
-def generate_sound_json(model, processor, image_path, prompt, use_few_shot=True, example_images=None):
+FEW_SHOT_INSTRUCTION = "Analyze this image and generate a sound source JSON."
+
+
+def _build_few_shot_messages(example_images):
+    """Few-shot 예시 (이미지, JSON) 쌍을 chat 메시지로 변환"""
+    messages = []
+    for ex_img_path, ex_json in example_images or []:
+        if os.path.exists(ex_img_path):
+            messages.extend([
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "image", "image": ex_img_path},
+                        {"type": "text", "text": FEW_SHOT_INSTRUCTION}
+                    ]
+                },
+                {"role": "assistant", "content": ex_json}
+            ])
+    return messages
+
+
+def _build_query_message(image_path, prompt):
+    """현재 처리할 이미지에 대한 user 메시지 생성"""
+    core_instruction = _strip_examples_from_prompt(prompt)
+    return {
+        "role": "user",
+        "content": [
+            {"type": "image", "image": image_path},
+            {"type": "text", "text": core_instruction + " Output only the JSON object."}
+        ]
+    }
+
+
+def _load_message_images(messages, processor=None):
+    """메시지에 포함된 이미지들을 순서대로 로드 (processor의 visual token 예산 적용)"""
+    max_pixels = _visual_max_pixels(processor)
+    image_inputs = []
+    for message in messages:
+        if message["role"] == "user":
+            for content in message["content"]:
+                if content.get("type") == "image":
+                    img_path = content["image"]
+                    if os.path.exists(img_path):
+                        img = load_image_with_budget(img_path, max_pixels)
+                        image_inputs.append(img)
+    return image_inputs
+
+
+def _record_visual_tokens(processor, image_inputs, stats, prefix_tokens: int = 0) -> None:
+    """질의 이미지(마지막)와 전체 이미지의 visual token 수 기록 (prefix_tokens: prefix cache에 든 예시 이미지 몫)"""
+    if stats is None or not image_inputs:
+        return
+    max_pixels = _visual_max_pixels(processor)
+    counts = [visual_token_count(img.size, max_pixels) for img in image_inputs]
+    stats["visual_tokens"] = counts[-1]
+    stats["visual_tokens_total"] = sum(counts) + prefix_tokens
+
+
+def _few_shot_signature(example_images, processor=None) -> str:
+    """Few-shot 예시 구성을 식별하는 문자열 (prefix cache 무효화 판단용)"""
+    parts = [f"max_pixels={_visual_max_pixels(processor)}"]
+    for ex_img_path, ex_json in example_images or []:
+        if os.path.exists(ex_img_path):
+            stat = os.stat(ex_img_path)
+            parts.append(f"{os.path.abspath(ex_img_path)}:{stat.st_size}:{stat.st_mtime_ns}:{hash(ex_json)}")
+    return "|".join(parts)
+
+
+def _get_rope_index(model, input_ids, image_grid_thw, attention_mask):
+    """Qwen2-VL M-RoPE position id 계산 (transformers 버전별 위치 차이 흡수)"""
+    rope_fn = getattr(model, "get_rope_index", None)
+    if rope_fn is None:
+        rope_fn = model.model.get_rope_index
+    return rope_fn(input_ids, image_grid_thw, None, attention_mask)
+
+
+def _freeze_past_key_values(past_key_values):
+    """재사용 가능한 불변 형태(legacy tuple)로 KV cache 변환"""
+    if hasattr(past_key_values, "to_legacy_cache"):
+        return past_key_values.to_legacy_cache()
+    return past_key_values
+
+
+def _thaw_past_key_values(frozen):
+    """저장된 prefix KV를 이번 생성 전용 cache 객체로 복원 (원본 텐서는 변경되지 않음)"""
     try:
-        core_instruction = _strip_examples_from_prompt(prompt)
-        
-        messages = []
-        
-        if use_few_shot and example_images:
-            # Few-shot 예시들 추가
-            for ex_img_path, ex_json in example_images:
-                if os.path.exists(ex_img_path):
-                    messages.extend([
-                        {
-                            "role": "user", 
-                            "content": [
-                                {"type": "image", "image": ex_img_path},
-                                {"type": "text", "text": "Analyze this image and generate a sound source JSON."}
-                            ]
-                        },
-                        {"role": "assistant", "content": ex_json}
-                    ])
-        
-        # 현재 처리할 이미지 추가
-        messages.append({
-            "role": "user",
-            "content": [
-                {"type": "image", "image": image_path},
-                {"type": "text", "text": core_instruction + " Output only the JSON object."}
-            ]
-        })
-        
+        from transformers import DynamicCache
+        return DynamicCache.from_legacy_cache(frozen)
+    except (ImportError, AttributeError):
+        return frozen
+
+
+def build_few_shot_prefix_cache(model, processor, example_images) -> Dict[str, Any] | None:
+    """Few-shot 대화(예시 이미지 + JSON 답변)의 vision feature와 past_key_values를 한 번 계산"""
+    few_shot_messages = _build_few_shot_messages(example_images)
+    if not few_shot_messages:
+        return None
+
+    prefix_text = processor.apply_chat_template(
+        few_shot_messages, tokenize=False, add_generation_prompt=False
+    )
+    prefix_images = _load_message_images(few_shot_messages, processor)
+
+    prefix_inputs = processor(
+        text=[prefix_text],
+        images=prefix_images,
+        padding=True,
+        return_tensors="pt"
+    )
+    prefix_inputs = prefix_inputs.to(model.device)
+
+    position_ids, _ = _get_rope_index(
+        model, prefix_inputs.input_ids, prefix_inputs.image_grid_thw, prefix_inputs.attention_mask
+    )
+
+    with torch.no_grad():
+        outputs = model(
+            input_ids=prefix_inputs.input_ids,
+            attention_mask=prefix_inputs.attention_mask,
+            position_ids=position_ids,
+            pixel_values=prefix_inputs.pixel_values,
+            image_grid_thw=prefix_inputs.image_grid_thw,
+            use_cache=True,
+        )
+
+    print(f"✅ Few-shot prefix cache 생성: {prefix_inputs.input_ids.shape[1]} tokens, 이미지 {len(prefix_images)}개")
+
+    return {
+        "signature": _few_shot_signature(example_images, processor),
+        "text": prefix_text,
+        "input_ids": prefix_inputs.input_ids,
+        "attention_mask": prefix_inputs.attention_mask,
+        "image_grid_thw": prefix_inputs.image_grid_thw,
+        "past_key_values": _freeze_past_key_values(outputs.past_key_values),
+    }
+
+
+def get_few_shot_prefix_cache(model, processor, example_images) -> Dict[str, Any] | None:
+    """로드된 모델마다 prefix cache를 한 번만 만들고 이후에는 재사용"""
+    signature = _few_shot_signature(example_images, processor)
+    cache = getattr(model, "_few_shot_prefix_cache", None)
+    if cache is None or cache["signature"] != signature:
+        cache = build_few_shot_prefix_cache(model, processor, example_images)
+        model._few_shot_prefix_cache = cache
+    return cache
+
+
+def _build_logits_processors(model, generation_kwargs, extra_processors=None) -> LogitsProcessorList:
+    """model.generate의 샘플링 처리 순서(penalty → 사용자 processor → temperature → top-k → top-p)를 그대로 재현"""
+    config = copy.deepcopy(model.generation_config)
+    config.update(**generation_kwargs)
+
+    processors = LogitsProcessorList()
+    if config.repetition_penalty is not None and config.repetition_penalty != 1.0:
+        processors.append(RepetitionPenaltyLogitsProcessor(penalty=config.repetition_penalty))
+    processors.extend(extra_processors or [])
+    if config.do_sample:
+        if config.temperature is not None and config.temperature != 1.0:
+            processors.append(TemperatureLogitsWarper(config.temperature))
+        if config.top_k is not None and config.top_k != 0:
+            processors.append(TopKLogitsWarper(top_k=config.top_k, min_tokens_to_keep=1))
+        if config.top_p is not None and config.top_p < 1.0:
+            processors.append(TopPLogitsWarper(top_p=config.top_p, min_tokens_to_keep=1))
+    return processors
+
+
+def _eos_token_ids(model, processor) -> List[int]:
+    eos = model.generation_config.eos_token_id
+    if eos is None:
+        eos = processor.tokenizer.eos_token_id
+    return list(eos) if isinstance(eos, (list, tuple)) else [eos]
+
+
+def _build_json_constraint(model, processor) -> Dict[str, Any]:
+    """스키마 제약 logits processor와 최상위 객체 종료 stopping criteria 생성 (generate 호출마다 새로)"""
+    constraint = JsonSchemaLogitsProcessor(processor.tokenizer, _eos_token_ids(model, processor))
+    return {
+        "logits_processor": LogitsProcessorList([constraint]),
+        "stopping_criteria": StoppingCriteriaList([JsonObjectStoppingCriteria(constraint)]),
+    }
+
+
+def _count_generated_tokens(processor, output_ids) -> int:
+    """패딩을 제외한 생성 토큰 수"""
+    pad_token_id = processor.tokenizer.pad_token_id
+    if pad_token_id is None:
+        return int(output_ids.shape[-1])
+    return int((output_ids != pad_token_id).sum())
+
+
+def _generate_with_prefix_cache(model, processor, suffix_inputs, prefix_cache, generation_kwargs,
+                                constraint_kwargs=None, stats=None):
+    """Prefix cache 뒤에 현재 이미지 부분만 prefill한 뒤 generate와 동일한 방식으로 샘플링"""
+    suffix_inputs = suffix_inputs.to(model.device)
+
+    prefix_len = prefix_cache["input_ids"].shape[1]
+    input_ids = torch.cat([prefix_cache["input_ids"], suffix_inputs.input_ids], dim=1)
+    attention_mask = torch.cat([prefix_cache["attention_mask"], suffix_inputs.attention_mask], dim=1)
+    image_grid_thw = torch.cat([prefix_cache["image_grid_thw"], suffix_inputs.image_grid_thw], dim=0)
+
+    # 전체 시퀀스 기준 M-RoPE 위치를 계산해야 캐시 경로와 비캐시 경로의 위치가 일치함
+    position_ids, rope_deltas = _get_rope_index(model, input_ids, image_grid_thw, attention_mask)
+
+    constraint_kwargs = constraint_kwargs or {}
+    logits_processor = _build_logits_processors(
+        model, generation_kwargs, constraint_kwargs.get("logits_processor")
+    )
+    stopping_criteria = constraint_kwargs.get("stopping_criteria")
+    eos_token_ids = _eos_token_ids(model, processor)
+    max_new_tokens = generation_kwargs.get("max_new_tokens", 1024)
+    do_sample = generation_kwargs.get("do_sample", True)
+
+    generated = []
+    with torch.no_grad():
+        outputs = model(
+            input_ids=suffix_inputs.input_ids,
+            attention_mask=attention_mask,
+            position_ids=position_ids[:, :, prefix_len:],
+            past_key_values=_thaw_past_key_values(prefix_cache["past_key_values"]),
+            pixel_values=suffix_inputs.pixel_values,
+            image_grid_thw=suffix_inputs.image_grid_thw,
+            use_cache=True,
+        )
+
+        for _ in range(max_new_tokens):
+            next_token_logits = outputs.logits[:, -1, :].clone().float()
+            next_token_scores = logits_processor(input_ids, next_token_logits)
+            if do_sample:
+                probs = torch.nn.functional.softmax(next_token_scores, dim=-1)
+                next_token = torch.multinomial(probs, num_samples=1).squeeze(1)
+            else:
+                next_token = torch.argmax(next_token_scores, dim=-1)
+
+            input_ids = torch.cat([input_ids, next_token[:, None]], dim=-1)
+            attention_mask = torch.cat([attention_mask, attention_mask.new_ones((1, 1))], dim=-1)
+            generated.append(next_token.item())
+            if generated[-1] in eos_token_ids:
+                break
+            if stopping_criteria is not None and bool(stopping_criteria(input_ids, next_token_scores).all()):
+                break
+
+            step_position = (input_ids.shape[1] - 1) + rope_deltas
+            step_position_ids = step_position.view(1, -1, 1).expand(3, -1, 1)
+            outputs = model(
+                input_ids=next_token[:, None],
+                attention_mask=attention_mask,
+                position_ids=step_position_ids,
+                past_key_values=outputs.past_key_values,
+                use_cache=True,
+            )
+
+    if stats is not None:
+        stats["generated_tokens"] = len(generated)
+
+    return processor.batch_decode(
+        [generated], skip_special_tokens=True, clean_up_tokenization_spaces=False
+    )[0]
+
+
+def prepare_vlm_inputs(processor, image_path, prompt, use_few_shot=True, example_images=None,
+                       prefix_cache=None, processor_lock=None) -> Dict[str, Any]:
+    """생성 전 CPU 작업 (메시지 구성, 이미지 디코딩/리사이즈, processor 전처리)
+
+    prefix cache를 쓸 수 있으면 현재 이미지 부분(suffix)만 디코딩/전처리한다 (예시 이미지는 캐시된 KV에 포함).
+    processor_lock이 주어지면 processor 호출만 직렬화하고 이미지 디코딩은 병렬로 진행한다.
+    """
+    start_time = time.perf_counter()
+    messages = []
+    
+    if use_few_shot and example_images:
+        # Few-shot 예시들 추가
+        messages.extend(_build_few_shot_messages(example_images))
+    
+    # 현재 처리할 이미지 추가
+    messages.append(_build_query_message(image_path, prompt))
+    
+    with processor_lock or contextlib.nullcontext():
         # 텍스트 생성
         text = processor.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
         
-        # 이미지들 수집 및 로드
-        image_inputs = []
-        for message in messages:
-            if message["role"] == "user":
-                for content in message["content"]:
-                    if content.get("type") == "image":
-                        img_path = content["image"]
-                        if os.path.exists(img_path):
-                            img = Image.open(img_path).convert('RGB')
-                            image_inputs.append(img)
+        # Few-shot prefix cache 경로: 템플릿 앞부분이 캐시와 정확히 일치할 때만 사용
+        use_prefix_cache = (
+            prefix_cache is not None
+            and use_few_shot
+            and prefix_cache["signature"] == _few_shot_signature(example_images, processor)
+            and text.startswith(prefix_cache["text"])
+        )
+    
+    # 이미지 로드 (prefix cache 경로는 현재 이미지만, 예시 이미지는 디코딩하지 않음)
+    image_inputs = _load_message_images(messages[-1:] if use_prefix_cache else messages, processor)
+    prefix_visual_tokens = 0
+    
+    with processor_lock or contextlib.nullcontext():
+        if use_prefix_cache:
+            # image_grid_thw는 14px patch 단위, visual token은 2x2 patch 병합
+            prefix_visual_tokens = int(prefix_cache["image_grid_thw"].prod(dim=-1).sum()) // 4
+            inputs = processor(
+                text=[text[len(prefix_cache["text"]):]],
+                images=image_inputs,
+                padding=True,
+                return_tensors="pt"
+            )
+        else:
+            inputs = processor(
+                text=[text],
+                images=image_inputs,
+                padding=True,
+                return_tensors="pt"
+            )
+    
+    return {
+        "image_path": image_path,
+        "image_inputs": image_inputs,
+        "inputs": inputs,
+        "prefix_cache": prefix_cache if use_prefix_cache else None,
+        "prefix_visual_tokens": prefix_visual_tokens,
+        "preprocess_seconds": round(time.perf_counter() - start_time, 3),
+    }
+
+
+def generate_sound_json(model, processor, image_path, prompt, use_few_shot=True, example_images=None,
+                        prefix_cache=None, constrained=False, stats=None, prepared=None):
+    try:
+        start_time = time.perf_counter()
+        constraint_kwargs = _build_json_constraint(model, processor) if constrained else {}
+
+        # prefetch된 입력이 없으면 여기서 전처리
+        if prepared is None:
+            prepared = prepare_vlm_inputs(
+                processor, image_path, prompt, use_few_shot=use_few_shot, example_images=example_images,
+                prefix_cache=prefix_cache
+            )
+        image_inputs = prepared["image_inputs"]
+        _record_visual_tokens(processor, image_inputs, stats, prepared.get("prefix_visual_tokens", 0))
+        if stats is not None:
+            stats["preprocess_seconds"] = prepared["preprocess_seconds"]
+            if "wait_seconds" in prepared:
+                stats["prefetch_wait_seconds"] = prepared["wait_seconds"]
         
         print(f"처리 중인 이미지들: {len(image_inputs)}개")
+
+        if prepared["prefix_cache"] is not None:
+            response = _generate_with_prefix_cache(
+                model, processor, prepared["inputs"], prepared["prefix_cache"], GENERATION_KWARGS,
+                constraint_kwargs=constraint_kwargs, stats=stats
+            )
+            if stats is not None:
+                stats["elapsed_seconds"] = round(time.perf_counter() - start_time, 3)
+            return response
         
-        # 프로세서 호출
-        inputs = processor(
-            text=[text],
-            images=image_inputs,
-            padding=True,
-            return_tensors="pt"
-        )
-        inputs = inputs.to(model.device)
+        inputs = prepared["inputs"].to(model.device)
         
-        with torch.no_grad():
+        # Speculative decoding: draft 모델이 있으면 assisted generation 사용
+        # (JSON 제약 processor는 상태를 누적하므로 거절된 draft 토큰을 되돌릴 수 없어 함께 쓰지 않음)
+        draft_model = get_draft_model(model)
+        if draft_model is not None and constrained:
+            print("⚠️ JSON 제약 디코딩에서는 speculative decoding을 사용하지 않습니다")
+            draft_model = None
+        assistant_kwargs = {"assistant_model": draft_model} if draft_model is not None else {}
+        target_counter = _ForwardCounter(model)
+        draft_counter = _ForwardCounter(draft_model) if draft_model is not None else contextlib.nullcontext()
+        
+        with torch.no_grad(), target_counter, draft_counter:
             generated_ids = model.generate(
                 **inputs,
-                max_new_tokens=1024,
-                do_sample=True,
-                temperature=0.3,
-                top_p=0.8,
+                **GENERATION_KWARGS,
+                **constraint_kwargs,
+                **assistant_kwargs,
             )
         
         # 디코딩
@@ -141,6 +681,17 @@ def generate_sound_json(model, processor, image_path, prompt, use_few_shot=True,
             generated_ids, skip_special_tokens=True, clean_up_tokenization_spaces=False
         )[0]
         
+        if stats is not None:
+            stats["generated_tokens"] = _count_generated_tokens(processor, generated_ids[0])
+            stats["elapsed_seconds"] = round(time.perf_counter() - start_time, 3)
+            if draft_model is not None:
+                stats["speculative"] = _speculative_stats(
+                    draft_model, stats["generated_tokens"], target_counter.calls, draft_counter.calls
+                )
+                print(f"⚡ Speculative: 수락률 {stats['speculative']['acceptance_rate']:.2%} "
+                      f"({stats['speculative']['accepted_tokens']}/{stats['speculative']['draft_tokens']}), "
+                      f"{stats['elapsed_seconds']:.2f}s")
+        
         return response
         
     except Exception as e:
@@ -150,6 +701,95 @@ def generate_sound_json(model, processor, image_path, prompt, use_few_shot=True,
         return f"Error: {str(e)}"
 
 
+def generate_sound_json_batch(model, processor, image_paths, prompt, use_few_shot=True, example_images=None,
+                              constrained=False, stats=None):
+    """여러 이미지를 left padding으로 묶어 한 번의 processor/generate 호출로 처리"""
+    responses = [None] * len(image_paths)
+    if stats is not None:
+        stats.extend({} for _ in image_paths)
+
+    few_shot_messages = _build_few_shot_messages(example_images) if use_few_shot and example_images else []
+    few_shot_images = _load_message_images(few_shot_messages, processor)
+
+    # 이미지별 입력 준비: 로드 실패는 해당 이미지만 실패 처리
+    texts = []
+    image_inputs = []
+    batch_indices = []
+    for i, image_path in enumerate(image_paths):
+        try:
+            if not os.path.exists(image_path):
+                raise FileNotFoundError(image_path)
+            query_message = _build_query_message(image_path, prompt)
+            query_images = _load_message_images([query_message], processor)
+            texts.append(processor.apply_chat_template(
+                few_shot_messages + [query_message], tokenize=False, add_generation_prompt=True
+            ))
+            image_inputs.extend(few_shot_images + query_images)
+            batch_indices.append(i)
+            if stats is not None:
+                _record_visual_tokens(processor, few_shot_images + query_images, stats[i])
+        except Exception as e:
+            print(f"오류 발생 ({os.path.basename(image_path)}): {str(e)}")
+            responses[i] = f"Error: {str(e)}"
+
+    if not batch_indices:
+        return responses
+
+    print(f"처리 중인 이미지들: {len(image_inputs)}개 (배치 {len(batch_indices)})")
+
+    try:
+        # 디코더 전용 모델의 배치 생성은 left padding이어야 함
+        tokenizer = processor.tokenizer
+        original_padding_side = tokenizer.padding_side
+        tokenizer.padding_side = "left"
+        try:
+            inputs = processor(
+                text=texts,
+                images=image_inputs,
+                padding=True,
+                return_tensors="pt"
+            )
+        finally:
+            tokenizer.padding_side = original_padding_side
+        inputs = inputs.to(model.device)
+
+        start_time = time.perf_counter()
+        constraint_kwargs = _build_json_constraint(model, processor) if constrained else {}
+        with torch.no_grad():
+            generated_ids = model.generate(
+                **inputs,
+                **GENERATION_KWARGS,
+                **constraint_kwargs,
+            )
+        elapsed = time.perf_counter() - start_time
+
+        generated_ids = [
+            output_ids[len(input_ids):]
+            for input_ids, output_ids in zip(inputs.input_ids, generated_ids)
+        ]
+        batch_responses = processor.batch_decode(
+            generated_ids, skip_special_tokens=True, clean_up_tokenization_spaces=False
+        )
+        for i, response, output_ids in zip(batch_indices, batch_responses, generated_ids):
+            responses[i] = response
+            if stats is not None:
+                stats[i].update({
+                    "generated_tokens": _count_generated_tokens(processor, output_ids),
+                    "elapsed_seconds": round(elapsed / len(batch_indices), 3),
+                })
+
+    except Exception as e:
+        # 배치 전체가 실패하면 (예: 메모리 부족) 이미지별 개별 생성으로 전환
+        print(f"배치 생성 실패, 개별 처리로 전환: {str(e)}")
+        for i in batch_indices:
+            responses[i] = generate_sound_json(
+                model, processor, image_paths[i], prompt, use_few_shot=use_few_shot, example_images=example_images,
+                constrained=constrained, stats=stats[i] if stats is not None else None
+            )
+
+    return responses
+
+
 def parse_json_response(response):
     try:
         json_match = re.search(r'\{.*\}', response, re.DOTALL)
@@ -177,8 +817,29 @@ def parse_json_response(response):
         }
 
 
-def process_image_with_vlm(model, processor, image_path, prompt, example_images=None):
-    """VLM을 사용하여 이미지를 처리하고 JSON 결과를 반환"""
-    response = generate_sound_json(model, processor, image_path, prompt, use_few_shot=True, example_images=example_images)
+def process_image_with_vlm(model, processor, image_path, prompt, example_images=None, prefix_cache=None,
+                           constrained=False, prepared=None):
+    """VLM을 사용하여 이미지를 처리하고 JSON 결과를 반환 (prepared: prefetch된 전처리 결과)"""
+    stats = {"constrained": constrained}
+    response = generate_sound_json(
+        model, processor, image_path, prompt, use_few_shot=True, example_images=example_images,
+        prefix_cache=prefix_cache, constrained=constrained, stats=stats, prepared=prepared
+    )
     parsed = parse_json_response(response)
-    return parsed
\ No newline at end of file
+    parsed["generation_stats"] = stats
+    return parsed
+
+
+def process_images_with_vlm_batch(model, processor, image_paths, prompt, example_images=None, constrained=False):
+    """여러 이미지를 배치로 처리하고 이미지별 파싱 결과 리스트를 반환"""
+    stats = []
+    responses = generate_sound_json_batch(
+        model, processor, image_paths, prompt, use_few_shot=True, example_images=example_images,
+        constrained=constrained, stats=stats
+    )
+    parsed_list = []
+    for response, image_stats in zip(responses, stats):
+        parsed = parse_json_response(response)
+        parsed["generation_stats"] = {"constrained": constrained, **image_stats}
+        parsed_list.append(parsed)
+    return parsed_list
\ No newline at end of file
@@ -0,0 +1,175 @@
+"""
+VLM 결과 캐시
+이미지 바이트, 프롬프트, 모델 ID, 생성 파라미터로 키를 만들어
+process_image_with_vlm 결과(JSON + raw response)를 디스크에 저장하고 재사용
+"""
+
+import os
+import json
+import hashlib
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from utils import ensure_dir, file_sha256
+
+
+DEFAULT_CACHE_DIR = os.path.join(".cache", "vlm_results")
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# 용량을 넘으면 max_bytes의 이 비율까지 비워서 다음 몇 천 번의 저장은 디렉토리 조회 없이 처리
+EVICT_TARGET_RATIO = 0.9
+
+
+def text_sha256(text: str) -> str:
+    """문자열의 SHA-256 해시"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def create_result_cache(
+    cache_dir: str = DEFAULT_CACHE_DIR,
+    model_id: str = "",
+    generation_kwargs: Optional[Dict[str, Any]] = None,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    refresh: bool = False,
+) -> Dict[str, Any]:
+    """캐시 설정과 hit/miss 통계를 담는 딕셔너리 생성"""
+    ensure_dir(cache_dir)
+    return {
+        "dir": cache_dir,
+        "model_id": model_id,
+        "generation_kwargs": dict(generation_kwargs or {}),
+        "max_bytes": max_bytes,
+        "refresh": refresh,
+        "hits": 0,
+        "misses": 0,
+        "evictions": 0,
+        # 캐시 전체 크기 (첫 저장 때 한 번 계산한 뒤 저장할 때마다 증분 갱신)
+        "total_bytes": None,
+    }
+
+
+def make_cache_key(cache: Dict[str, Any], image_path: str, prompt: str) -> str:
+    """이미지 해시 + 프롬프트 해시 + 모델 ID + 생성 파라미터로 캐시 키 생성"""
+    key_fields = {
+        "image_sha256": file_sha256(image_path),
+        "prompt_sha256": text_sha256(prompt),
+        "model_id": cache["model_id"],
+        "generation_kwargs": cache["generation_kwargs"],
+    }
+    return text_sha256(json.dumps(key_fields, sort_keys=True))
+
+
+def _entry_path(cache: Dict[str, Any], key: str) -> str:
+    return os.path.join(cache["dir"], key[:2], f"{key}.json")
+
+
+def lookup_result(cache: Dict[str, Any], image_path: str, prompt: str) -> Optional[Dict[str, Any]]:
+    """캐시에서 파싱 결과를 찾아 반환 (없거나 refresh 모드면 None)"""
+    key = make_cache_key(cache, image_path, prompt)
+    path = _entry_path(cache, key)
+
+    if cache["refresh"] or not os.path.exists(path):
+        cache["misses"] += 1
+        return None
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        cache["misses"] += 1
+        return None
+
+    # LRU: 마지막 사용 시각을 mtime으로 기록
+    os.utime(path, None)
+    cache["hits"] += 1
+    return entry["parsed"]
+
+
+def store_result(cache: Dict[str, Any], image_path: str, prompt: str, parsed: Dict[str, Any]) -> None:
+    """성공한 파싱 결과를 캐시에 저장하고 용량 초과 시 오래된 항목 제거
+
+    크기는 증분으로 추적하므로 디렉토리 전체 조회는 첫 저장과 실제로 용량을 넘었을 때만 일어난다.
+    """
+    if not parsed.get("success"):
+        return
+
+    key = make_cache_key(cache, image_path, prompt)
+    path = _entry_path(cache, key)
+    ensure_dir(os.path.dirname(path))
+
+    entry = {
+        "image_path": image_path,
+        "model_id": cache["model_id"],
+        "generation_kwargs": cache["generation_kwargs"],
+        "created": datetime.now().isoformat(),
+        "parsed": {
+            "success": True,
+            "json_data": parsed["json_data"],
+            "raw_response": parsed["raw_response"],
+        },
+    }
+
+    old_size = os.path.getsize(path) if os.path.exists(path) else 0
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(entry, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+    if cache["total_bytes"] is None:
+        cache["total_bytes"] = sum(size for _, size, _ in _scan_entries(cache))
+    else:
+        cache["total_bytes"] += os.path.getsize(path) - old_size
+    if cache["total_bytes"] > cache["max_bytes"]:
+        evict_lru(cache, int(cache["max_bytes"] * EVICT_TARGET_RATIO))
+
+
+def _scan_entries(cache: Dict[str, Any]):
+    """캐시 항목들의 (mtime, 크기, 경로)"""
+    entries = []
+    for root_dir, _, files in os.walk(cache["dir"]):
+        for name in files:
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(root_dir, name)
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, stat.st_size, path))
+    return entries
+
+
+def evict_lru(cache: Dict[str, Any], target_bytes: Optional[int] = None) -> int:
+    """총 크기가 max_bytes를 넘으면 target_bytes(기본 max_bytes) 이하가 될 때까지 가장 오래 사용되지 않은 항목부터 삭제"""
+    target_bytes = cache["max_bytes"] if target_bytes is None else target_bytes
+    entries = _scan_entries(cache)
+    total_bytes = sum(size for _, size, _ in entries)
+
+    removed = 0
+    if total_bytes <= cache["max_bytes"]:
+        target_bytes = total_bytes
+    for _, size, path in sorted(entries):
+        if total_bytes <= target_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total_bytes -= size
+        removed += 1
+
+    cache["total_bytes"] = total_bytes
+    cache["evictions"] += removed
+    return removed
+
+
+def cache_stats(cache: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """processing_summary.json에 기록할 캐시 통계"""
+    if cache is None:
+        return {"enabled": False}
+    lookups = cache["hits"] + cache["misses"]
+    return {
+        "enabled": True,
+        "dir": cache["dir"],
+        "refresh": cache["refresh"],
+        "hits": cache["hits"],
+        "misses": cache["misses"],
+        "evictions": cache["evictions"],
+        "hit_rate": round(cache["hits"] / lookups, 4) if lookups else 0.0,
+    }
@@ -0,0 +1,274 @@
+"""
+공유 작업 디렉토리 기반 작업 claim
+여러 노드가 공유 파일시스템의 같은 작업 디렉토리에서 이미지(또는 장면/프롬프트 클립) 작업을 원자적 lock 파일
+(O_CREAT | O_EXCL)로 claim해 나눠 처리한다. 각 노드는 다음 작업을 처리 직전에 하나씩 가져가므로 코디네이터 없이
+노드를 추가하는 만큼 처리량이 거의 선형으로 늘어난다. claim은 하트비트로 lease를 갱신하며,
+죽은 노드의 claim은 lease가 만료되면 다른 노드가 가져간다. 결과는 평소의 sound_sources/, result/ 구조에 저장되고
+작업 디렉토리에는 claim/완료 기록만 남는다.
+
+    <work_dir>/<stage>/claims/<key>.lock   처리 중 (worker, host, pid, claimed_at; mtime = 마지막 하트비트)
+    <work_dir>/<stage>/done/<key>.json     완료 기록
+    <work_dir>/<name>.json                 노드 간 공유 값 (예: 전역 시드, 먼저 쓴 노드의 값 사용)
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import hashlib
+import threading
+from datetime import datetime
+from typing import Dict, Any, List
+
+from utils import ensure_dir, sanitize_filename
+
+
+DEFAULT_LEASE_SECONDS = 600.0
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def open_work_dir(work_dir: str, stage: str, worker_id: str | None = None,
+                  lease_seconds: float = DEFAULT_LEASE_SECONDS) -> Dict[str, Any]:
+    """작업 디렉토리의 stage(예: "vlm", "audio/result")용 claim 상태 생성"""
+    root = os.path.join(work_dir, stage)
+    work = {
+        "work_dir": work_dir,
+        "stage": stage,
+        "claims_dir": os.path.join(root, "claims"),
+        "done_dir": os.path.join(root, "done"),
+        "worker_id": worker_id or default_worker_id(),
+        "lease_seconds": lease_seconds,
+        "held": {},
+        "lock": threading.Lock(),
+        "heartbeat": None,
+        "stats": {"claimed": 0, "taken_over": 0, "completed": 0, "released": 0, "skipped": 0, "lost": 0},
+    }
+    ensure_dir(work["claims_dir"])
+    ensure_dir(work["done_dir"])
+    return work
+
+
+def work_key(name: str) -> str:
+    """작업 이름(예: 이미지 상대 경로) -> 파일 이름으로 쓸 수 있는 키 (노드마다 마운트 경로가 달라도 같음)"""
+    digest = hashlib.sha1(name.replace(os.sep, "/").encode("utf-8")).hexdigest()[:12]
+    return f"{sanitize_filename(name, max_length=80)}-{digest}"
+
+
+def _claim_path(work: Dict[str, Any], key: str) -> str:
+    return os.path.join(work["claims_dir"], f"{key}.lock")
+
+
+def _done_path(work: Dict[str, Any], key: str) -> str:
+    return os.path.join(work["done_dir"], f"{key}.json")
+
+
+def _write_json_atomic(path: str, data: Dict[str, Any]) -> None:
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def is_done(work: Dict[str, Any], key: str) -> bool:
+    return os.path.exists(_done_path(work, key))
+
+
+def _claim_age(path: str) -> float | None:
+    try:
+        return time.time() - os.path.getmtime(path)
+    except FileNotFoundError:
+        return None
+
+
+def _take_over_stale(work: Dict[str, Any], path: str) -> bool:
+    """lease가 만료된 claim을 치움 (다시 claim을 시도해도 되면 True)
+
+    rename은 원자적이므로 여러 노드가 동시에 시도해도 한 노드만 같은 파일을 옮긴다. 옮긴 사이에 다른 노드가
+    새 claim을 만들었다면(옮긴 파일이 만료되지 않았다면) 되돌려 놓는다.
+    """
+    age = _claim_age(path)
+    if age is None:
+        return True
+    if age < work["lease_seconds"]:
+        return False
+    stale_path = f"{path}.stale-{uuid.uuid4().hex}"
+    try:
+        os.rename(path, stale_path)
+    except FileNotFoundError:
+        return True
+    age = _claim_age(stale_path)
+    if age is not None and age < work["lease_seconds"]:
+        try:
+            os.link(stale_path, path)
+        except OSError:
+            pass
+        os.remove(stale_path)
+        return False
+    try:
+        with open(stale_path, "r", encoding="utf-8") as f:
+            owner = json.load(f).get("worker")
+    except (OSError, ValueError):
+        owner = None
+    os.remove(stale_path)
+    print(f"⏰ 만료된 claim 회수: {os.path.basename(path)} (owner={owner}, {age:.0f}s)")
+    with work["lock"]:
+        work["stats"]["taken_over"] += 1
+    return True
+
+
+def claim(work: Dict[str, Any], key: str) -> bool:
+    """작업을 claim (이미 완료됐거나 다른 노드가 처리 중이면 False, 이미 이 워커가 가진 claim이면 True)"""
+    with work["lock"]:
+        if key in work["held"]:
+            return True
+    if is_done(work, key):
+        with work["lock"]:
+            work["stats"]["skipped"] += 1
+        return False
+
+    path = _claim_path(work, key)
+    record = {"worker": work["worker_id"], "host": socket.gethostname(), "pid": os.getpid(),
+              "claimed_at": datetime.now().isoformat()}
+    for attempt in range(2):
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            if attempt == 0 and _take_over_stale(work, path):
+                continue
+            return False
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(record, f)
+        break
+
+    # 확인과 claim 사이에 다른 노드가 완료했을 수 있음
+    if is_done(work, key):
+        os.remove(path)
+        with work["lock"]:
+            work["stats"]["skipped"] += 1
+        return False
+
+    with work["lock"]:
+        work["held"][key] = path
+        work["stats"]["claimed"] += 1
+    _start_heartbeat(work)
+    return True
+
+
+def complete(work: Dict[str, Any], key: str, record: Dict[str, Any] | None = None) -> None:
+    """완료 기록을 남기고 claim 해제"""
+    _write_json_atomic(_done_path(work, key), {
+        "worker": work["worker_id"],
+        "finished": datetime.now().isoformat(),
+        **(record or {}),
+    })
+    _drop_claim(work, key)
+    with work["lock"]:
+        work["stats"]["completed"] += 1
+
+
+def release(work: Dict[str, Any], key: str) -> None:
+    """완료하지 않고 claim만 해제 (다른 노드나 다음 실행이 다시 처리)"""
+    _drop_claim(work, key)
+    with work["lock"]:
+        work["stats"]["released"] += 1
+
+
+def _drop_claim(work: Dict[str, Any], key: str) -> None:
+    with work["lock"]:
+        path = work["held"].pop(key, None)
+    if path is not None and os.path.exists(path):
+        os.remove(path)
+
+
+def _start_heartbeat(work: Dict[str, Any]) -> None:
+    """보유한 claim의 mtime을 lease의 1/3 간격으로 갱신하는 데몬 스레드 (한 번만 시작)"""
+    with work["lock"]:
+        if work["heartbeat"] is not None:
+            return
+        work["heartbeat"] = threading.Thread(target=_heartbeat_loop, args=(work,), daemon=True,
+                                             name=f"claim-heartbeat-{work['stage']}")
+    work["heartbeat"].start()
+
+
+def _heartbeat_loop(work: Dict[str, Any]) -> None:
+    interval = max(1.0, work["lease_seconds"] / 3)
+    while True:
+        time.sleep(interval)
+        with work["lock"]:
+            held = list(work["held"].items())
+        for key, path in held:
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                # 하트비트가 늦어 다른 노드가 회수한 경우 (결과는 완료 기록을 먼저 쓴 쪽이 유지)
+                print(f"⚠️ claim을 잃었습니다: {key}")
+                with work["lock"]:
+                    work["held"].pop(key, None)
+                    work["stats"]["lost"] += 1
+
+
+def unfinished(work: Dict[str, Any], keys: List[str]) -> Dict[str, List[str]]:
+    """완료되지 않은 키를 처리 중(claim 유효)과 처리 가능(claim 없음/만료)으로 분류"""
+    status = {"in_progress": [], "claimable": []}
+    for key in keys:
+        if is_done(work, key):
+            continue
+        age = _claim_age(_claim_path(work, key))
+        if age is not None and age < work["lease_seconds"]:
+            status["in_progress"].append(key)
+        else:
+            status["claimable"].append(key)
+    return status
+
+
+def wait_for_stage(work: Dict[str, Any], keys: List[str], poll_seconds: float = 10.0) -> List[str]:
+    """다른 노드가 처리 중인 작업이 끝날 때까지 대기
+
+    모두 완료되면 빈 리스트, 주인 없는(claim 없음/만료) 작업이 남으면 그 키 목록을 반환한다 (호출 측이 다시 처리).
+    """
+    announced = False
+    while True:
+        status = unfinished(work, keys)
+        if status["claimable"] or not status["in_progress"]:
+            return status["claimable"]
+        if not announced:
+            print(f"⏳ 다른 노드의 {work['stage']} 작업 {len(status['in_progress'])}개 완료 대기 중...")
+            announced = True
+        time.sleep(poll_seconds)
+
+
+def shared_value(work_dir: str, name: str, value: Any) -> Any:
+    """노드 간 공유 값 (처음 기록한 노드의 값을 모든 노드가 사용)"""
+    ensure_dir(work_dir)
+    path = os.path.join(work_dir, f"{name}.json")
+    try:
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+    except FileExistsError:
+        # 다른 노드가 아직 쓰는 중일 수 있으므로 내용이 생길 때까지 잠시 재시도
+        for _ in range(50):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    return json.load(f)["value"]
+            except (OSError, ValueError, KeyError):
+                time.sleep(0.1)
+        raise RuntimeError(f"공유 값을 읽을 수 없습니다: {path}")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({"value": value}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    return value
+
+
+def work_stats(work: Dict[str, Any] | None) -> Dict[str, Any] | None:
+    """요약 파일에 기록할 claim 통계"""
+    if work is None:
+        return None
+    with work["lock"]:
+        return {"work_dir": work["work_dir"], "stage": work["stage"], "worker_id": work["worker_id"],
+                "lease_seconds": work["lease_seconds"], **work["stats"]}